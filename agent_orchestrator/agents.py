@@ -5,17 +5,21 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from loguru import logger
 from abc import ABC, abstractmethod
-import smtplib
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.utils import make_msgid
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
-import redis
 import time
 import random
-from jinja2 import Template
-from supabase import create_client as _create_supabase_client
+from email_templates import TemplateRegistry
+from inbox_sync import InboxSync, remember_threads
+from offer_extraction import extract_offer
+from queues import get_job_queue
+from smtp_pool import SMTPPool
+from supplier_index import SupplierIndex, normalize
+from utils import bulk_insert, get_redis_connection, get_supabase_client, publish_job_event, run_blocking
+from verification_cache import VerificationCache
 
 # Configure logging
 logger.add("/app/logs/agents.log", rotation="1 day", retention="7 days", level="INFO")
@@ -25,22 +29,23 @@ class BaseAgent(ABC):
     
     def __init__(self, name: str):
         self.name = name
-        self.redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+        # Shared, pooled clients from the process-wide registry (utils.py)
+        self.redis_client = get_redis_connection()
+        self.queue = get_job_queue(self.redis_client)
         
-        # Initialize real Supabase client (no mocks)
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
-        if not supabase_url or not supabase_key:
-            raise RuntimeError(f"[{name}] Missing Supabase configuration. Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY/ANON_KEY")
-        self.supabase = _create_supabase_client(supabase_url, supabase_key)
-        logger.info(f"[{name}] Initialized real Supabase client")
+        # Real Supabase client (no mocks)
+        self.supabase = get_supabase_client()
         
     @abstractmethod
     async def process(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process job data and return result"""
         pass
     
-    def update_job_status(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+    async def execute(self, query):
+        """Execute a supabase query builder without blocking the event loop"""
+        return await run_blocking(query.execute)
+    
+    async def update_job_status(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
         """Update job status in Redis"""
         updates = {
             "status": status,
@@ -53,13 +58,35 @@ class BaseAgent(ABC):
         if error:
             updates["error"] = error
             
-        self.redis_client.hset(f"agentik:status:{job_id}", mapping=updates)
+        await self.redis_client.hset(f"agentik:status:{job_id}", mapping=updates)
+        await publish_job_event(self.redis_client, job_id, {
+            "agent": self.name,
+            "status": status,
+            "updated_at": updates["updated_at"],
+            "result": result,
+            "error": error
+        })
+        
+        # Write-through to the jobs row happens here, on transitions, not on status reads
+        try:
+            row = {"status": status, "updated_at": updates["updated_at"]}
+            if result:
+                row["result"] = result
+            if error:
+                row["error"] = error
+            await self.execute(self.supabase.table("jobs").update(row).eq("id", job_id))
+        except Exception as e:
+            logger.warning(f"[{self.name}] Persisting job {job_id} status failed: {e}")
         logger.info(f"[{self.name}] Updated job {job_id} status to {status}")
     
-    def send_to_next_agent(self, next_agent: str, job_data: Dict[str, Any]):
-        """Send job to next agent in workflow"""
-        queue_name = f"agentik:agent:{next_agent}"
-        self.redis_client.lpush(queue_name, json.dumps(job_data))
+    async def send_to_next_agent(self, next_agent: str, job_data: Dict[str, Any], not_before: Optional[datetime] = None):
+        """Send job to next agent in workflow, optionally not before a given (UTC) time"""
+        if not_before is not None and not_before > datetime.utcnow():
+            # Parked in the schedule; the orchestrator promotes it when due
+            await self.queue.schedule(next_agent, job_data, not_before)
+            logger.info(f"[{self.name}] Scheduled job {job_data.get('job_id')} for {next_agent} at {not_before.isoformat()}")
+            return
+        await self.queue.push(next_agent, job_data)
         logger.info(f"[{self.name}] Sent job {job_data.get('job_id')} to {next_agent}")
 
 class RFQIntakeAgent(BaseAgent):
@@ -84,7 +111,7 @@ class RFQIntakeAgent(BaseAgent):
             validation_result = self._validate_rfq(rfq)
             
             if not validation_result["valid"]:
-                self.update_job_status(str(job_id), "failed", error=validation_result["errors"])
+                await self.update_job_status(str(job_id), "failed", error=validation_result["errors"])
                 return {"success": False, "error": validation_result["errors"]}
             
             # Enrich RFQ data
@@ -95,14 +122,14 @@ class RFQIntakeAgent(BaseAgent):
             job_data["payload"]["intake_completed_at"] = datetime.utcnow().isoformat()
             
             # Update job status
-            self.update_job_status(str(job_id), "in_progress", {
+            await self.update_job_status(str(job_id), "in_progress", {
                 "stage": "rfq_intake_completed",
                 "rfq_validated": True,
                 "next_agent": "supplier_discovery"
             })
             
             # Send to supplier discovery agent
-            self.send_to_next_agent("supplier_discovery", job_data)
+            await self.send_to_next_agent("supplier_discovery", job_data)
             
             return {"success": True, "rfq": enriched_rfq}
             
@@ -110,7 +137,7 @@ class RFQIntakeAgent(BaseAgent):
             logger.error(f"[{self.name}] Error processing job: {e}")
             job_id = job_data.get("job_id")
             if job_id:
-                self.update_job_status(str(job_id), "failed", error=str(e))
+                await self.update_job_status(str(job_id), "failed", error=str(e))
             return {"success": False, "error": str(e)}
     
     def _validate_rfq(self, rfq: Dict[str, Any]) -> Dict[str, Any]:
@@ -178,6 +205,11 @@ class SupplierDiscoveryAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("supplier_discovery")
+        # Verified suppliers, kept in sync incrementally by updated_at
+        self.supplier_index = SupplierIndex()
+        self._index_synced_at: Optional[str] = None
+        self._index_full_sync_at = 0.0
+        self.index_full_sync_interval = int(os.getenv("SUPPLIER_INDEX_FULL_SYNC_INTERVAL", "600"))
     
     async def process(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
         """Discover suppliers for the RFQ"""
@@ -205,37 +237,64 @@ class SupplierDiscoveryAgent(BaseAgent):
             job_data["payload"]["discovery_completed_at"] = datetime.utcnow().isoformat()
             
             # Update job status
-            self.update_job_status(job_id, "in_progress", {
+            await self.update_job_status(job_id, "in_progress", {
                 "stage": "supplier_discovery_completed",
                 "suppliers_found": len(ranked_suppliers),
                 "next_agent": "email_send"
             })
             
             # Send to email agent
-            self.send_to_next_agent("email_send", job_data)
+            await self.send_to_next_agent("email_send", job_data)
             
             return {"success": True, "suppliers": ranked_suppliers}
             
         except Exception as e:
             logger.error(f"[{self.name}] Error discovering suppliers: {e}")
-            self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
+            await self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
             return {"success": False, "error": str(e)}
     
+    async def _sync_supplier_index(self):
+        """Full load on first use (and every index_full_sync_interval seconds), otherwise only rows changed since the last sync"""
+        full = self._index_synced_at is None or time.monotonic() - self._index_full_sync_at >= self.index_full_sync_interval
+        started_at = datetime.utcnow().isoformat()
+        query = self.supabase.table("suppliers").select("*")
+        if full:
+            query = query.eq("verified", True)
+        else:
+            query = query.gte("updated_at", self._index_synced_at)
+        response = await self.execute(query)
+        
+        if full:
+            self.supplier_index.clear()
+            self._index_full_sync_at = time.monotonic()
+        for supplier in response.data or []:
+            self._index_supplier(supplier)
+        self._index_synced_at = started_at
+    
+    def _index_supplier(self, supplier: Dict[str, Any]):
+        if supplier.get("id") is None:
+            return
+        if supplier.get("verified"):
+            self.supplier_index.upsert(supplier["id"], supplier)
+        else:
+            self.supplier_index.remove(supplier["id"])
+    
     async def _find_existing_suppliers(self, rfq: Dict[str, Any]):
-        """Find existing suppliers in database"""
+        """Find existing suppliers via the inverted index"""
         try:
             category = rfq.get("category", "")
             keywords = rfq.get("keywords", [])
             
-            # Query suppliers by category
-            response = self.supabase.table("suppliers").select("*").contains("categories", [category]).eq("verified", True).execute()
-            
-            suppliers = response.data if response.data else []
+            await self._sync_supplier_index()
+            matches = self.supplier_index.search(keywords, category)
+            best = max((score for _, score in matches), default=0.0)
             
-            # Add relevance score
-            for supplier in suppliers:
-                supplier["relevance_score"] = self._calculate_relevance(rfq, supplier)
+            suppliers = []
+            for supplier_id, score in matches:
+                supplier = dict(self.supplier_index.docs[supplier_id])
+                supplier["relevance_score"] = self._calculate_relevance(rfq, supplier, score / best if best else 0.0)
                 supplier["source"] = "existing"
+                suppliers.append(supplier)
             
             return suppliers
             
@@ -284,23 +343,22 @@ class SupplierDiscoveryAgent(BaseAgent):
         
         return mock_suppliers
     
-    def _calculate_relevance(self, rfq: Dict[str, Any], supplier: Dict[str, Any]) -> float:
-        """Calculate relevance score between RFQ and supplier"""
+    def _calculate_relevance(self, rfq: Dict[str, Any], supplier: Dict[str, Any], keyword_score: float = 0.0) -> float:
+        """Calculate relevance score between RFQ and supplier
+        
+        ``keyword_score`` is the supplier's BM25 score relative to the best match (0..1).
+        """
         score = 0.0
         
         # Category match
-        rfq_category = rfq.get("category", "").lower()
-        supplier_categories = [cat.lower() for cat in supplier.get("categories", [])]
+        rfq_category = normalize(rfq.get("category", ""))
+        supplier_categories = [normalize(cat) for cat in supplier.get("categories") or []]
         
         if rfq_category in supplier_categories:
             score += 0.5
         
         # Keyword matching
-        rfq_keywords = rfq.get("keywords", [])
-        supplier_desc = supplier.get("description", "").lower()
-        
-        keyword_matches = sum(1 for keyword in rfq_keywords if keyword in supplier_desc)
-        score += (keyword_matches / max(len(rfq_keywords), 1)) * 0.3
+        score += keyword_score * 0.3
         
         # Verification bonus
         if supplier.get("verified"):
@@ -313,25 +371,75 @@ class SupplierDiscoveryAgent(BaseAgent):
         return sorted(suppliers, key=lambda s: s.get("relevance_score", 0), reverse=True)
     
     async def _store_suppliers(self, suppliers):
-        """Store newly discovered suppliers in database"""
+        """Store newly discovered suppliers in one bulk upsert (repeat discoveries are skipped by email)"""
+        now = datetime.utcnow().isoformat()
+        rows = {}
         for supplier in suppliers:
             if supplier.get("source") == "discovered":
-                try:
-                    supplier_data = {
-                        "name": supplier["name"],
-                        "email": supplier["email"],
-                        "company": supplier["company"],
-                        "categories": supplier["categories"],
-                        "description": supplier["description"],
-                        "verified": False,
-                        "created_at": datetime.utcnow().isoformat()
-                    }
-                    
-                    self.supabase.table("suppliers").insert(supplier_data).execute()
-                    logger.info(f"Stored new supplier: {supplier['name']}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to store supplier {supplier['name']}: {e}")
+                rows[supplier["email"].lower()] = {
+                    "name": supplier["name"],
+                    "email": supplier["email"].lower(),
+                    "company": supplier["company"],
+                    "categories": supplier["categories"],
+                    "description": supplier["description"],
+                    "verified": False,
+                    "created_at": now
+                }
+        if not rows:
+            return
+        
+        try:
+            inserted = await bulk_insert(self.supabase, "suppliers", list(rows.values()), on_conflict="email")
+            for row in inserted:
+                self._index_supplier(row)
+            logger.info(f"Stored {len(inserted)} new suppliers ({len(rows) - len(inserted)} already known)")
+        except Exception as e:
+            logger.error(f"Failed to store discovered suppliers: {e}")
+
+# Invitation email; "/shared" is the RFQ part, identical for every supplier
+RFQ_EMAIL_TEMPLATES = {
+    "rfq_invitation": """
+Dear {{ supplier.name }},
+
+We would like to invite {{ supplier.company }} to participate in our Request for Quotation (RFQ).
+{{ shared }}""",
+    "rfq_invitation/shared": """
+**RFQ Details:**
+- Title: {{ rfq.title }}
+- Category: {{ rfq.category }}
+- Quantity: {{ rfq.quantity }} {{ rfq.unit }}
+- Deadline: {{ rfq.deadline }}
+- Delivery Location: {{ rfq.delivery_location }}
+
+**Description:**
+{{ rfq.description }}
+
+{% if rfq.requirements %}
+**Requirements:**
+{{ rfq.requirements }}
+{% endif %}
+
+{% if rfq.budget_min and rfq.budget_max %}
+**Budget Range:** ${{ rfq.budget_min }} - ${{ rfq.budget_max }}
+{% endif %}
+
+To submit your quotation, please reply to this email with:
+1. Unit price
+2. Total price
+3. Delivery time
+4. Terms and conditions
+5. Any additional notes
+
+Please submit your quotation before {{ rfq.deadline }}.
+
+Thank you for your interest.
+
+Best regards,
+Agentik B2B Platform
+        """,
+}
+
+email_templates = TemplateRegistry(RFQ_EMAIL_TEMPLATES)
 
 class EmailSendAgent(BaseAgent):
     """Agent responsible for sending emails to suppliers"""
@@ -342,6 +450,16 @@ class EmailSendAgent(BaseAgent):
         self.smtp_port = int(os.getenv("EMAIL_SMTP_PORT", "587"))
         self.email_username = os.getenv("EMAIL_USERNAME")
         self.email_password = os.getenv("EMAIL_PASSWORD")
+        self.smtp_pool = None
+        if self.email_username and self.email_password:
+            self.smtp_pool = SMTPPool(
+                self.smtp_server,
+                self.smtp_port,
+                self.email_username,
+                self.email_password,
+                size=int(os.getenv("EMAIL_SMTP_POOL_SIZE", "5")),
+                domain_rate=float(os.getenv("EMAIL_SMTP_DOMAIN_RATE", "2"))
+            )
     
     async def process(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send RFQ emails to suppliers"""
@@ -354,36 +472,49 @@ class EmailSendAgent(BaseAgent):
             
             sent_emails = []
             failed_emails = []
-            
-            for supplier in suppliers:
-                try:
-                    email_result = await self._send_rfq_email(rfq, supplier)
-                    
-                    if email_result["success"]:
-                        sent_emails.append({
-                            "supplier_id": supplier.get("id"),
-                            "email": supplier["email"],
-                            "sent_at": datetime.utcnow().isoformat()
-                        })
-                        
-                        # Log email in database
-                        await self._log_email(rfq, supplier, "invitation", "sent")
-                    else:
-                        failed_emails.append({
+            log_entries = []
+            threads = {}
+            
+            # Fan out concurrently; the SMTP pool bounds open sessions and per-domain rate
+            prepared = self._prepare_email_body(rfq)
+            bodies = [prepared.render(supplier=supplier) for supplier in suppliers]
+            results = await asyncio.gather(*(
+                self._send_rfq_email(rfq, supplier, body) for supplier, body in zip(suppliers, bodies)
+            ))
+            
+            for supplier, body, email_result in zip(suppliers, bodies, results):
+                if email_result["success"]:
+                    sent_emails.append({
+                        "supplier_id": supplier.get("id"),
+                        "email": supplier["email"],
+                        "sent_at": datetime.utcnow().isoformat()
+                    })
+                    log_entries.append((supplier, body, "sent", None))
+                    if email_result.get("message_id"):
+                        threads[email_result["message_id"]] = {
+                            "rfq_id": rfq.get("id"),
                             "supplier_id": supplier.get("id"),
-                            "email": supplier["email"],
-                            "error": email_result["error"]
-                        })
-                        
-                        await self._log_email(rfq, supplier, "invitation", "failed", email_result["error"])
-                        
-                except Exception as e:
-                    logger.error(f"Failed to send email to {supplier.get('email')}: {e}")
+                            "supplier_email": supplier.get("email"),
+                            "supplier_name": supplier.get("name"),
+                            "quantity": rfq.get("quantity")
+                        }
+                else:
+                    logger.error(f"Failed to send email to {supplier.get('email')}: {email_result['error']}")
                     failed_emails.append({
                         "supplier_id": supplier.get("id"),
                         "email": supplier.get("email"),
-                        "error": str(e)
+                        "error": email_result["error"]
                     })
+                    log_entries.append((supplier, body, "failed", email_result["error"]))
+            
+            # Log all emails in database
+            await self._log_emails(rfq, "invitation", log_entries)
+            
+            # Replies are matched back to this RFQ by Message-ID (InboxParserAgent)
+            try:
+                await remember_threads(self.redis_client, threads)
+            except Exception as e:
+                logger.error(f"Failed to record invitation threads: {e}")
             
             # Update job data
             job_data["payload"]["email_results"] = {
@@ -395,16 +526,17 @@ class EmailSendAgent(BaseAgent):
             job_data["payload"]["emails_sent_at"] = datetime.utcnow().isoformat()
             
             # Update job status
-            self.update_job_status(job_id, "in_progress", {
+            await self.update_job_status(job_id, "in_progress", {
                 "stage": "emails_sent",
                 "emails_sent": len(sent_emails),
                 "emails_failed": len(failed_emails),
                 "next_agent": "inbox_parser"
             })
             
-            # Send to inbox parser (with delay to simulate response time)
-            job_data["payload"]["expected_responses_after"] = (datetime.utcnow() + timedelta(minutes=5)).isoformat()
-            self.send_to_next_agent("inbox_parser", job_data)
+            # Hand over to inbox parser once suppliers have had time to respond
+            expected_responses_after = datetime.utcnow() + timedelta(minutes=5)
+            job_data["payload"]["expected_responses_after"] = expected_responses_after.isoformat()
+            await self.send_to_next_agent("inbox_parser", job_data, not_before=expected_responses_after)
             
             return {
                 "success": True,
@@ -414,23 +546,28 @@ class EmailSendAgent(BaseAgent):
             
         except Exception as e:
             logger.error(f"[{self.name}] Error sending emails: {e}")
-            self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
+            await self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
             return {"success": False, "error": str(e)}
     
-    async def _send_rfq_email(self, rfq: Dict[str, Any], supplier: Dict[str, Any]) -> Dict[str, Any]:
+    async def _send_rfq_email(self, rfq: Dict[str, Any], supplier: Dict[str, Any], body: Optional[str] = None) -> Dict[str, Any]:
         """Send RFQ invitation email to supplier"""
         try:
             # Generate email content
             subject = f"RFQ Invitation: {rfq['title']}"
-            body = self._generate_email_body(rfq, supplier)
-            
-            # For demo purposes, we'll simulate email sending
-            # In production, you would actually send via SMTP
-            if self.email_username and self.email_password:
-                # Actual email sending code would go here
-                pass
+            if body is None:
+                body = self._generate_email_body(rfq, supplier)
+            
+            if self.smtp_pool:
+                message = MIMEText(body, "plain", "utf-8")
+                message["Subject"] = subject
+                message["From"] = self.email_username
+                message["To"] = supplier["email"]
+                message["Message-ID"] = make_msgid(domain=self.email_username.rsplit("@", 1)[-1])
+                await self.smtp_pool.send(message)
+                logger.info(f"Email sent to {supplier['email']} for RFQ {rfq['id']}")
+                return {"success": True, "message_id": message["Message-ID"]}
             
-            # Simulate success with high probability
+            # For demo purposes (no SMTP credentials), simulate success with high probability
             if random.random() > 0.1:  # 90% success rate
                 logger.info(f"Email sent to {supplier['email']} for RFQ {rfq['id']}")
                 return {"success": True}
@@ -440,68 +577,55 @@ class EmailSendAgent(BaseAgent):
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _prepare_email_body(self, rfq: Dict[str, Any]):
+        """Invitation body with the RFQ part rendered once; ``.render(supplier=...)`` per supplier"""
+        return email_templates.prepare("rfq_invitation", rfq=rfq)
+    
     def _generate_email_body(self, rfq: Dict[str, Any], supplier: Dict[str, Any]) -> str:
         """Generate email body using template"""
-        template = Template("""
-Dear {{ supplier.name }},
-
-We would like to invite {{ supplier.company }} to participate in our Request for Quotation (RFQ).
-
-**RFQ Details:**
-- Title: {{ rfq.title }}
-- Category: {{ rfq.category }}
-- Quantity: {{ rfq.quantity }} {{ rfq.unit }}
-- Deadline: {{ rfq.deadline }}
-- Delivery Location: {{ rfq.delivery_location }}
-
-**Description:**
-{{ rfq.description }}
-
-{% if rfq.requirements %}
-**Requirements:**
-{{ rfq.requirements }}
-{% endif %}
-
-{% if rfq.budget_min and rfq.budget_max %}
-**Budget Range:** ${{ rfq.budget_min }} - ${{ rfq.budget_max }}
-{% endif %}
-
-To submit your quotation, please reply to this email with:
-1. Unit price
-2. Total price
-3. Delivery time
-4. Terms and conditions
-5. Any additional notes
-
-Please submit your quotation before {{ rfq.deadline }}.
-
-Thank you for your interest.
-
-Best regards,
-Agentik B2B Platform
-        """)
-        
-        return template.render(rfq=rfq, supplier=supplier)
+        return self._prepare_email_body(rfq).render(supplier=supplier)
     
-    async def _log_email(self, rfq: Dict[str, Any], supplier: Dict[str, Any], email_type: str, status: str, error: Optional[str] = None):
-        """Log email sending activity"""
+    async def _log_emails(self, rfq: Dict[str, Any], email_type: str, entries):
+        """Log email sending activity for (supplier, body, status, error) entries in one bulk insert"""
         try:
-            email_data = {
-                "rfq_id": rfq["id"],
-                "supplier_id": supplier.get("id"),
-                "email_type": email_type,
-                "recipient": supplier["email"],
-                "subject": f"RFQ Invitation: {rfq['title']}",
-                "body": self._generate_email_body(rfq, supplier),
-                "sent_at": datetime.utcnow().isoformat(),
-                "delivery_status": status,
-                "error_message": error
-            }
+            rows = [
+                {
+                    "rfq_id": rfq["id"],
+                    "supplier_id": supplier.get("id"),
+                    "email_type": email_type,
+                    "recipient": supplier["email"],
+                    "subject": f"RFQ Invitation: {rfq['title']}",
+                    "body": body,
+                    "sent_at": datetime.utcnow().isoformat(),
+                    "delivery_status": status,
+                    "error_message": error
+                }
+                for supplier, body, status, error in entries
+            ]
             
-            self.supabase.table("email_logs").insert(email_data).execute()
+            await bulk_insert(self.supabase, "email_logs", rows)
             
         except Exception as e:
-            logger.error(f"Failed to log email: {e}")
+            logger.error(f"Failed to log emails: {e}")
+
+# Replies fetched by one RFQ's job but belonging to another wait here for it
+INBOX_RESPONSES_KEY = "inbox:responses:{rfq_id}"
+INBOX_RESPONSES_TTL = 7 * 24 * 3600
+# Workflow envelope of an RFQ whose inbox_parser already ran; parking a reply for
+# it schedules a follow-up parse (at most one per INBOX_FOLLOW_UP_DELAY seconds)
+INBOX_WORKFLOW_KEY = "inbox:workflow:{rfq_id}"
+INBOX_FOLLOW_UP_KEY = "inbox:follow_up:{rfq_id}"
+INBOX_FOLLOW_UP_DELAY = int(os.getenv("INBOX_FOLLOW_UP_DELAY", "300"))
+
+
+async def remember_workflow(redis, job_data: Dict[str, Any]):
+    """Store the envelope follow-up parses of this RFQ continue from"""
+    rfq_id = job_data.get("payload", {}).get("rfq", {}).get("id")
+    if rfq_id is not None:
+        key = INBOX_WORKFLOW_KEY.format(rfq_id=rfq_id)
+        await redis.set(key, json.dumps(job_data, default=str), ex=INBOX_RESPONSES_TTL)
+# offer_extraction types -> response types used by the simulated replies
+RESPONSE_TYPES = {"offer": "quote", "clarification": "request_info", "decline": "decline"}
 
 class InboxParserAgent(BaseAgent):
     """Agent responsible for parsing incoming email responses"""
@@ -512,14 +636,32 @@ class InboxParserAgent(BaseAgent):
     async def process(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
         """Parse inbox for supplier responses"""
         try:
+            follow_up = job_data.get("payload", {}).get("follow_up", False)
+            if follow_up:
+                # Continue from the workflow as it is now (with the offers verified so far)
+                envelope = await self.redis_client.get(INBOX_WORKFLOW_KEY.format(rfq_id=job_data["payload"]["rfq"]["id"]))
+                if not envelope:
+                    return {"success": True, "responses_count": 0, "offers_count": 0}
+                job_data = json.loads(envelope)
+            
             job_id = job_data.get("job_id")
             rfq = job_data.get("payload", {}).get("rfq", {})
             suppliers = job_data.get("payload", {}).get("suppliers", [])
             
-            logger.info(f"[{self.name}] Parsing responses for RFQ {rfq.get('id')}")
+            logger.info(f"[{self.name}] Parsing responses for RFQ {rfq.get('id')}{' (follow-up)' if follow_up else ''}")
+            
+            inbox = InboxSync.from_env(self.redis_client)
+            if inbox:
+                # Before draining the parked replies: replies parked from now on schedule a follow-up
+                await remember_workflow(self.redis_client, job_data)
+                responses = await self._collect_inbox_responses(inbox, rfq)
+            else:
+                # No IMAP account configured: simulate replies
+                responses = await self._simulate_email_responses(rfq, suppliers)
             
-            # Simulate email parsing (in real implementation, would connect to IMAP)
-            responses = await self._simulate_email_responses(rfq, suppliers)
+            if follow_up and not responses:
+                # Replies were already taken by an earlier run
+                return {"success": True, "responses_count": 0, "offers_count": 0}
             
             # Parse and extract offers from responses
             parsed_offers = []
@@ -537,15 +679,16 @@ class InboxParserAgent(BaseAgent):
             job_data["payload"]["parsing_completed_at"] = datetime.utcnow().isoformat()
             
             # Update job status
-            self.update_job_status(job_id, "in_progress", {
+            await self.update_job_status(job_id, "in_progress", {
                 "stage": "responses_parsed",
                 "responses_received": len(responses),
                 "offers_extracted": len(parsed_offers),
+                "responses_incomplete": sum(1 for response in responses if response.get("missing_fields")),
                 "next_agent": "supplier_verifier"
             })
             
             # Send to supplier verifier
-            self.send_to_next_agent("supplier_verifier", job_data)
+            await self.send_to_next_agent("supplier_verifier", job_data)
             
             return {
                 "success": True,
@@ -555,9 +698,79 @@ class InboxParserAgent(BaseAgent):
             
         except Exception as e:
             logger.error(f"[{self.name}] Error parsing inbox: {e}")
-            self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
+            await self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
             return {"success": False, "error": str(e)}
     
+    async def _collect_inbox_responses(self, inbox: InboxSync, rfq: Dict[str, Any]) -> list:
+        """Replies to this RFQ from the incremental IMAP sync; other RFQs' replies are parked for their jobs"""
+        key = INBOX_RESPONSES_KEY.format(rfq_id=rfq.get("id"))
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key)
+        parked, _ = await pipe.execute()
+        responses = [json.loads(raw) for raw in parked]
+        
+        async for message in inbox.messages():
+            thread = message["thread"]
+            response = self._response_from_message(message)
+            if str(thread.get("rfq_id")) == str(rfq.get("id")):
+                responses.append(response)
+            elif thread.get("rfq_id") is not None:
+                await self._park_response(str(thread["rfq_id"]), response)
+        
+        return responses
+    
+    async def _park_response(self, rfq_id: str, response: Dict[str, Any]):
+        """Keep a reply for its own RFQ and make sure a parse of that RFQ picks it up"""
+        key = INBOX_RESPONSES_KEY.format(rfq_id=rfq_id)
+        await self.redis_client.rpush(key, json.dumps(response))
+        await self.redis_client.expire(key, INBOX_RESPONSES_TTL)
+        
+        # No envelope yet: that RFQ's own parse is still ahead and drains the list
+        envelope = await self.redis_client.get(INBOX_WORKFLOW_KEY.format(rfq_id=rfq_id))
+        if not envelope:
+            return
+        # One follow-up per delay window collects every reply parked meanwhile
+        if not await self.redis_client.set(INBOX_FOLLOW_UP_KEY.format(rfq_id=rfq_id), "1", ex=INBOX_FOLLOW_UP_DELAY, nx=True):
+            return
+        workflow = json.loads(envelope)
+        follow_up = {
+            "job_id": workflow.get("job_id"),
+            "priority": workflow.get("priority", "normal"),
+            "payload": {"rfq": {"id": rfq_id}, "follow_up": True}
+        }
+        await self.send_to_next_agent(
+            "inbox_parser", follow_up, not_before=datetime.utcnow() + timedelta(seconds=INBOX_FOLLOW_UP_DELAY)
+        )
+    
+    def _response_from_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Inbox reply -> response in the same shape as the simulated ones"""
+        thread = message["thread"]
+        offer = extract_offer(message["content"]) or {}
+        response = {
+            "supplier_id": thread.get("supplier_id"),
+            "supplier_email": message["sender"] or thread.get("supplier_email"),
+            "supplier_name": thread.get("supplier_name") or message["sender"],
+            "response_type": RESPONSE_TYPES.get(offer.get("type"), "unknown"),
+            "received_at": datetime.utcnow().isoformat(),
+            "content": message["content"],
+            "message_id": message["message_id"]
+        }
+        if offer.get("type") == "offer" and offer.get("price") is not None and offer.get("delivery_time") is None:
+            # A price without a lead time is not a comparable offer; keep the reply for follow-up
+            response["missing_fields"] = ["delivery_time"]
+        elif offer.get("type") == "offer" and offer.get("price") is not None:
+            quantity = thread.get("quantity") or 1
+            response["extracted_data"] = {
+                "unit_price": offer["price"] / quantity,
+                "total_price": offer["price"],
+                "currency": offer.get("currency"),
+                "delivery_time": offer.get("delivery_time"),
+                "terms": offer.get("payment_terms", ""),
+                "confidence": offer.get("confidence")
+            }
+        return response
+    
     async def _simulate_email_responses(self, rfq: Dict[str, Any], suppliers) -> list:
         """Simulate email responses from suppliers"""
         responses = []
@@ -647,7 +860,7 @@ Best regards,
         
         extracted = response.get("extracted_data", {})
         
-        if not all(key in extracted for key in ["unit_price", "total_price", "delivery_time"]):
+        if any(extracted.get(key) is None for key in ["unit_price", "total_price", "delivery_time"]):
             return None
         
         offer = {
@@ -670,6 +883,7 @@ class SupplierVerifierAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("supplier_verifier")
+        self.verification_cache = VerificationCache()
     
     async def process(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
         """Verify suppliers and validate their offers"""
@@ -679,7 +893,8 @@ class SupplierVerifierAgent(BaseAgent):
             
             logger.info(f"[{self.name}] Verifying {len(offers)} offers")
             
-            verified_offers = []
+            # Follow-up parses of late replies add to the offers verified by earlier runs
+            verified_offers = list(job_data.get("payload", {}).get("verified_offers", []))
             
             for offer in offers:
                 verification_result = await self._verify_offer(offer)
@@ -696,9 +911,11 @@ class SupplierVerifierAgent(BaseAgent):
             # Update job data
             job_data["payload"]["verified_offers"] = verified_offers
             job_data["payload"]["verification_completed_at"] = datetime.utcnow().isoformat()
+            if InboxSync.from_env(self.redis_client):
+                await remember_workflow(self.redis_client, job_data)
             
             # Update job status
-            self.update_job_status(job_id, "in_progress", {
+            await self.update_job_status(job_id, "in_progress", {
                 "stage": "offers_verified",
                 "total_offers": len(offers),
                 "verified_offers": len(verified_offers),
@@ -706,7 +923,7 @@ class SupplierVerifierAgent(BaseAgent):
             })
             
             # Send to aggregation agent
-            self.send_to_next_agent("aggregation_report", job_data)
+            await self.send_to_next_agent("aggregation_report", job_data)
             
             return {
                 "success": True,
@@ -716,7 +933,7 @@ class SupplierVerifierAgent(BaseAgent):
             
         except Exception as e:
             logger.error(f"[{self.name}] Error verifying offers: {e}")
-            self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
+            await self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
             return {"success": False, "error": str(e)}
     
     async def _verify_offer(self, offer: Dict[str, Any]) -> Dict[str, Any]:
@@ -743,7 +960,7 @@ class SupplierVerifierAgent(BaseAgent):
         verification["checks"]["price_valid"] = unit_price > 0 and total_price > 0
         
         # Delivery time validation
-        delivery_time = offer.get("delivery_time", 0)
+        delivery_time = offer.get("delivery_time") or 0
         if delivery_time <= 0 or delivery_time > 365:  # Max 1 year
             verification["issues"].append("Invalid delivery time")
             verification["score"] -= 0.2
@@ -765,46 +982,53 @@ class SupplierVerifierAgent(BaseAgent):
         return verification
     
     async def _verify_supplier(self, supplier_id: str) -> Dict[str, Any]:
-        """Verify supplier credentials"""
+        """Verify supplier credentials (cached per supplier for the cache TTL)"""
         try:
-            # Get supplier from database
-            response = self.supabase.table("suppliers").select("*").eq("id", supplier_id).maybe_single().execute()
-            
-            if not response.data:
+            verification = await self.verification_cache.get_or_load(supplier_id, self._load_supplier_verification)
+            if verification is None:
                 return {"verified": False, "issues": ["Supplier not found"]}
-            
-            supplier = response.data
-            
-            # Perform verification checks
-            issues = []
-            
-            # Check required fields
-            required_fields = ["name", "email", "company"]
-            for field in required_fields:
-                if not supplier.get(field):
-                    issues.append(f"Missing {field}")
-            
-            # Check email format
-            email = supplier.get("email", "")
-            if "@" not in email or "." not in email:
-                issues.append("Invalid email format")
-            
-            # In a real implementation, you might:
-            # - Check company registration
-            # - Verify business licenses
-            # - Check credit ratings
-            # - Validate contact information
-            
-            return {
-                "verified": len(issues) == 0,
-                "issues": issues,
-                "supplier": supplier
-            }
+            return verification
             
         except Exception as e:
             logger.error(f"Error verifying supplier {supplier_id}: {e}")
             return {"verified": False, "issues": [f"Verification error: {str(e)}"]}
     
+    async def _load_supplier_verification(self, supplier_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch and check a supplier profile; None when it does not exist (errors propagate and are not cached)"""
+        # Get supplier from database
+        response = await self.execute(self.supabase.table("suppliers").select("*").eq("id", supplier_id).maybe_single())
+        
+        if not response or not response.data:
+            return None
+        
+        supplier = response.data
+        
+        # Perform verification checks
+        issues = []
+        
+        # Check required fields
+        required_fields = ["name", "email", "company"]
+        for field in required_fields:
+            if not supplier.get(field):
+                issues.append(f"Missing {field}")
+        
+        # Check email format
+        email = supplier.get("email", "")
+        if "@" not in email or "." not in email:
+            issues.append("Invalid email format")
+        
+        # In a real implementation, you might:
+        # - Check company registration
+        # - Verify business licenses
+        # - Check credit ratings
+        # - Validate contact information
+        
+        return {
+            "verified": len(issues) == 0,
+            "issues": issues,
+            "supplier": supplier
+        }
+    
     async def _store_offer(self, offer: Dict[str, Any]):
         """Store verified offer in database"""
         try:
@@ -822,7 +1046,7 @@ class SupplierVerifierAgent(BaseAgent):
                 "verified": offer["verified"]
             }
             
-            self.supabase.table("offers").insert(offer_data).execute()
+            await self.execute(self.supabase.table("offers").insert(offer_data))
             logger.info(f"Stored offer from supplier {offer['supplier_id']}")
             
         except Exception as e:
@@ -870,7 +1094,7 @@ class AggregationReportAgent(BaseAgent):
             job_data["payload"]["completed_at"] = datetime.utcnow().isoformat()
             
             # Mark job as completed
-            self.update_job_status(job_id, "completed", {
+            await self.update_job_status(job_id, "completed", {
                 "stage": "completed",
                 "final_report_generated": True,
                 "total_offers": len(verified_offers)
@@ -880,7 +1104,7 @@ class AggregationReportAgent(BaseAgent):
             
         except Exception as e:
             logger.error(f"[{self.name}] Error generating report: {e}")
-            self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
+            await self.update_job_status(job_data.get("job_id"), "failed", error=str(e))
             return {"success": False, "error": str(e)}
     
     async def _analyze_offers(self, rfq: Dict[str, Any], offers) -> Dict[str, Any]:
@@ -994,10 +1218,10 @@ class AggregationReportAgent(BaseAgent):
     async def _update_rfq_status(self, rfq_id: str, status: str):
         """Update RFQ status in database"""
         try:
-            self.supabase.table("rfqs").update({
+            await self.execute(self.supabase.table("rfqs").update({
                 "status": status,
                 "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", rfq_id).execute()
+            }).eq("id", rfq_id))
             
             logger.info(f"Updated RFQ {rfq_id} status to {status}")
             
@@ -0,0 +1,69 @@
+import functools
+import os
+from typing import Any, Callable, Dict, Optional
+
+import jinja2
+from markupsafe import Markup
+
+
+def _bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    """Compiled templates survive restarts and are shared by workers (``EMAIL_TEMPLATE_CACHE_DIR``)"""
+    directory = os.getenv("EMAIL_TEMPLATE_CACHE_DIR")
+    try:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return jinja2.FileSystemBytecodeCache(directory or None)
+    except (OSError, RuntimeError):
+        return None
+
+
+def number_format(value: Any, decimals: int = 0) -> str:
+    """1234567.5 -> 1.234.568 (Turkish thousands separator)"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return f"{number:,.{decimals}f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+class PreparedEmail:
+    """A template bound to its RFQ-wide context; ``render`` only fills recipient fields"""
+
+    def __init__(self, template: jinja2.Template, context: Dict[str, Any]):
+        self.template = template
+        self.context = context
+
+    def render(self, **recipient: Any) -> str:
+        return self.template.render(self.context, **recipient)
+
+
+class TemplateRegistry:
+    """
+    Email templates compiled once into a shared Jinja ``Environment``.
+
+    A template ``name`` may have a ``name/shared`` part holding everything that
+    is the same for all recipients; ``prepare`` renders it once and passes it
+    to ``name`` as ``shared``, so per-recipient rendering stays small.
+    """
+
+    def __init__(self, templates: Dict[str, str], filters: Optional[Dict[str, Callable]] = None):
+        self.env = jinja2.Environment(
+            loader=jinja2.DictLoader(templates),
+            bytecode_cache=_bytecode_cache(),
+            auto_reload=False,
+        )
+        self.env.filters["number_format"] = number_format
+        self.env.filters.update(filters or {})
+        self.from_string = functools.lru_cache(maxsize=256)(self.env.from_string)
+
+    def get(self, name: str) -> jinja2.Template:
+        return self.env.get_template(name)
+
+    def render(self, name: str, **context: Any) -> str:
+        return self.get(name).render(**context)
+
+    def prepare(self, name: str, **context: Any) -> PreparedEmail:
+        shared_name = f"{name}/shared"
+        if shared_name in self.env.loader.mapping:
+            context["shared"] = Markup(self.render(shared_name, **context))
+        return PreparedEmail(self.get(name), context)
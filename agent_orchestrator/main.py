@@ -2,6 +2,7 @@ import asyncio
 import os
 from loguru import logger
 from orchestrator import AgentOrchestrator
+from utils import close_connections
 
 # Configure logging
 logger.add("/app/logs/main.log", rotation="1 day", retention="7 days", level="INFO")
@@ -30,6 +31,7 @@ async def main():
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
+        await close_connections()
         logger.info("Agent Orchestrator stopped.")
 
 if __name__ == "__main__":
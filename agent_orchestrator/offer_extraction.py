@@ -0,0 +1,176 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+# Every field is recognised by one alternative of a single scanner, so an email
+# is lowercased once and read in one pass; named groups tell which field hit.
+_DAYS = r"(?:iş\s+)?(?:günü|gün|gun|days?)"
+_AMOUNT = r"[₺$€]?\s*\d[\d.,]*"
+_CURRENCY = r"try|tl|usd|eur|₺|\$|€"
+
+_SCANNER = re.compile(
+    "|".join([
+        r"(?P<decline>maalesef|teklif veremiyoruz|üzgünüz|mevcut durumda|unfortunately|cannot provide)",
+        rf"(?P<price>(?P<price_label>toplam\s+fiyat|birim\s+fiyat|fiyat|tutar|ücret|total\s+price|unit\s+price|price)[^\n\d₺$€]*?(?P<price_amount>{_AMOUNT})\s*(?P<price_currency>{_CURRENCY})?)",
+        rf"(?P<delivery>(?:teslimat|teslim|delivery)[^\n\d]*?(?P<delivery_days>\d+)\s*{_DAYS})",
+        rf"(?P<validity>(?:geçerli|gecerli|valid)[^\n\d]*?(?P<validity_days>\d+)\s*{_DAYS})",
+        r"(?P<payment>(?:ödeme|odeme|payment)[^\n:]*:(?P<payment_terms>[^\n]*))",
+        r"(?P<warranty>(?:garanti|warranty)[^\n\d]*?\d+\s*(?:ay|yıl|yil|months?|years?))",
+        r"(?P<notes>not:(?P<notes_text>.+?)(?=\n\s*\n|$))",
+        rf"(?P<days>(?P<days_count>\d+)\s*{_DAYS})(?=[^\n]*?(?P<days_context>teslim|delivery|geçerli|gecerli|valid))",
+        rf"(?P<amount>(?P<amount_value>{_AMOUNT})\s*(?P<amount_currency>{_CURRENCY})\b)",
+        r"(?P<clarification>bilgi|detay|öğrenmek|sormak|additional information)",
+    ]),
+    re.DOTALL,
+)
+
+_FIELDS = ("decline", "price", "delivery", "validity", "payment", "warranty", "notes", "days", "amount", "clarification")
+
+_QUESTION_PATTERNS = [
+    re.compile(r"([^.!?]*\?[^.!?]*)"),
+    re.compile(r"- ([^-\n]+)"),
+    re.compile(r"• ([^•\n]+)"),
+    re.compile(r"\d+\.\s*([^\d\n]+)"),
+]
+
+_CURRENCIES = {"try": "TRY", "tl": "TRY", "₺": "TRY", "usd": "USD", "$": "USD", "eur": "EUR", "€": "EUR"}
+
+# How much a value is trusted, by how it was found
+PRICE_CONFIDENCE = {
+    "toplam fiyat": 0.95, "total price": 0.95, "fiyat": 0.9, "price": 0.9, "tutar": 0.85, "ücret": 0.8,
+    "birim fiyat": 0.6, "unit price": 0.6, None: 0.5,
+}
+FIELD_CONFIDENCE = {"labeled": 0.9, "context": 0.7, "text": 0.6}
+
+# Below this many emails a process pool costs more than it saves
+BATCH_POOL_THRESHOLD = 64
+
+
+def normalize_email_text(text: Any) -> str:
+    """Lowercase once (Turkish İ without a combining dot) with unified line breaks and spaces"""
+    text = str(text or "").replace("İ", "i").replace("\r\n", "\n").replace("\r", "\n").replace("\xa0", " ")
+    return text.lower()
+
+
+def parse_amount(raw: str) -> Optional[float]:
+    """'12,345.67' / '12.345,67' / '45.000' -> float (a lone separator before 3 digits groups thousands)"""
+    digits = raw.strip(" ₺$€").replace(" ", "")
+    if not digits:
+        return None
+    if "," in digits and "." in digits:
+        decimal = "," if digits.rfind(",") > digits.rfind(".") else "."
+        digits = digits.replace("." if decimal == "," else ",", "").replace(decimal, ".")
+    elif "," in digits or "." in digits:
+        separator = "," if "," in digits else "."
+        head, _, tail = digits.rpartition(separator)
+        if len(tail) == 3 or digits.count(separator) > 1:
+            digits = digits.replace(separator, "")
+        else:
+            digits = head.replace(separator, "") + "." + tail
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+def extract_questions(content: str, limit: int = 5) -> List[str]:
+    """Questions and list items of a clarification email"""
+    questions: List[str] = []
+    for pattern in _QUESTION_PATTERNS:
+        for match in pattern.findall(content):
+            question = match.strip()
+            if len(question) > 10 and question not in questions:
+                questions.append(question)
+    return questions[:limit]
+
+
+def extract_offer(content: Any, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """
+    Structured offer (or decline / clarification) from an email body.
+
+    Offers carry ``field_confidence`` per extracted field and an overall
+    ``confidence``; the best-labelled price wins when several are quoted.
+    """
+    text = normalize_email_text(content)
+    now = now or datetime.now()
+    found: Dict[str, Any] = {}
+    confidence: Dict[str, float] = {}
+    declined = clarification = False
+
+    def keep(field: str, value: Any, score: float) -> bool:
+        if value is None or score <= confidence.get(field, 0.0):
+            return False
+        found[field] = value
+        confidence[field] = score
+        return True
+
+    for match in _SCANNER.finditer(text):
+        kind = next(name for name in _FIELDS if match.group(name) is not None)
+        if kind == "decline":
+            declined = True
+        elif kind == "clarification":
+            clarification = True
+        elif kind == "price":
+            # Currency after the amount, or a leading symbol ($1,200.00)
+            currency = match.group("price_currency") or match.group("price_amount")[:1]
+            currency = currency if currency in _CURRENCIES else None
+            score = PRICE_CONFIDENCE[re.sub(r"\s+", " ", match.group("price_label"))] - (0 if currency else 0.1)
+            if keep("price", parse_amount(match.group("price_amount")), score):
+                found["currency"] = _CURRENCIES.get(currency, "TRY")
+        elif kind == "amount":
+            if keep("price", parse_amount(match.group("amount_value")), PRICE_CONFIDENCE[None]):
+                found["currency"] = _CURRENCIES[match.group("amount_currency")]
+        elif kind == "delivery":
+            keep("delivery_time", int(match.group("delivery_days")), FIELD_CONFIDENCE["labeled"])
+        elif kind == "validity":
+            keep("valid_until", _valid_until(now, match.group("validity_days")), FIELD_CONFIDENCE["labeled"])
+        elif kind == "days":
+            if match.group("days_context") in ("teslim", "delivery"):
+                keep("delivery_time", int(match.group("days_count")), FIELD_CONFIDENCE["context"])
+            else:
+                keep("valid_until", _valid_until(now, match.group("days_count")), FIELD_CONFIDENCE["context"])
+        elif kind == "payment":
+            keep("payment_terms", match.group("payment_terms").strip() or None, FIELD_CONFIDENCE["labeled"])
+        elif kind == "warranty":
+            keep("warranty", match.group("warranty").strip(), FIELD_CONFIDENCE["text"])
+        elif kind == "notes":
+            notes = match.group("notes_text").strip()
+            if notes:
+                found["notes"] = f"{found['notes']} | {notes}" if "notes" in found else notes
+                confidence["notes"] = FIELD_CONFIDENCE["text"]
+
+    if declined:
+        return {"type": "decline", "reason": "Tedarikçi teklif veremiyor"}
+    if clarification and "price" not in found:
+        return {"type": "clarification", "questions": extract_questions(text)}
+    if not found:
+        return None
+    found["type"] = "offer"
+    found["field_confidence"] = confidence
+    # A price is what makes an offer usable; other fields only add to it
+    found["confidence"] = round(confidence.get("price", 0.0) * 0.7 + 0.3 * sum(confidence.values()) / max(len(confidence), 1), 3)
+    return found
+
+
+def _valid_until(now: datetime, days: str) -> str:
+    return (now + timedelta(days=int(days))).isoformat()
+
+
+def extract_offers(contents: Iterable[Any]) -> List[Optional[Dict[str, Any]]]:
+    return [extract_offer(content) for content in contents]
+
+
+def extract_offers_parallel(
+    contents: List[Any],
+    executor: Optional[ProcessPoolExecutor] = None,
+    chunksize: int = 32,
+) -> List[Optional[Dict[str, Any]]]:
+    """Batch extraction for inbox backfills, spread over a process pool (in order)"""
+    if len(contents) < BATCH_POOL_THRESHOLD:
+        return extract_offers(contents)
+    if executor is not None:
+        return list(executor.map(extract_offer, contents, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        return list(pool.map(extract_offer, contents, chunksize=chunksize))
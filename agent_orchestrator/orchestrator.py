@@ -12,13 +12,16 @@ from agents import (
     SupplierVerifierAgent,
     AggregationReportAgent
 )
-from utils import get_redis_connection
+from utils import get_redis_connection, get_supabase_client, publish_job_event, run_blocking
+from queues import WeightedLanes, get_job_queue
 
 class AgentOrchestrator:
     """Orchestrates the entire agent workflow"""
     
     def __init__(self):
         self.redis_client = get_redis_connection()
+        # Agent stage transport (Redis lists or Streams, see queues.py)
+        self.queue = get_job_queue(self.redis_client)
         self.agents = {
             "rfq_intake": RFQIntakeAgent(),
             "supplier_discovery": SupplierDiscoveryAgent(),
@@ -41,6 +44,29 @@ class AgentOrchestrator:
             "supplier_verifier": "aggregation_report",
             "aggregation_report": None  # End of workflow
         }
+        
+        # Jobs processed in parallel per stage; I/O-bound stages get more slots.
+        # Override with AGENTIK_CONCURRENCY_<AGENT>, e.g. AGENTIK_CONCURRENCY_EMAIL_SEND=8
+        default_concurrency = {
+            "rfq_intake": 1,
+            "supplier_discovery": 2,
+            "email_send": 4,
+            "inbox_parser": 4,
+            "supplier_verifier": 4,
+            "aggregation_report": 1
+        }
+        self.concurrency = {
+            name: max(1, int(os.getenv(f"AGENTIK_CONCURRENCY_{name.upper()}", default_concurrency.get(name, 1))))
+            for name in self.agents
+        }
+        self._in_flight = {name: 0 for name in self.agents}
+        # Main queue lanes in priority order; agentik:jobs is the normal lane (see app/redis_client.py)
+        self.main_lanes = ["agentik:jobs:high", "agentik:jobs", "agentik:jobs:bulk"]
+        # Agent queues keep the same lanes and weights (see queues.py)
+        self._main_order = WeightedLanes(self.main_lanes)
+        self.lane_weights = self._main_order.weights
+        # How often due scheduled jobs are moved onto agent queues (seconds)
+        self.scheduler_interval = float(os.getenv("AGENTIK_SCHEDULER_INTERVAL", "1"))
     
     async def start(self):
         """Start the orchestrator and all agent workers"""
@@ -55,37 +81,47 @@ class AgentOrchestrator:
         for agent_name, agent in self.agents.items():
             worker = asyncio.create_task(self._run_agent_worker(agent_name, agent))
             agent_workers.append(worker)
+        # Start scheduled job promoter
+        scheduler = asyncio.create_task(self._promote_scheduled_jobs())
         # Start heartbeat
         self._hb_task = asyncio.create_task(self._heartbeat_loop())
         
         try:
             # Wait for all tasks to complete (they run indefinitely)
-            await asyncio.gather(job_processor, *agent_workers)
+            await asyncio.gather(job_processor, scheduler, *agent_workers)
         except KeyboardInterrupt:
             logger.info("Shutting down Agent Orchestrator...")
             self.running = False
             
             # Cancel all tasks
             job_processor.cancel()
+            scheduler.cancel()
             for worker in agent_workers:
                 worker.cancel()
             if self._hb_task:
                 self._hb_task.cancel()
 
+    def _main_poll_order(self) -> List[str]:
+        """Lane order for the next BRPOP (Redis pops from the first non-empty key)"""
+        return self._main_order.order()
+    
+    def _main_lane(self, priority: str) -> str:
+        return {"high": self.main_lanes[0], "bulk": self.main_lanes[2]}.get(priority, self.main_lanes[1])
+    
     async def _process_main_jobs(self):
-        """Process main job queue and route to first agent"""
-        logger.info("Started main job processor")
+        """Process main job queue lanes and route to first agent"""
+        logger.info(f"Started main job processor (lanes {self.main_lanes}, weights {self.lane_weights})")
         
         while self.running:
             try:
-                # Get job from main queue
-                result = self.redis_client.brpop("agentik:jobs", timeout=5)
+                # Get job from the main queue lanes
+                result = await self.redis_client.brpop(self._main_poll_order(), timeout=5)
                 
                 if result:
                     _, job_data_str = result
                     job_data = json.loads(job_data_str)
                     
-                    logger.info(f"Processing new job: {job_data.get('job_id')}")
+                    logger.info(f"Processing new job: {job_data.get('job_id')} ({job_data.get('priority', 'normal')})")
                     
                     # Route to first agent (RFQ Intake)
                     await self._route_to_agent("rfq_intake", job_data)
@@ -94,49 +130,108 @@ class AgentOrchestrator:
                 logger.error(f"Error in main job processor: {e}")
                 await asyncio.sleep(1)
     
-    async def _run_agent_worker(self, agent_name: str, agent):
-        """Run individual agent worker"""
-        queue_name = f"agentik:agent:{agent_name}"
-        logger.info(f"Started {agent_name} worker on queue {queue_name}")
+    async def _promote_scheduled_jobs(self):
+        """Move scheduled jobs whose due time has passed onto their agent queues"""
+        logger.info(f"Started scheduled job promoter (every {self.scheduler_interval}s)")
+        batch = 100
         
         while self.running:
             try:
-                # Get job from agent queue
-                result = self.redis_client.brpop(queue_name, timeout=5)
-                
-                if result:
-                    _, job_data_str = result
-                    job_data = json.loads(job_data_str)
-                    
-                    job_id = job_data.get("job_id")
-                    logger.info(f"[{agent_name}] Processing job {job_id}")
-                    
-                    # Update job status to in_progress
-                    self._update_job_status(job_id, "in_progress", {
-                        "current_agent": agent_name,
-                        "started_at": datetime.utcnow().isoformat()
-                    })
-                    
-                    # Process job with agent
-                    result = await agent.process(job_data)
-                    
-                    if result.get("success"):
-                        logger.info(f"[{agent_name}] Successfully processed job {job_id}")
-                    else:
-                        logger.error(f"[{agent_name}] Failed to process job {job_id}: {result.get('error')}")
-                    
+                moved = await self.queue.promote_due(limit=batch)
+                if moved:
+                    logger.info(f"Promoted {moved} scheduled job(s)")
+                if moved >= batch:
+                    # More may be due; drain before sleeping
+                    continue
             except Exception as e:
-                logger.error(f"Error in {agent_name} worker: {e}")
-                await asyncio.sleep(1)
+                logger.error(f"Error promoting scheduled jobs: {e}")
+            await asyncio.sleep(self.scheduler_interval)
+    
+    async def _run_agent_worker(self, agent_name: str, agent):
+        """Run individual agent worker with up to N jobs in flight"""
+        queue_name = self.queue.key(agent_name)
+        limit = self.concurrency.get(agent_name, 1)
+        slots = asyncio.Semaphore(limit)
+        logger.info(f"Started {agent_name} worker on queue {queue_name} ({self.queue.backend}, concurrency={limit})")
+        
+        async with asyncio.TaskGroup() as jobs:
+            while self.running:
+                # Backpressure: stop pulling from the queue while every slot is busy
+                await slots.acquire()
+                try:
+                    # Get job from agent queue
+                    queued = await self.queue.pop(agent_name, timeout=5)
+                except Exception as e:
+                    slots.release()
+                    logger.error(f"Error in {agent_name} worker: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                
+                if not queued:
+                    slots.release()
+                    # Let in-flight jobs run before polling again
+                    await asyncio.sleep(0)
+                    continue
+
+                jobs.create_task(self._handle_agent_job(agent_name, agent, queued, slots))
+                await asyncio.sleep(0)
+    
+    async def _handle_agent_job(self, agent_name: str, agent, queued, slots: asyncio.Semaphore):
+        """Process one queued job and free its worker slot"""
+        self._in_flight[agent_name] += 1
+        try:
+            job_data = queued.job_data
+            
+            job_id = job_data.get("job_id")
+            if queued.deliveries > self.queue.max_deliveries:
+                # Crashed on every previous attempt: stop redelivering it
+                await self._dead_letter(agent_name, queued)
+                return
+            logger.info(f"[{agent_name}] Processing job {job_id}")
+            
+            # Update job status to in_progress
+            await self._update_job_status(job_id, "in_progress", {
+                "current_agent": agent_name,
+                "started_at": datetime.utcnow().isoformat()
+            })
+            
+            # Process job with agent; the queue keeps its entry from being reclaimed meanwhile
+            async with self.queue.keep_alive(queued):
+                result = await agent.process(job_data)
+            
+            if result.get("success"):
+                logger.info(f"[{agent_name}] Successfully processed job {job_id}")
+            else:
+                logger.error(f"[{agent_name}] Failed to process job {job_id}: {result.get('error')}")
+            
+            # Agents record their own failures; only a crash leaves the job pending
+            await self.queue.ack(agent_name, queued)
+            
+        except Exception as e:
+            logger.error(f"Error in {agent_name} worker: {e}")
+        finally:
+            self._in_flight[agent_name] -= 1
+            slots.release()
+    
+    async def _dead_letter(self, agent_name: str, queued):
+        """Move a job that keeps crashing its worker to the dead-letter stream and fail it"""
+        job_id = queued.job_data.get("job_id")
+        reason = f"{agent_name} failed {queued.deliveries - 1} delivery attempts"
+        await self.queue.dead_letter(agent_name, queued, reason)
+        logger.error(f"[{agent_name}] Dead-lettered job {job_id}: {reason}")
+        await self._update_job_status(job_id, "failed", {
+            "error": reason,
+            "failed_agent": agent_name,
+            "dead_lettered_at": datetime.utcnow().isoformat()
+        })
     
     async def _route_to_agent(self, agent_name: str, job_data: Dict[str, Any]):
         """Route job to specific agent"""
-        queue_name = f"agentik:agent:{agent_name}"
-        self.redis_client.lpush(queue_name, json.dumps(job_data))
+        await self.queue.push(agent_name, job_data)
         logger.info(f"Routed job {job_data.get('job_id')} to {agent_name}")
     
-    def _update_job_status(self, job_id: str, status: str, result: Dict[str, Any] = None):
-        """Update job status in Redis"""
+    async def _update_job_status(self, job_id: str, status: str, result: Dict[str, Any] = None):
+        """Update job status in Redis and the Supabase jobs table"""
         updates = {
             "status": status,
             "updated_at": datetime.utcnow().isoformat()
@@ -145,7 +240,25 @@ class AgentOrchestrator:
         if result:
             updates["result"] = json.dumps(result)
         
-        self.redis_client.hset(f"agentik:status:{job_id}", mapping=updates)
+        await self.redis_client.hset(f"agentik:status:{job_id}", mapping=updates)
+        await publish_job_event(self.redis_client, job_id, {
+            "status": status,
+            "updated_at": updates["updated_at"],
+            "result": result
+        })
+        
+        # Same write-through as BaseAgent.update_job_status, so /orchestrate/history
+        # and /analytics/jobs see dead-lettered jobs as failed
+        try:
+            row = {"status": status, "updated_at": updates["updated_at"]}
+            if result:
+                row["result"] = result
+            if status == "failed" and result and result.get("error"):
+                row["error"] = result["error"]
+            query = get_supabase_client().table("jobs").update(row).eq("id", job_id)
+            await run_blocking(query.execute)
+        except Exception as e:
+            logger.warning(f"Persisting job {job_id} status failed: {e}")
     
     async def process_job(self, job_data: Dict[str, Any]) -> str:
         """Process a single job through the workflow"""
@@ -153,19 +266,23 @@ class AgentOrchestrator:
         logger.info(f"Starting workflow for job {job_id}")
         
         # Store initial job status
-        self._update_job_status(job_id, "queued", {
+        await self._update_job_status(job_id, "queued", {
             "workflow_started": True,
             "total_agents": len(self.workflow)
         })
         
-        # Add to main job queue
-        self.redis_client.lpush("agentik:jobs", json.dumps(job_data))
+        # Add to main job queue lane
+        await self.redis_client.lpush(self._main_lane(job_data.get("priority")), json.dumps(job_data))
         
         return job_id
     
-    def get_job_status(self, job_id: str) -> Dict[str, Any]:
+    async def _main_queue_size(self) -> int:
+        sizes = [await self.redis_client.llen(lane) for lane in self.main_lanes]
+        return sum(sizes)
+    
+    async def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """Get current job status"""
-        job_data = self.redis_client.hgetall(f"agentik:status:{job_id}")
+        job_data = await self.redis_client.hgetall(f"agentik:status:{job_id}")
         
         if not job_data:
             return None
@@ -179,22 +296,24 @@ class AgentOrchestrator:
             "error": job_data.get("error")
         }
     
-    def get_workflow_stats(self) -> Dict[str, Any]:
+    async def get_workflow_stats(self) -> Dict[str, Any]:
         """Get workflow statistics"""
         stats = {
             "total_agents": len(self.agents),
             "agents": list(self.agents.keys()),
             "workflow": self.workflow,
             "running": self.running,
+            "concurrency": self.concurrency,
+            "in_flight": dict(self._in_flight),
             "queue_sizes": {}
         }
         
         # Get queue sizes
-        stats["queue_sizes"]["main_queue"] = self.redis_client.llen("agentik:jobs")
+        stats["queue_sizes"]["main_queue"] = await self._main_queue_size()
         
         for agent_name in self.agents.keys():
-            queue_name = f"agentik:agent:{agent_name}"
-            stats["queue_sizes"][agent_name] = self.redis_client.llen(queue_name)
+            stats["queue_sizes"][agent_name] = await self.queue.size(agent_name)
+        stats["queue_sizes"]["scheduled"] = await self.queue.scheduled_count()
         
         return stats
     
@@ -212,7 +331,7 @@ class AgentOrchestrator:
         
         # Check Redis connection
         try:
-            self.redis_client.ping()
+            await self.redis_client.ping()
             health["redis"] = {"status": "healthy", "connected": True}
         except Exception as e:
             health["redis"] = {"status": "unhealthy", "error": str(e), "connected": False}
@@ -221,7 +340,7 @@ class AgentOrchestrator:
         for agent_name, agent in self.agents.items():
             health["agents"][agent_name] = {
                 "status": "healthy",  # In a real system, you might ping each agent
-                "queue_size": self.redis_client.llen(f"agentik:agent:{agent_name}")
+                "queue_size": await self.queue.size(agent_name)
             }
         
         return health
@@ -235,19 +354,21 @@ class AgentOrchestrator:
                         "ts": datetime.utcnow().isoformat(),
                         "running": self.running,
                         "version": self._version,
+                        "queue_backend": self.queue.backend,
+                        "in_flight": dict(self._in_flight),
                         "agents": list(self.agents.keys()),
                         "queues": {
-                            "main": self.redis_client.llen("agentik:jobs"),
+                            "main": await self._main_queue_size(),
+                            "scheduled": await self.queue.scheduled_count(),
                         },
                     }
                     for agent_name in self.agents.keys():
-                        qn = f"agentik:agent:{agent_name}"
                         try:
-                            snapshot["queues"][agent_name] = self.redis_client.llen(qn)
+                            snapshot["queues"][agent_name] = await self.queue.size(agent_name)
                         except Exception:
                             snapshot["queues"][agent_name] = None
                     # store as JSON string
-                    self.redis_client.set(self._hb_key, json.dumps(snapshot))
+                    await self.redis_client.set(self._hb_key, json.dumps(snapshot))
                 except Exception as e:
                     logger.warning(f"Heartbeat publish failed: {e}")
                 await asyncio.sleep(5)
@@ -0,0 +1,395 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Sequence, Union
+from loguru import logger
+import redis.asyncio as aioredis
+from redis.exceptions import ResponseError
+
+
+@dataclass
+class QueuedJob:
+    """A job taken from an agent queue plus the receipt needed to ack it"""
+    job_data: Dict[str, Any]
+    receipt: Optional[str] = None
+    # How many times the queue has handed this entry out (streams only; lists deliver once)
+    deliveries: int = 1
+    # Stream the entry was read from (the lane's key), needed to ack it
+    key: Optional[str] = None
+
+
+SCHEDULED_KEY = "agentik:scheduled"
+
+# Priority lanes in priority order; "normal" keeps the unsuffixed key names
+LANES = ("high", "normal", "bulk")
+
+
+def job_lane(job_data: Dict[str, Any]) -> str:
+    """Lane of a job envelope from its ``priority`` field (unknown values are normal)"""
+    priority = job_data.get("priority")
+    return priority if priority in LANES else "normal"
+
+
+def lane_weights(count: int = len(LANES)) -> List[int]:
+    """Per-lane weights from AGENTIK_LANE_WEIGHTS (default 8,3,1), padded with 1"""
+    weights = [max(1, int(w)) for w in os.getenv("AGENTIK_LANE_WEIGHTS", "8,3,1").split(",")][:count]
+    return weights + [1] * (count - len(weights))
+
+
+class WeightedLanes:
+    """Smooth weighted round-robin over which lane is checked first.
+
+    ``order`` returns the keys for the next multi-key BRPOP/XREADGROUP: the
+    lane with the most credit first, then the rest in priority order. Bulk
+    jobs therefore still advance while high-priority jobs keep arriving.
+    """
+
+    def __init__(self, keys: Sequence[str], weights: Optional[Sequence[int]] = None):
+        self.keys = list(keys)
+        self.weights = list(weights or lane_weights(len(self.keys)))
+        self._credits = [0] * len(self.keys)
+
+    def order(self) -> List[str]:
+        for i, weight in enumerate(self.weights):
+            self._credits[i] += weight
+        first = max(range(len(self.keys)), key=lambda i: self._credits[i])
+        self._credits[first] -= sum(self.weights)
+        return [self.keys[first]] + [k for i, k in enumerate(self.keys) if i != first]
+
+# Moves due members of the schedule onto their agent queues in one atomic step.
+# A member is only pushed when this call removed it (ZREM == 1), so concurrent
+# promoters on several replicas never deliver a job twice.
+# KEYS[1] is the schedule, KEYS[i + 1] the destination queue of ARGV[i + 2];
+# ARGV: backend, maxlen, then the members ("<uuid>\n<agent>\n<job json>").
+_PROMOTE_DUE_LUA = r"""
+local moved = 0
+for i = 3, #ARGV do
+  local member = ARGV[i]
+  if redis.call('ZREM', KEYS[1], member) == 1 then
+    local first = string.find(member, '\n', 1, true)
+    local second = string.find(member, '\n', first + 1, true)
+    local job = string.sub(member, second + 1)
+    if ARGV[1] == 'streams' then
+      redis.call('XADD', KEYS[i - 1], 'MAXLEN', '~', ARGV[2], '*', 'job', job)
+    else
+      redis.call('LPUSH', KEYS[i - 1], job)
+    end
+    moved = moved + 1
+  end
+end
+return moved
+"""
+
+
+def _due_timestamp(not_before: Union[datetime, float, int]) -> float:
+    """Epoch seconds for a due time; naive datetimes are treated as UTC"""
+    if isinstance(not_before, datetime):
+        if not_before.tzinfo is None:
+            not_before = not_before.replace(tzinfo=timezone.utc)
+        return not_before.timestamp()
+    return float(not_before)
+
+
+class ScheduledJobsMixin:
+    """Delayed delivery for agent queues via the ``agentik:scheduled`` sorted set.
+
+    Jobs are scored by due time and moved to their agent queue by
+    ``promote_due``, which the orchestrator calls from its scheduler loop.
+    Workers therefore only ever receive jobs that are due.
+    """
+
+    _promote_script = None
+
+    async def schedule(self, agent_name: str, job_data: Dict[str, Any], not_before: Union[datetime, float, int]):
+        member = f"{uuid.uuid4()}\n{agent_name}\n{json.dumps(job_data)}"
+        await self.redis_client.zadd(SCHEDULED_KEY, {member: _due_timestamp(not_before)})
+
+    async def promote_due(self, limit: int = 100) -> int:
+        """Move up to ``limit`` due jobs to their agent queues; returns how many moved"""
+        due = await self.redis_client.zrangebyscore(SCHEDULED_KEY, "-inf", time.time(), start=0, num=limit)
+        if not due:
+            return 0
+        # Destinations are resolved here so the script declares every key it touches
+        keys = [SCHEDULED_KEY]
+        for member in due:
+            _, agent_name, job = member.split("\n", 2)
+            keys.append(self._destination_key(agent_name, job))
+        if self._promote_script is None:
+            self._promote_script = self.redis_client.register_script(_PROMOTE_DUE_LUA)
+        moved = await self._promote_script(keys=keys, args=[self.backend, getattr(self, "maxlen", 0), *due])
+        return int(moved or 0)
+
+    def _destination_key(self, agent_name: str, job: str) -> str:
+        return self.key(agent_name, job_lane(json.loads(job)))
+
+    def lane_keys(self, agent_name: str) -> List[str]:
+        """The agent's queue keys in lane priority order"""
+        return [self.key(agent_name, lane) for lane in LANES]
+
+    def _poll_order(self, agent_name: str) -> List[str]:
+        """Lane keys of an agent in weighted order for the next pop"""
+        lanes = self._lanes.get(agent_name)
+        if lanes is None:
+            lanes = self._lanes[agent_name] = WeightedLanes(self.lane_keys(agent_name))
+        return lanes.order()
+
+    async def scheduled_count(self) -> int:
+        return await self.redis_client.zcard(SCHEDULED_KEY)
+
+
+class ListJobQueue(ScheduledJobsMixin):
+    """Agent queues on Redis lists (LPUSH/BRPOP). Popped jobs are not acknowledged.
+
+    Every stage has one list per priority lane (``agentik:agent:{agent}``,
+    ``...:high``, ``...:bulk``); jobs are pushed to the lane of their
+    envelope's ``priority`` and popped with the weighted multi-key BRPOP used
+    for the main queue, so a job keeps its priority through the whole workflow.
+    """
+
+    backend = "list"
+    max_deliveries = 1
+
+    def __init__(self, redis_client: aioredis.Redis):
+        self.redis_client = redis_client
+        self._lanes: Dict[str, WeightedLanes] = {}
+
+    def key(self, agent_name: str, lane: str = "normal") -> str:
+        base = f"agentik:agent:{agent_name}"
+        return base if lane == "normal" else f"{base}:{lane}"
+
+    async def push(self, agent_name: str, job_data: Dict[str, Any]):
+        await self.redis_client.lpush(self.key(agent_name, job_lane(job_data)), json.dumps(job_data))
+
+    async def pop(self, agent_name: str, timeout: int = 5) -> Optional[QueuedJob]:
+        result = await self.redis_client.brpop(self._poll_order(agent_name), timeout=timeout)
+        if not result:
+            return None
+        key, job_data_str = result
+        return QueuedJob(json.loads(job_data_str), key=key)
+
+    async def ack(self, agent_name: str, queued: QueuedJob):
+        """Nothing to acknowledge: BRPOP already removed the job"""
+        return None
+
+    @asynccontextmanager
+    async def keep_alive(self, queued: QueuedJob):
+        """Popped list jobs are never redelivered, so there is nothing to keep alive"""
+        yield
+
+    async def dead_letter(self, agent_name: str, queued: QueuedJob, reason: str):
+        """Lists never redeliver, so nothing is ever dead-lettered"""
+        return None
+
+    async def size(self, agent_name: str) -> int:
+        return sum([await self.redis_client.llen(key) for key in self.lane_keys(agent_name)])
+
+
+class StreamJobQueue(ScheduledJobsMixin):
+    """Agent queues on Redis Streams with a shared consumer group.
+
+    Each agent stage is a stream ``agentik:stream:{agent}`` read by the
+    ``agentik:workers`` group. A job stays in the group's pending entries list
+    until the worker acks it, so a crashed worker's jobs are reclaimed with
+    XAUTOCLAIM by any replica once they have been idle for ``claim_idle_ms``.
+    Like the list backend, every stage has one stream per priority lane
+    (``agentik:stream:{agent}``, ``...:high``, ``...:bulk``) read in weighted
+    order, so a job keeps its priority through the whole workflow.
+    While a job runs, ``keep_alive`` re-claims its entry with ``XCLAIM ... JUSTID``
+    every ``heartbeat_ms``, which resets the idle time without counting a
+    delivery, so long-running jobs are never reclaimed while still in flight.
+    An entry handed out more than ``max_deliveries`` times is a poison message:
+    the orchestrator moves it to ``agentik:deadletter:{agent}`` with
+    ``dead_letter`` instead of processing it again.
+    """
+
+    backend = "streams"
+
+    def __init__(self, redis_client: aioredis.Redis, group: Optional[str] = None, consumer: Optional[str] = None):
+        self.redis_client = redis_client
+        self.group = group or os.getenv("AGENTIK_STREAM_GROUP", "agentik:workers")
+        self.consumer = consumer or os.getenv("AGENTIK_STREAM_CONSUMER") or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle_ms = int(os.getenv("AGENTIK_STREAM_CLAIM_IDLE_MS", "60000"))
+        self.claim_interval = float(os.getenv("AGENTIK_STREAM_CLAIM_INTERVAL", "15"))
+        self.maxlen = int(os.getenv("AGENTIK_STREAM_MAXLEN", "100000"))
+        self.max_deliveries = max(1, int(os.getenv("AGENTIK_STREAM_MAX_DELIVERIES", "5")))
+        self.heartbeat_ms = int(os.getenv("AGENTIK_STREAM_HEARTBEAT_MS", "0")) or max(1, self.claim_idle_ms // 3)
+        self._groups_ready = set()
+        # Stream key -> ids this consumer is processing right now
+        self._in_flight: Dict[str, set] = {}
+        self._last_claim: Dict[str, float] = {}
+        self._lanes: Dict[str, WeightedLanes] = {}
+        # Entries a multi-stream XREADGROUP delivered beyond the one returned
+        self._delivered: Dict[str, Deque[QueuedJob]] = {}
+
+    def key(self, agent_name: str, lane: str = "normal") -> str:
+        base = f"agentik:stream:{agent_name}"
+        return base if lane == "normal" else f"{base}:{lane}"
+
+    def dead_letter_key(self, agent_name: str) -> str:
+        return f"agentik:deadletter:{agent_name}"
+
+    async def _ensure_group(self, key: str):
+        if key in self._groups_ready:
+            return
+        try:
+            await self.redis_client.xgroup_create(key, self.group, id="0", mkstream=True)
+            logger.info(f"Created consumer group {self.group} on {key}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups_ready.add(key)
+
+    async def push(self, agent_name: str, job_data: Dict[str, Any]):
+        key = self.key(agent_name, job_lane(job_data))
+        await self._ensure_group(key)
+        await self.redis_client.xadd(key, {"job": json.dumps(job_data)}, maxlen=self.maxlen, approximate=True)
+
+    async def pop(self, agent_name: str, timeout: int = 5) -> Optional[QueuedJob]:
+        delivered = self._delivered.setdefault(agent_name, deque())
+        if delivered:
+            return delivered.popleft()
+
+        keys = self.lane_keys(agent_name)
+        for key in keys:
+            # XREADGROUP fails on any listed stream without the group
+            await self._ensure_group(key)
+
+        now = time.monotonic()
+        for key in keys:
+            if now - self._last_claim.get(key, 0.0) >= self.claim_interval:
+                claimed = await self._reclaim(key)
+                if claimed:
+                    # Keep draining stuck entries before reading new ones
+                    return claimed
+                self._last_claim[key] = now
+
+        # COUNT applies per stream, so one call may deliver an entry from each lane;
+        # replies follow the requested (weighted) order and the rest wait in _delivered
+        entries = await self.redis_client.xreadgroup(
+            self.group, self.consumer, {key: ">" for key in self._poll_order(agent_name)},
+            count=1, block=max(1, int(timeout * 1000))
+        )
+        for key, messages in entries or []:
+            for message_id, fields in messages:
+                queued = await self._decode(key, message_id, fields)
+                if queued:
+                    delivered.append(queued)
+        return delivered.popleft() if delivered else None
+
+    async def _reclaim(self, key: str) -> Optional[QueuedJob]:
+        """Take over one entry another consumer left pending for too long"""
+        in_flight = self._in_flight.get(key, set())
+        reply = await self.redis_client.xautoclaim(
+            key, self.group, self.consumer, min_idle_time=self.claim_idle_ms, start_id="0-0",
+            count=len(in_flight) + 1
+        )
+        # Redis >= 7 returns [next_id, messages, deleted_ids]; 6.2 omits deleted_ids
+        messages = reply[1] if reply and len(reply) > 1 else []
+        for message_id, fields in messages:
+            if message_id in in_flight:
+                # Our own running job whose heartbeat was late (e.g. a blocked loop)
+                continue
+            if fields is None:
+                # Entry was trimmed from the stream while pending
+                await self.redis_client.xack(key, self.group, message_id)
+                continue
+            deliveries = await self._deliveries(key, message_id)
+            logger.warning(f"Reclaimed stuck job entry {message_id} on {key} (delivery {deliveries})")
+            return await self._decode(key, message_id, fields, deliveries)
+        return None
+
+    async def _deliveries(self, key: str, message_id: str) -> int:
+        """Delivery counter of a pending entry (XPENDING times_delivered)"""
+        pending = await self.redis_client.xpending_range(key, self.group, min=message_id, max=message_id, count=1)
+        return int(pending[0]["times_delivered"]) if pending else 1
+
+    async def _decode(self, key: str, message_id: str, fields: Dict[str, Any], deliveries: int = 1) -> Optional[QueuedJob]:
+        try:
+            return QueuedJob(json.loads(fields["job"]), receipt=message_id, deliveries=deliveries, key=key)
+        except Exception as e:
+            logger.error(f"Dropping malformed entry {message_id} on {key}: {e}")
+            await self.redis_client.xack(key, self.group, message_id)
+            return None
+
+    async def ack(self, agent_name: str, queued: QueuedJob):
+        if queued.receipt:
+            await self.redis_client.xack(queued.key or self.key(agent_name), self.group, queued.receipt)
+
+    @asynccontextmanager
+    async def keep_alive(self, queued: QueuedJob):
+        """Heartbeat the entry's pending state for as long as the job runs"""
+        key = queued.key
+        if not queued.receipt or not key:
+            yield
+            return
+        in_flight = self._in_flight.setdefault(key, set())
+        in_flight.add(queued.receipt)
+        heartbeat = asyncio.create_task(self._heartbeat(key, queued.receipt))
+        try:
+            yield
+        finally:
+            heartbeat.cancel()
+            in_flight.discard(queued.receipt)
+
+    async def _heartbeat(self, key: str, message_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_ms / 1000)
+            try:
+                # JUSTID: resets the idle time and leaves times_delivered alone
+                await self.redis_client.xclaim(key, self.group, self.consumer, 0, [message_id], justid=True)
+            except Exception as e:
+                logger.warning(f"Heartbeat for {message_id} on {key} failed: {e}")
+
+    async def dead_letter(self, agent_name: str, queued: QueuedJob, reason: str):
+        """Park a poison entry on the dead-letter stream and ack it so it is never reclaimed again"""
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.xadd(
+            self.dead_letter_key(agent_name),
+            {
+                "job": json.dumps(queued.job_data),
+                "source": queued.key or self.key(agent_name),
+                "message_id": queued.receipt or "",
+                "deliveries": queued.deliveries,
+                "reason": reason,
+            },
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+        pipe.xack(queued.key or self.key(agent_name), self.group, queued.receipt)
+        await pipe.execute()
+
+    async def size(self, agent_name: str) -> int:
+        """Entries not yet delivered to the group plus entries awaiting ack, over all lanes"""
+        return sum([await self._stream_size(key) for key in self.lane_keys(agent_name)])
+
+    async def _stream_size(self, key: str) -> int:
+        try:
+            groups = await self.redis_client.xinfo_groups(key)
+        except ResponseError:
+            return 0
+        for group in groups:
+            if group.get("name") == self.group:
+                lag = group.get("lag")
+                pending = group.get("pending") or 0
+                if lag is None:
+                    # Redis < 7 has no lag field; the stream length is the upper bound
+                    return await self.redis_client.xlen(key)
+                return int(lag) + int(pending)
+        return await self.redis_client.xlen(key)
+
+
+def get_job_queue(redis_client: aioredis.Redis):
+    """Return the agent queue backend selected by AGENTIK_QUEUE_BACKEND (list|streams)"""
+    backend = os.getenv("AGENTIK_QUEUE_BACKEND", "list").strip().lower()
+    if backend == "streams":
+        return StreamJobQueue(redis_client)
+    if backend != "list":
+        logger.warning(f"Unknown AGENTIK_QUEUE_BACKEND '{backend}', using list")
+    return ListJobQueue(redis_client)
@@ -1,23 +1,117 @@
-import redis
+import asyncio
+import json
+import redis.asyncio as aioredis
 import os
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 from loguru import logger
 
-def get_redis_connection() -> redis.Redis:
-    """Get Redis connection with proper configuration"""
-    try:
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        client = redis.from_url(redis_url, decode_responses=True)
-        
-        # Test connection
-        client.ping()
-        logger.info(f"Connected to Redis at {redis_url}")
-        
-        return client
+# Process-wide client registry: every agent and the orchestrator share these
+_registry_lock = threading.Lock()
+_redis_client: Optional[aioredis.Redis] = None
+_supabase_client = None
+
+# Bounded pool for blocking client calls (supabase-py is synchronous)
+_blocking_executor: Optional[ThreadPoolExecutor] = None
+
+def get_redis_connection() -> aioredis.Redis:
+    """Get the shared asyncio Redis client with proper configuration.
+
+    All callers share one connection pool of at most ``REDIS_MAX_CONNECTIONS``
+    (default 32). When the pool is exhausted callers wait up to
+    ``REDIS_POOL_TIMEOUT`` seconds for a free connection instead of opening a new
+    one, and idle connections are pinged every ``REDIS_HEALTH_CHECK_INTERVAL``
+    seconds before reuse. Connections are established lazily; callers check the
+    server with ``await client.ping()``.
+    """
+    global _redis_client
+    with _registry_lock:
+        if _redis_client is not None:
+            return _redis_client
+        try:
+            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+            pool = aioredis.BlockingConnectionPool.from_url(
+                redis_url,
+                decode_responses=True,
+                max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "32")),
+                timeout=int(os.getenv("REDIS_POOL_TIMEOUT", "20")),
+                health_check_interval=int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")),
+                socket_keepalive=True,
+            )
+            _redis_client = aioredis.Redis(connection_pool=pool)
+            logger.info(f"Configured shared Redis pool at {redis_url} (max {pool.max_connections} connections)")
+            
+            return _redis_client
+            
+        except Exception as e:
+            logger.error(f"Failed to configure Redis: {e}")
+            raise
+
+def get_supabase_client():
+    """Get the shared Supabase client (service role when available)."""
+    global _supabase_client
+    with _registry_lock:
+        if _supabase_client is not None:
+            return _supabase_client
+        from supabase import create_client
         
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
+        if not supabase_url or not supabase_key:
+            raise RuntimeError("Missing Supabase configuration. Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY/ANON_KEY")
+        _supabase_client = create_client(supabase_url, supabase_key)
+        logger.info("Initialized shared Supabase client")
+        return _supabase_client
+
+async def close_connections():
+    """Release the shared Redis pool (called on orchestrator shutdown)."""
+    global _redis_client
+    with _registry_lock:
+        client, _redis_client = _redis_client, None
+    if client is not None:
+        await client.aclose()
+    if _blocking_executor is not None:
+        _blocking_executor.shutdown(wait=False)
+
+async def run_blocking(fn: Callable[..., Any], *args) -> Any:
+    """Run a blocking call (e.g. a supabase ``query.execute``) off the event loop.
+
+    Calls share one thread pool sized by ``AGENTIK_DB_THREADS`` (default 8), so a
+    slow database cannot spawn unbounded threads.
+    """
+    global _blocking_executor
+    if _blocking_executor is None:
+        _blocking_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("AGENTIK_DB_THREADS", "8")),
+            thread_name_prefix="agentik-db",
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, fn, *args)
+
+async def bulk_insert(supabase, table: str, rows: List[Dict[str, Any]], on_conflict: Optional[str] = None, chunk_size: int = 500) -> List[Dict[str, Any]]:
+    """Insert ``rows`` with one multi-row PostgREST request per ``chunk_size`` rows.
+
+    With ``on_conflict`` (a unique column list) rows hitting an existing key are
+    skipped (``ON CONFLICT DO NOTHING``); only newly inserted rows are returned.
+    """
+    inserted: List[Dict[str, Any]] = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if on_conflict:
+            query = supabase.table(table).upsert(chunk, on_conflict=on_conflict, ignore_duplicates=True)
+        else:
+            query = supabase.table(table).insert(chunk)
+        response = await run_blocking(query.execute)
+        inserted.extend(response.data or [])
+    return inserted
+
+async def publish_job_event(redis_client: aioredis.Redis, job_id: str, event: Dict[str, Any]):
+    """Publish a job status transition on ``agentik:events:{job_id}`` (read by the SSE endpoint)"""
+    try:
+        await redis_client.publish(f"agentik:events:{job_id}", json.dumps({"job_id": job_id, **event}, default=str))
     except Exception as e:
-        logger.error(f"Failed to connect to Redis: {e}")
-        raise
+        logger.warning(f"Publishing event for job {job_id} failed: {e}")
 
 def format_currency(amount: float, currency: str = "USD") -> str:
     """Format currency amount"""
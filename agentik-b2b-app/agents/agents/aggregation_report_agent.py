@@ -3,13 +3,81 @@ from typing import Dict, Any, Optional, List
 from loguru import logger
 from core.database import get_db_pool
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import statistics
 import pandas as pd
 from io import BytesIO
 import base64
 from jinja2 import Template
 
+# Daily counters for every day in [$1, $2] in one statement. Each table is read once
+# over a created_at range (DATE(created_at) = $1 cannot use an index) and grouped by day.
+DAILY_METRICS_QUERY = """
+    WITH days AS (
+        SELECT generate_series($1::date, $2::date, interval '1 day')::date AS day
+    ),
+    rfq_counts AS (
+        SELECT created_at::date AS day,
+               count(*) AS total_rfqs,
+               count(*) FILTER (WHERE status = 'published') AS published_rfqs
+        FROM rfqs
+        WHERE created_at >= $1::date AND created_at < $2::date + 1
+        GROUP BY 1
+    ),
+    offer_counts AS (
+        SELECT created_at::date AS day, count(*) AS total_offers
+        FROM offers
+        WHERE created_at >= $1::date AND created_at < $2::date + 1
+        GROUP BY 1
+    ),
+    email_counts AS (
+        SELECT created_at::date AS day, count(*) AS emails_sent
+        FROM email_logs
+        WHERE status = 'sent' AND created_at >= $1::date AND created_at < $2::date + 1
+        GROUP BY 1
+    ),
+    new_supplier_counts AS (
+        SELECT created_at::date AS day, count(*) AS new_suppliers
+        FROM suppliers
+        WHERE created_at >= $1::date AND created_at < $2::date + 1
+        GROUP BY 1
+    ),
+    verified_supplier_counts AS (
+        SELECT verification_date::date AS day, count(*) AS verified_suppliers
+        FROM suppliers
+        WHERE verification_date >= $1::date AND verification_date < $2::date + 1
+        GROUP BY 1
+    )
+    SELECT d.day,
+           COALESCE(r.total_rfqs, 0) AS total_rfqs,
+           COALESCE(r.published_rfqs, 0) AS published_rfqs,
+           COALESCE(o.total_offers, 0) AS total_offers,
+           COALESCE(e.emails_sent, 0) AS emails_sent,
+           COALESCE(n.new_suppliers, 0) AS new_suppliers,
+           COALESCE(v.verified_suppliers, 0) AS verified_suppliers
+    FROM days d
+    LEFT JOIN rfq_counts r USING (day)
+    LEFT JOIN offer_counts o USING (day)
+    LEFT JOIN email_counts e USING (day)
+    LEFT JOIN new_supplier_counts n USING (day)
+    LEFT JOIN verified_supplier_counts v USING (day)
+    ORDER BY d.day
+"""
+
+DAILY_METRIC_KEYS = ('total_rfqs', 'published_rfqs', 'total_offers', 'emails_sent', 'new_suppliers', 'verified_suppliers')
+
+# Longest range a single backfill task may cover
+MAX_BACKFILL_DAYS = 366
+
+
+def as_date(value) -> date:
+    """Task payloads carry dates as ISO strings; asyncpg needs ``date`` objects"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
 class AggregationReportAgent(BaseAgent):
     """Agent responsible for aggregating data and generating reports"""
     
@@ -28,6 +96,8 @@ class AggregationReportAgent(BaseAgent):
             
             if task_type == 'generate_daily_report':
                 return await self._generate_daily_report(task_data)
+            elif task_type == 'backfill_daily_reports':
+                return await self._backfill_daily_reports(task_data)
             elif task_type == 'generate_rfq_analysis':
                 return await self._generate_rfq_analysis(task_data)
             elif task_type == 'generate_supplier_report':
@@ -45,7 +115,7 @@ class AggregationReportAgent(BaseAgent):
             
     async def _generate_daily_report(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate daily system performance report"""
-        target_date = task_data.get('date', datetime.now().date())
+        target_date = as_date(task_data.get('date') or datetime.now().date())
         
         # Collect daily metrics
         metrics = await self._collect_daily_metrics(target_date)
@@ -62,7 +132,7 @@ class AggregationReportAgent(BaseAgent):
         }
         
         # Store report
-        await self._store_report('daily_report', target_date, report)
+        await self._store_report('daily_report', str(target_date), report)
         
         # Trigger notifications if needed
         await self._check_and_trigger_alerts(metrics)
@@ -74,6 +144,44 @@ class AggregationReportAgent(BaseAgent):
             "metrics_collected": len(metrics)
         }
         
+    async def _backfill_daily_reports(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Daily reports for a range of days (default: the last 7) from a single metrics query"""
+        end_date = as_date(task_data.get('end_date') or datetime.now().date())
+        start_date = as_date(task_data.get('start_date') or end_date - timedelta(days=6))
+        
+        if start_date > end_date:
+            return {"error": "start_date is after end_date"}
+        if (end_date - start_date).days >= MAX_BACKFILL_DAYS:
+            return {"error": f"Backfill range is limited to {MAX_BACKFILL_DAYS} days"}
+        
+        metrics_by_day = await self._collect_metrics_range(start_date, end_date)
+        if not metrics_by_day:
+            return {"error": "Could not collect metrics"}
+        
+        generated_at = datetime.now().isoformat()
+        reports = []
+        for day, metrics in metrics_by_day.items():
+            reports.append((str(day), {
+                'date': str(day),
+                'metrics': metrics,
+                'insights': await self._generate_daily_insights(metrics),
+                'generated_at': generated_at
+            }))
+        
+        await self._store_reports('daily_report', reports)
+        
+        # Range totals double as the weekly summary
+        totals = {key: sum(metrics[key] for metrics in metrics_by_day.values()) for key in DAILY_METRIC_KEYS}
+        
+        return {
+            "success": True,
+            "report_type": "daily_report",
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "reports_stored": len(reports),
+            "totals": totals
+        }
+        
     async def _generate_rfq_analysis(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate RFQ performance analysis"""
         rfq_id = task_data.get('rfq_id')
@@ -179,47 +287,22 @@ class AggregationReportAgent(BaseAgent):
         
     async def _collect_daily_metrics(self, date) -> Dict[str, Any]:
         """Collect daily system metrics"""
+        day = as_date(date)
+        metrics_by_day = await self._collect_metrics_range(day, day)
+        return metrics_by_day.get(day, {})
+        
+    async def _collect_metrics_range(self, start_date: date, end_date: date) -> Dict[date, Dict[str, Any]]:
+        """Daily metrics for every day in [start_date, end_date] (one query)"""
         db_pool = get_db_pool()
         if not db_pool:
             return {}
             
         try:
             async with db_pool.acquire() as connection:
-                # RFQ metrics
-                rfq_count = await connection.fetchval(
-                    "SELECT COUNT(*) FROM rfqs WHERE DATE(created_at) = $1", date
-                )
-                
-                published_rfqs = await connection.fetchval(
-                    "SELECT COUNT(*) FROM rfqs WHERE DATE(created_at) = $1 AND status = 'published'", date
-                )
-                
-                # Offer metrics
-                offer_count = await connection.fetchval(
-                    "SELECT COUNT(*) FROM offers WHERE DATE(created_at) = $1", date
-                )
-                
-                # Email metrics
-                emails_sent = await connection.fetchval(
-                    "SELECT COUNT(*) FROM email_logs WHERE DATE(created_at) = $1 AND status = 'sent'", date
-                )
-                
-                # Supplier metrics
-                new_suppliers = await connection.fetchval(
-                    "SELECT COUNT(*) FROM suppliers WHERE DATE(created_at) = $1", date
-                )
-                
-                verified_suppliers = await connection.fetchval(
-                    "SELECT COUNT(*) FROM suppliers WHERE DATE(verification_date) = $1", date
-                )
-                
+                rows = await connection.fetch(DAILY_METRICS_QUERY, start_date, end_date)
                 return {
-                    'total_rfqs': rfq_count or 0,
-                    'published_rfqs': published_rfqs or 0,
-                    'total_offers': offer_count or 0,
-                    'emails_sent': emails_sent or 0,
-                    'new_suppliers': new_suppliers or 0,
-                    'verified_suppliers': verified_suppliers or 0
+                    row['day']: {key: row[key] for key in DAILY_METRIC_KEYS}
+                    for row in rows
                 }
                 
         except Exception as e:
@@ -375,13 +458,17 @@ class AggregationReportAgent(BaseAgent):
         
     async def _store_report(self, report_type: str, identifier: str, report_data: Dict[str, Any]):
         """Store generated report in database"""
+        await self._store_reports(report_type, [(identifier, report_data)])
+        
+    async def _store_reports(self, report_type: str, reports: List[tuple]):
+        """Store ``(identifier, report_data)`` pairs in one ``executemany``"""
         db_pool = get_db_pool()
-        if not db_pool:
+        if not db_pool or not reports:
             return
             
         try:
             async with db_pool.acquire() as connection:
-                await connection.execute(
+                await connection.executemany(
                     """
                     INSERT INTO system_reports 
                     (report_type, identifier, report_data, created_at)
@@ -391,7 +478,7 @@ class AggregationReportAgent(BaseAgent):
                         report_data = $3,
                         updated_at = NOW()
                     """,
-                    report_type, identifier, json.dumps(report_data)
+                    [(report_type, str(identifier), json.dumps(report_data)) for identifier, report_data in reports]
                 )
         except Exception as e:
             logger.error(f"Error storing report: {e}")
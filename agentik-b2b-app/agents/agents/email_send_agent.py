@@ -1,13 +1,94 @@
 from core.base_agent import BaseAgent
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from loguru import logger
-from core.database import get_db_pool
+from core.database import get_db_pool, insert_many
+from core.smtp_pool import SMTPPool
+from core.email_templates import TemplateRegistry
+from core.inbox_sync import remember_threads
+from core.redis_client import get_redis
 import json
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import make_msgid
 import os
-from jinja2 import Template
+from datetime import datetime, timezone
+
+# Email templates, compiled once; "/shared" parts are rendered once per RFQ
+EMAIL_TEMPLATES = {
+    "rfq_invitation": """
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2 style="color: #2563eb;">🎯 Yeni RFQ Daveti</h2>
+                
+                <p>Merhaba {% if supplier_name %}{{ supplier_name }}{% else %}Değerli Tedarikçi{% endif %},</p>
+                {{ shared }}""",
+    "rfq_invitation/shared": """
+                <p>Aşağıdaki RFQ için teklif vermenizi bekliyoruz:</p>
+                
+                <div style="background: #f8fafc; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3 style="margin: 0 0 10px 0; color: #1e40af;">{{ title }}</h3>
+                    <p><strong>Kategori:</strong> {{ category }}</p>
+                    <p><strong>Açıklama:</strong></p>
+                    <p style="margin-left: 20px;">{{ description }}</p>
+                    {% if deadline_date %}
+                    <p><strong>Son Tarih:</strong> {{ deadline_date }}</p>
+                    {% endif %}
+                    {% if budget_max %}
+                    <p><strong>Bütçe:</strong> ₺{{ budget_max|number_format }}</p>
+                    {% endif %}
+                </div>
+                
+                <p>Bu fırsatı değerlendirmek için platformumuzu ziyaret edin ve teklifinizi gönderin.</p>
+                
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="#" style="background: #2563eb; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Teklif Ver</a>
+                </div>
+                
+                <p>Sorularınız için bizimle iletişime geçebilirsiniz.</p>
+                
+                <p>Saygılarımızla,<br>
+                <strong>Agentik B2B Ekibi</strong></p>
+                
+                <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 30px 0;">
+                <p style="font-size: 12px; color: #6b7280;">Bu e-posta, Agentik B2B platformu üzerinden otomatik olarak gönderilmiştir.</p>
+            </div>
+        </body>
+        </html>
+        """,
+    "offer_notification": """
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2 style="color: #059669;">🎉 Yeni Teklif Alındı!</h2>
+                
+                <p>Merhaba,</p>
+                
+                <p>"{{ rfq_title }}" RFQ'nuz için yeni bir teklif alındı.</p>
+                
+                <div style="background: #ecfdf5; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3 style="margin: 0 0 10px 0; color: #047857;">Teklif Detayları</h3>
+                    <p><strong>Tedarikçi:</strong> {{ supplier_name }}</p>
+                    <p><strong>Fiyat:</strong> ₺{{ price|number_format }} {{ currency }}</p>
+                    <p><strong>Teslimat Süresi:</strong> {{ delivery_time }} gün</p>
+                    {% if notes %}
+                    <p><strong>Notlar:</strong> {{ notes }}</p>
+                    {% endif %}
+                </div>
+                
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="#" style="background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Teklifi İncele</a>
+                </div>
+                
+                <p>Saygılarımızla,<br>
+                <strong>Agentik B2B Ekibi</strong></p>
+            </div>
+        </body>
+        </html>
+        """,
+}
+
+email_templates = TemplateRegistry(EMAIL_TEMPLATES)
 
 class EmailSendAgent(BaseAgent):
     """Agent responsible for sending emails (RFQ invitations, notifications, etc.)"""
@@ -24,6 +105,21 @@ class EmailSendAgent(BaseAgent):
         self.smtp_username = os.getenv('SMTP_USERNAME')
         self.smtp_password = os.getenv('SMTP_PASSWORD')
         
+        # Shared authenticated sessions instead of connect/STARTTLS/LOGIN per message
+        self.smtp_pool = SMTPPool(
+            self.smtp_server,
+            self.smtp_port,
+            self.smtp_username,
+            self.smtp_password,
+            size=int(os.getenv('SMTP_POOL_SIZE', '5')),
+            domain_rate=float(os.getenv('SMTP_DOMAIN_RATE', '2'))
+        )
+        
+    async def cleanup(self):
+        """Close pooled SMTP sessions"""
+        await self.smtp_pool.close()
+        await super().cleanup()
+        
     async def process_task(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Process email sending task"""
         try:
@@ -33,6 +129,8 @@ class EmailSendAgent(BaseAgent):
             
             if task_type == 'send_rfq_invitation':
                 return await self._send_rfq_invitation(task_data)
+            elif task_type == 'send_rfq_invitations':
+                return await self._send_rfq_invitations(task_data)
             elif task_type == 'send_offer_notification':
                 return await self._send_offer_notification(task_data)
             elif task_type == 'send_award_notification':
@@ -67,7 +165,8 @@ class EmailSendAgent(BaseAgent):
         success = await self._send_email(
             to_email=supplier_email,
             subject=subject,
-            html_content=html_content
+            html_content=html_content,
+            thread={'rfq_id': rfq_id, 'supplier_id': task_data.get('supplier_id'), 'invitation_id': invitation_id}
         )
         
         # Log email attempt
@@ -85,6 +184,67 @@ class EmailSendAgent(BaseAgent):
             "invitation_id": invitation_id
         }
         
+    async def _send_rfq_invitations(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Send all invitations of an RFQ concurrently over the SMTP pool"""
+        rfq_id = task_data.get('rfq_id')
+        invitations = [i for i in task_data.get('invitations', []) if i.get('supplier_email')]
+        
+        if not rfq_id:
+            return {"error": "Missing required fields for RFQ invitations"}
+        if not all([self.smtp_username, self.smtp_password]):
+            return {"error": "SMTP credentials not configured"}
+            
+        rfq_details = await self._get_rfq_details(rfq_id)
+        if not rfq_details:
+            return {"error": "RFQ not found"}
+            
+        subject = f"RFQ Daveti - {rfq_details.get('title', 'Yeni RFQ')}"
+        prepared = self._prepare_rfq_invitation(rfq_details)
+        messages = [
+            self._build_message(
+                invitation['supplier_email'],
+                subject,
+                prepared.render(supplier_name=invitation.get('supplier_name'))
+            )
+            for invitation in invitations
+        ]
+        deliveries = await self.smtp_pool.send_many(messages)
+        
+        results = []
+        sent_ids = []
+        threads = {}
+        for invitation, message, delivery in zip(invitations, messages, deliveries):
+            results.append({
+                "invitation_id": invitation.get('invitation_id'),
+                "supplier_email": invitation['supplier_email'],
+                "success": delivery['success'],
+                "error": delivery.get('error')
+            })
+            if delivery['success']:
+                threads[message['Message-ID']] = {
+                    'rfq_id': rfq_id,
+                    'supplier_id': invitation.get('supplier_id'),
+                    'invitation_id': invitation.get('invitation_id')
+                }
+                if invitation.get('invitation_id'):
+                    sent_ids.append(invitation['invitation_id'])
+                
+        # Per-recipient outcome goes to email_logs; the task itself is not retried
+        # (that would resend the delivered ones)
+        await self._log_emails(rfq_id, subject, 'rfq_invitation', results)
+        await self._update_invitations_status(sent_ids, 'sent')
+        await self._remember_threads(threads)
+        
+        sent = sum(1 for r in results if r['success'])
+        logger.info(f"RFQ {rfq_id}: {sent}/{len(results)} invitations sent")
+        return {
+            "success": sent == len(results),
+            "rfq_id": rfq_id,
+            "sent_count": sent,
+            "failed_count": len(results) - sent,
+            "results": results
+        }
+        
     async def _send_offer_notification(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send notification about new offer to RFQ owner"""
         rfq_id = task_data.get('rfq_id')
@@ -129,81 +289,39 @@ class EmailSendAgent(BaseAgent):
         # Implementation for award notification
         return {"success": True, "message": "Award notification sent"}
         
-    async def _send_email(self, to_email: str, subject: str, html_content: str) -> bool:
-        """Send email using SMTP"""
+    def _build_message(self, to_email: str, subject: str, html_content: str) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.smtp_username
+        msg['To'] = to_email
+        # Replies reference this id; the inbox sync maps them back to the RFQ
+        msg['Message-ID'] = make_msgid(domain=(self.smtp_username or 'localhost').rsplit('@', 1)[-1])
+        msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+        return msg
+        
+    async def _send_email(self, to_email: str, subject: str, html_content: str,
+                          thread: Optional[Dict[str, Any]] = None) -> bool:
+        """Send email over a pooled SMTP session (``thread``: RFQ context replies are matched to)"""
         if not all([self.smtp_username, self.smtp_password]):
             logger.error("SMTP credentials not configured")
             return False
             
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            
-            # Add HTML content
-            html_part = MIMEText(html_content, 'html', 'utf-8')
-            msg.attach(html_part)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
-                
+            message = self._build_message(to_email, subject, html_content)
+            await self.smtp_pool.send(message)
             logger.info(f"Email sent successfully to {to_email}")
+            if thread:
+                await self._remember_threads({message['Message-ID']: thread})
             return True
             
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {e}")
             return False
             
-    def _generate_rfq_invitation_html(self, rfq_details: Dict[str, Any], supplier_name: str) -> str:
-        """Generate HTML content for RFQ invitation email"""
-        template = Template("""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #2563eb;">🎯 Yeni RFQ Daveti</h2>
-                
-                <p>Merhaba {% if supplier_name %}{{ supplier_name }}{% else %}Değerli Tedarikçi{% endif %},</p>
-                
-                <p>Aşağıdaki RFQ için teklif vermenizi bekliyoruz:</p>
-                
-                <div style="background: #f8fafc; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <h3 style="margin: 0 0 10px 0; color: #1e40af;">{{ title }}</h3>
-                    <p><strong>Kategori:</strong> {{ category }}</p>
-                    <p><strong>Açıklama:</strong></p>
-                    <p style="margin-left: 20px;">{{ description }}</p>
-                    {% if deadline_date %}
-                    <p><strong>Son Tarih:</strong> {{ deadline_date }}</p>
-                    {% endif %}
-                    {% if budget_max %}
-                    <p><strong>Bütçe:</strong> ₺{{ budget_max|number_format }}</p>
-                    {% endif %}
-                </div>
-                
-                <p>Bu fırsatı değerlendirmek için platformumuzu ziyaret edin ve teklifinizi gönderin.</p>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="#" style="background: #2563eb; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Teklif Ver</a>
-                </div>
-                
-                <p>Sorularınız için bizimle iletişime geçebilirsiniz.</p>
-                
-                <p>Saygılarımızla,<br>
-                <strong>Agentik B2B Ekibi</strong></p>
-                
-                <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 30px 0;">
-                <p style="font-size: 12px; color: #6b7280;">Bu e-posta, Agentik B2B platformu üzerinden otomatik olarak gönderilmiştir.</p>
-            </div>
-        </body>
-        </html>
-        """)
-        
-        return template.render(
-            supplier_name=supplier_name,
+    def _prepare_rfq_invitation(self, rfq_details: Dict[str, Any]):
+        """Invitation HTML with the RFQ part rendered once; ``.render(supplier_name=...)`` per supplier"""
+        return email_templates.prepare(
+            "rfq_invitation",
             title=rfq_details.get('title', ''),
             category=rfq_details.get('category', ''),
             description=rfq_details.get('description', ''),
@@ -211,40 +329,23 @@ class EmailSendAgent(BaseAgent):
             budget_max=rfq_details.get('budget_max')
         )
         
+    async def _remember_threads(self, threads: Dict[str, Dict[str, Any]]):
+        redis_client = get_redis()
+        if not redis_client:
+            return
+        try:
+            await remember_threads(redis_client, threads)
+        except Exception as e:
+            logger.error(f"Error recording invitation threads: {e}")
+            
+    def _generate_rfq_invitation_html(self, rfq_details: Dict[str, Any], supplier_name: str) -> str:
+        """Generate HTML content for RFQ invitation email"""
+        return self._prepare_rfq_invitation(rfq_details).render(supplier_name=supplier_name)
+        
     def _generate_offer_notification_html(self, rfq_details: Dict[str, Any], offer_details: Dict[str, Any]) -> str:
         """Generate HTML content for offer notification email"""
-        template = Template("""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #059669;">🎉 Yeni Teklif Alındı!</h2>
-                
-                <p>Merhaba,</p>
-                
-                <p>"{{ rfq_title }}" RFQ'nuz için yeni bir teklif alındı.</p>
-                
-                <div style="background: #ecfdf5; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <h3 style="margin: 0 0 10px 0; color: #047857;">Teklif Detayları</h3>
-                    <p><strong>Tedarikçi:</strong> {{ supplier_name }}</p>
-                    <p><strong>Fiyat:</strong> ₺{{ price|number_format }} {{ currency }}</p>
-                    <p><strong>Teslimat Süresi:</strong> {{ delivery_time }} gün</p>
-                    {% if notes %}
-                    <p><strong>Notlar:</strong> {{ notes }}</p>
-                    {% endif %}
-                </div>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="#" style="background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Teklifi İncele</a>
-                </div>
-                
-                <p>Saygılarımızla,<br>
-                <strong>Agentik B2B Ekibi</strong></p>
-            </div>
-        </body>
-        </html>
-        """)
-        
-        return template.render(
+        return email_templates.render(
+            "offer_notification",
             rfq_title=rfq_details.get('title', ''),
             supplier_name=offer_details.get('supplier_name', 'Bilinmeyen Tedarikçi'),
             price=offer_details.get('price', 0),
@@ -347,5 +448,42 @@ class EmailSendAgent(BaseAgent):
                     "UPDATE rfq_invitations SET status = $1 WHERE id = $2",
                     status, invitation_id
                 )
+        except Exception as e:
+            logger.error(f"Error updating invitation status: {e}")
+            
+    async def _log_emails(self, rfq_id: str, subject: str, email_type: str, results: List[Dict[str, Any]]):
+        """Log a batch of email attempts in one insert"""
+        db_pool = get_db_pool()
+        if not db_pool or not results:
+            return
+            
+        try:
+            async with db_pool.acquire() as connection:
+                await insert_many(
+                    connection,
+                    "email_logs",
+                    ("rfq_id", "sender_email", "recipient_email", "subject", "email_type", "status", "sent_at", "error_message"),
+                    ("uuid", "text", "text", "text", "text", "text", "timestamptz", "text"),
+                    [
+                        (rfq_id, self.smtp_username, r['supplier_email'], subject, email_type,
+                         'sent' if r['success'] else 'failed', datetime.now(timezone.utc) if r['success'] else None, r['error'])
+                        for r in results
+                    ]
+                )
+        except Exception as e:
+            logger.error(f"Error logging emails: {e}")
+            
+    async def _update_invitations_status(self, invitation_ids: List[str], status: str):
+        """Update the status of several invitations at once"""
+        db_pool = get_db_pool()
+        if not db_pool or not invitation_ids:
+            return
+            
+        try:
+            async with db_pool.acquire() as connection:
+                await connection.execute(
+                    "UPDATE rfq_invitations SET status = $1 WHERE id = ANY($2::uuid[])",
+                    status, invitation_ids
+                )
         except Exception as e:
             logger.error(f"Error updating invitation status: {e}")
\ No newline at end of file
@@ -2,8 +2,13 @@ from core.base_agent import BaseAgent
 from typing import Dict, Any, Optional, List
 from loguru import logger
 from core.database import get_db_pool
+from core.offer_extraction import extract_offer, extract_offers_parallel
+from core.inbox_sync import InboxSync
+from core.redis_client import get_redis
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
 import json
-import re
+import os
 from datetime import datetime, timedelta
 import random
 
@@ -15,6 +20,15 @@ class InboxParserAgent(BaseAgent):
             name="inbox_parser_agent",
             description="Parses incoming emails to extract supplier offers and responses"
         )
+        self.extraction_workers = int(os.getenv('OFFER_EXTRACTION_WORKERS', str(os.cpu_count() or 1)))
+        self._extraction_pool: Optional[ProcessPoolExecutor] = None
+        
+    async def cleanup(self):
+        """Stop the extraction process pool"""
+        if self._extraction_pool:
+            self._extraction_pool.shutdown(wait=False, cancel_futures=True)
+            self._extraction_pool = None
+        await super().cleanup()
         
     async def process_task(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Process inbox parsing task"""
@@ -29,6 +43,8 @@ class InboxParserAgent(BaseAgent):
                 return await self._simulate_email_responses(task_data)
             elif task_type == 'process_single_email':
                 return await self._process_single_email(task_data)
+            elif task_type == 'process_email_batch':
+                return await self._process_email_batch(task_data)
             else:
                 return {"error": f"Unknown task type: {task_type}"}
                 
@@ -37,9 +53,32 @@ class InboxParserAgent(BaseAgent):
             return {"error": str(e)}
             
     async def _parse_pending_emails(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse all pending emails (simulated for now)"""
-        # Since we don't have real IMAP, we'll simulate email responses
-        return await self._simulate_email_responses(task_data)
+        """Parse new replies from the IMAP inbox (simulated when IMAP is not configured)"""
+        inbox = InboxSync.from_env(get_redis())
+        if inbox is None:
+            return await self._simulate_email_responses(task_data)
+        
+        received = 0
+        parsed_offers = 0
+        # Replies stream in batch by batch; the sync checkpoint advances as they are consumed
+        async for message in inbox.messages():
+            received += 1
+            thread = message['thread']
+            offer_data = extract_offer(message['content'])
+            if not offer_data or not thread.get('supplier_id'):
+                continue
+            
+            offer_id = await self._create_offer_from_email(thread['rfq_id'], thread['supplier_id'], offer_data)
+            if offer_id:
+                parsed_offers += 1
+                await self._trigger_supplier_verification(thread['rfq_id'], thread['supplier_id'], offer_id)
+        
+        logger.info(f"Inbox sync: {received} replies, {parsed_offers} offers")
+        return {
+            "success": True,
+            "emails_received": received,
+            "parsed_offers": parsed_offers
+        }
         
     async def _simulate_email_responses(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Simulate email responses from suppliers"""
@@ -108,6 +147,29 @@ class InboxParserAgent(BaseAgent):
             "sender_email": sender_email
         }
         
+    async def _process_email_batch(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract offers from many emails (inbox backfill) across the process pool"""
+        emails = task_data.get('emails') or []
+        
+        if not emails:
+            return {"error": "Emails not provided"}
+        
+        if self._extraction_pool is None:
+            self._extraction_pool = ProcessPoolExecutor(max_workers=self.extraction_workers)
+        
+        contents = [email.get('content', '') for email in emails]
+        loop = asyncio.get_running_loop()
+        offers = await loop.run_in_executor(None, extract_offers_parallel, contents, self._extraction_pool)
+        
+        return {
+            "success": True,
+            "results": [
+                {"sender_email": email.get('sender'), "subject": email.get('subject'), "offer_data": offer}
+                for email, offer in zip(emails, offers)
+            ],
+            "parsed_offers": sum(1 for offer in offers if offer and offer.get('type') == 'offer')
+        }
+        
     def _generate_simulated_email_response(self, invitation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Generate a simulated email response from supplier"""
         supplier_name = invitation.get('company_name', 'Tedarikçi')
@@ -239,132 +301,11 @@ class InboxParserAgent(BaseAgent):
         
     async def _extract_offer_from_email(self, email_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Extract structured offer data from email content"""
-        content = email_data.get('content', '').lower()
-        
         # If already extracted in simulation
         if 'extracted_data' in email_data:
             return email_data['extracted_data']
         
-        # Check if this is a decline
-        decline_keywords = ['maalesef', 'teklif veremiyoruz', 'üzgünüz', 'mevcut durumda']
-        if any(keyword in content for keyword in decline_keywords):
-            return {
-                'type': 'decline',
-                'reason': 'Tedarikçi teklif veremiyor'
-            }
-        
-        # Check if this is a clarification request
-        clarification_keywords = ['bilgi', 'detay', 'öğrenmek', 'sormak']
-        if any(keyword in content for keyword in clarification_keywords):
-            return {
-                'type': 'clarification',
-                'questions': self._extract_questions_from_email(content)
-            }
-        
-        # Extract price information
-        price_patterns = [
-            r'(?:fiyat|tutar|ücret).*?:?\s*([₺$€]?\s*[\d,\.]+)\s*([a-z]{3})?',
-            r'([₺$€]?\s*[\d,\.]+)\s*([a-z]{3})?.*?(?:fiyat|tutar|ücret)',
-            r'(\d+(?:[,\.]\d+)?)\s*(try|usd|eur|₺|\$|€)'
-        ]
-        
-        extracted_data = {}
-        
-        for pattern in price_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
-                try:
-                    price_str = match.group(1).replace(',', '').replace('₺', '').replace('$', '').replace('€', '').strip()
-                    price = float(price_str)
-                    
-                    currency = match.group(2) if len(match.groups()) > 1 and match.group(2) else 'TRY'
-                    currency = currency.upper().replace('₺', 'TRY').replace('$', 'USD').replace('€', 'EUR')
-                    
-                    extracted_data['price'] = price
-                    extracted_data['currency'] = currency
-                    break
-                except (ValueError, AttributeError):
-                    continue
-                    
-        # Extract delivery time
-        delivery_patterns = [
-            r'(?:teslimat|teslim).*?(\d+)\s*(?:gün|gun|days?)',
-            r'(\d+)\s*(?:gün|gun|days?).*?(?:teslimat|teslim)',
-            r'(?:süre|sure).*?(\d+)\s*(?:gün|gun|days?)'
-        ]
-        
-        for pattern in delivery_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                try:
-                    extracted_data['delivery_time'] = int(match.group(1))
-                    break
-                except ValueError:
-                    continue
-        
-        # Extract validity period
-        validity_patterns = [
-            r'(?:geçerli|gecerli).*?(\d+)\s*(?:gün|gun|days?)',
-            r'(\d+)\s*(?:gün|gun|days?).*?(?:geçerli|gecerli)'
-        ]
-        
-        for pattern in validity_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                try:
-                    days = int(match.group(1))
-                    extracted_data['valid_until'] = (datetime.now() + timedelta(days=days)).isoformat()
-                    break
-                except ValueError:
-                    continue
-        
-        # Extract payment terms
-        if 'ödeme' in content or 'odeme' in content:
-            payment_match = re.search(r'(?:ödeme|odeme).*?:(.*?)(?:\n|$)', content, re.IGNORECASE)
-            if payment_match:
-                extracted_data['payment_terms'] = payment_match.group(1).strip()
-        
-        # Extract warranty info
-        if 'garanti' in content:
-            warranty_match = re.search(r'garanti.*?(\d+)\s*(?:ay|yıl|yil|month|year)', content, re.IGNORECASE)
-            if warranty_match:
-                extracted_data['warranty'] = warranty_match.group(0).strip()
-        
-        # Extract notes
-        notes_sections = []
-        if 'not:' in content.lower():
-            notes_match = re.search(r'not:(.+?)(?:\n\n|\n[A-Z]|$)', content, re.IGNORECASE | re.DOTALL)
-            if notes_match:
-                notes_sections.append(notes_match.group(1).strip())
-        
-        if notes_sections:
-            extracted_data['notes'] = ' | '.join(notes_sections)
-        
-        # Default type
-        extracted_data['type'] = 'offer'
-        
-        return extracted_data if extracted_data else None
-        
-    def _extract_questions_from_email(self, content: str) -> List[str]:
-        """Extract questions from clarification emails"""
-        questions = []
-        
-        # Look for question patterns
-        question_patterns = [
-            r'([^.!?]*\?[^.!?]*)',
-            r'- ([^-\n]+)',
-            r'• ([^•\n]+)',
-            r'\d+\.\s*([^\d\n]+)'
-        ]
-        
-        for pattern in question_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            for match in matches:
-                question = match.strip()
-                if len(question) > 10 and question not in questions:
-                    questions.append(question)
-        
-        return questions[:5]  # Limit to 5 questions
+        return extract_offer(email_data.get('content', ''))
         
     async def _get_sent_invitations(self, rfq_id: str) -> List[Dict[str, Any]]:
         """Get sent invitations for an RFQ"""
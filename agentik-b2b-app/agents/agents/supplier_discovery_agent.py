@@ -1,10 +1,38 @@
 from core.base_agent import BaseAgent
 from typing import Dict, Any, Optional, List
 from loguru import logger
-from core.database import get_db_pool
+from core.database import get_db_pool, insert_many
+from core.supplier_index import SupplierIndex
 import json
 import asyncio
 
+# Index rows: verified state plus every text field the index tokenizes
+SUPPLIER_INDEX_COLUMNS = """
+    SELECT s.id, s.verified, s.specializations, c.name as company_name, c.industry,
+           ARRAY(SELECT p.product_name FROM supplier_products p WHERE p.supplier_id = s.id) as product_names,
+           GREATEST(s.updated_at, c.updated_at,
+                    (SELECT max(p.updated_at) FROM supplier_products p WHERE p.supplier_id = s.id)) as changed_at
+    FROM suppliers s
+    JOIN companies c ON s.company_id = c.id
+"""
+
+# First load: verified suppliers only (partial index idx_suppliers_verified_rating)
+SUPPLIER_INDEX_FULL_QUERY = SUPPLIER_INDEX_COLUMNS + """
+    WHERE s.verified = true
+"""
+
+# Deltas: one indexed range scan per table instead of an OR across the join
+# (>= so rows sharing the last seen timestamp are never skipped)
+SUPPLIER_INDEX_DELTA_QUERY = SUPPLIER_INDEX_COLUMNS + """
+    WHERE s.id IN (
+        SELECT id FROM suppliers WHERE updated_at >= $1
+        UNION
+        SELECT s2.id FROM companies c2 JOIN suppliers s2 ON s2.company_id = c2.id WHERE c2.updated_at >= $1
+        UNION
+        SELECT supplier_id FROM supplier_products WHERE updated_at >= $1
+    )
+"""
+
 class SupplierDiscoveryAgent(BaseAgent):
     """Agent responsible for discovering and matching suppliers to RFQs"""
     
@@ -13,6 +41,24 @@ class SupplierDiscoveryAgent(BaseAgent):
             name="supplier_discovery_agent",
             description="Discovers relevant suppliers for RFQs and sends invitations"
         )
+        self.supplier_index = SupplierIndex()
+        self._index_synced_at = None
+        
+    async def _sync_supplier_index(self, connection):
+        """Apply supplier rows changed since the last sync (everything on first use)"""
+        if self._index_synced_at is None:
+            rows = await connection.fetch(SUPPLIER_INDEX_FULL_QUERY)
+        else:
+            rows = await connection.fetch(SUPPLIER_INDEX_DELTA_QUERY, self._index_synced_at)
+        for row in rows:
+            supplier = dict(row)
+            if supplier['verified']:
+                categories = list(supplier.get('specializations') or []) + [supplier.get('industry')]
+                self.supplier_index.upsert(supplier['id'], supplier, categories=categories)
+            else:
+                self.supplier_index.remove(supplier['id'])
+            if self._index_synced_at is None or supplier['changed_at'] > self._index_synced_at:
+                self._index_synced_at = supplier['changed_at']
         
     async def process_task(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Process supplier discovery task"""
@@ -71,33 +117,35 @@ class SupplierDiscoveryAgent(BaseAgent):
             
         try:
             async with db_pool.acquire() as connection:
-                # Find suppliers by category and specializations
+                await self._sync_supplier_index(connection)
+                
+                # Candidates from the inverted index: the category's suppliers plus keyword
+                # hits (category words count as keywords, like the old industry ILIKE)
+                matches = self.supplier_index.search(
+                    list(keywords or []) + [category or ''], category, within_category=False
+                )
+                relevance = dict(matches)
+                if not relevance:
+                    logger.info("Found 0 matching suppliers")
+                    return []
+                
                 query = """
                     SELECT s.*, c.name as company_name, c.email as company_email,
                            c.phone, c.website, c.industry
                     FROM suppliers s
                     JOIN companies c ON s.company_id = c.id
                     WHERE s.verified = true
-                    AND (
-                        $1 = ANY(s.specializations)
-                        OR c.industry ILIKE '%' || $1 || '%'
-                        OR EXISTS (
-                            SELECT 1 FROM unnest(s.specializations) as spec
-                            WHERE spec ILIKE ANY($2::text[])
-                        )
-                    )
+                    AND s.id = ANY($1::uuid[])
                     ORDER BY s.rating DESC, s.total_completed_orders DESC
                     LIMIT 50
                 """
                 
-                # Prepare keyword patterns for ILIKE
-                keyword_patterns = [f"%{keyword}%" for keyword in keywords]
-                
-                rows = await connection.fetch(query, category, keyword_patterns)
+                rows = await connection.fetch(query, list(relevance))
                 
                 suppliers = []
                 for row in rows:
                     supplier_data = dict(row)
+                    supplier_data['relevance_score'] = relevance.get(supplier_data['id'], 0.0)
                     suppliers.append(supplier_data)
                     
                 logger.info(f"Found {len(suppliers)} matching suppliers")
@@ -166,46 +214,47 @@ class SupplierDiscoveryAgent(BaseAgent):
         return selected
         
     async def _create_invitations(self, rfq_id: str, suppliers: List[Dict[str, Any]]) -> int:
-        """Create invitation records and trigger email sending"""
+        """Create invitation records in one bulk insert and trigger email sending"""
         db_pool = get_db_pool()
         if not db_pool:
             logger.error("Database pool not available")
             return 0
+        if not suppliers:
+            return 0
             
-        invitations_created = 0
-        
         try:
             async with db_pool.acquire() as connection:
-                for supplier in suppliers:
-                    # Create invitation record
-                    invitation_id = await connection.fetchval(
-                        """
-                        INSERT INTO rfq_invitations 
-                        (rfq_id, supplier_id, invited_by, status, invited_at)
-                        VALUES ($1, $2, (
-                            SELECT requester_id FROM rfqs WHERE id = $1
-                        ), 'pending', NOW())
-                        RETURNING id
-                        """,
-                        rfq_id, supplier['id']
-                    )
-                    
-                    if invitation_id:
-                        # Trigger email sending
-                        await self._trigger_email_invitation(rfq_id, supplier, invitation_id)
-                        invitations_created += 1
-                        
-            logger.info(f"Created {invitations_created} invitations for RFQ {rfq_id}")
-            return invitations_created
+                invited_by = await connection.fetchval(
+                    "SELECT requester_id FROM rfqs WHERE id = $1", rfq_id
+                )
+                # Suppliers already invited to this RFQ are skipped by the unique key
+                rows = await insert_many(
+                    connection,
+                    "rfq_invitations",
+                    ("rfq_id", "supplier_id", "invited_by", "status"),
+                    ("uuid", "uuid", "uuid", "text"),
+                    [(rfq_id, supplier['id'], invited_by, 'pending') for supplier in suppliers],
+                    on_conflict="(rfq_id, supplier_id)",
+                    returning="id, supplier_id"
+                )
+                
+            suppliers_by_id = {str(supplier['id']): supplier for supplier in suppliers}
+            invitations = [(suppliers_by_id[str(row['supplier_id'])], str(row['id'])) for row in rows]
+            await self._trigger_email_invitations(rfq_id, invitations)
+            
+            logger.info(f"Created {len(invitations)} invitations for RFQ {rfq_id}")
+            return len(invitations)
             
         except Exception as e:
             logger.error(f"Error creating invitations: {e}")
             return 0
             
-    async def _trigger_email_invitation(self, rfq_id: str, supplier: Dict[str, Any], invitation_id: str):
-        """Trigger email invitation to supplier"""
+    async def _trigger_email_invitations(self, rfq_id: str, invitations: List[tuple]):
+        """Queue one batch task for (supplier, invitation_id) pairs; the email agent fans it out"""
         from core.redis_client import get_redis
         
+        if not invitations:
+            return
         redis_client = get_redis()
         if not redis_client:
             logger.error("Redis client not available")
@@ -213,20 +262,22 @@ class SupplierDiscoveryAgent(BaseAgent):
             
         try:
             task_data = {
-                'action': 'send_rfq_invitation',
+                'action': 'send_rfq_invitations',
                 'rfq_id': rfq_id,
-                'supplier_id': supplier['id'],
-                'supplier_email': supplier.get('company_email'),
-                'supplier_name': supplier.get('company_name'),
-                'invitation_id': invitation_id
+                'invitations': [
+                    {
+                        'supplier_id': str(supplier['id']),
+                        'supplier_email': supplier.get('company_email'),
+                        'supplier_name': supplier.get('company_name'),
+                        'invitation_id': invitation_id
+                    }
+                    for supplier, invitation_id in invitations
+                ]
             }
             
-            await redis_client.lpush(
-                'agent_email_send_agent_queue',
-                json.dumps(task_data)
-            )
+            await redis_client.lpush('agent_email_send_agent_queue', json.dumps(task_data))
             
-            logger.info(f"Triggered email invitation to {supplier.get('company_name')}")
+            logger.info(f"Triggered {len(invitations)} email invitations for RFQ {rfq_id}")
             
         except Exception as e:
-            logger.error(f"Error triggering email invitation: {e}")
\ No newline at end of file
+            logger.error(f"Error triggering email invitations: {e}")
\ No newline at end of file
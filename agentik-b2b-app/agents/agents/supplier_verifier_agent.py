@@ -2,10 +2,53 @@ from core.base_agent import BaseAgent
 from typing import Dict, Any, Optional, List
 from loguru import logger
 from core.database import get_db_pool
+from core.verification_cache import MISS, VerificationCache, profile_version
 import json
 import asyncio
 from datetime import datetime, timedelta
 
+# Supplier profiles with their offer history, for one or many suppliers ($1 is a uuid[])
+SUPPLIER_DETAILS_QUERY = """
+    SELECT s.*, c.name as company_name, c.email, c.phone, 
+           c.website, c.industry,
+           h.offers_submitted, h.offers_accepted, h.average_offer_delivery_time
+    FROM suppliers s
+    JOIN companies c ON s.company_id = c.id
+    LEFT JOIN LATERAL (
+        SELECT count(*) AS offers_submitted,
+               count(*) FILTER (WHERE o.status = 'accepted') AS offers_accepted,
+               avg(o.delivery_time) AS average_offer_delivery_time
+        FROM offers o
+        WHERE o.supplier_id = s.id
+    ) h ON true
+    WHERE s.id = ANY($1::uuid[])
+"""
+
+# What the cached checks were built from: the profile's updated_at plus the offer
+# counts, which change with every offer without touching the supplier row
+SUPPLIER_VERSIONS_QUERY = """
+    SELECT s.id, s.updated_at, h.offers_submitted, h.offers_accepted
+    FROM suppliers s
+    LEFT JOIN LATERAL (
+        SELECT count(*) AS offers_submitted,
+               count(*) FILTER (WHERE o.status = 'accepted') AS offers_accepted
+        FROM offers o
+        WHERE o.supplier_id = s.id
+    ) h ON true
+    WHERE s.id = ANY($1::uuid[])
+"""
+
+OFFER_VERIFICATION_UPDATE = """
+    UPDATE offers 
+    SET 
+        verification_status = $2,
+        credibility_score = $3,
+        verification_details = $4,
+        verified_at = CASE WHEN $2 = 'verified' THEN NOW() ELSE NULL END,
+        updated_at = NOW()
+    WHERE id = $1
+"""
+
 class SupplierVerifierAgent(BaseAgent):
     """Agent responsible for verifying supplier information and validating offers"""
     
@@ -14,6 +57,8 @@ class SupplierVerifierAgent(BaseAgent):
             name="supplier_verifier_agent",
             description="Verifies supplier credibility, validates offers, and scores suppliers"
         )
+        # Supplier profile + credibility/performance checks, shared by every offer of a supplier
+        self.verification_cache = VerificationCache()
         
     async def process_task(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Process supplier verification task"""
@@ -46,15 +91,16 @@ class SupplierVerifierAgent(BaseAgent):
         
         # Get offer and supplier details
         offer_details = await self._get_offer_details(offer_id)
-        supplier_details = await self._get_supplier_details(supplier_id)
+        supplier_checks = await self._get_supplier_checks(supplier_id)
         rfq_details = await self._get_rfq_details(rfq_id)
         
-        if not all([offer_details, supplier_details, rfq_details]):
+        if not all([offer_details, supplier_checks, rfq_details]):
             return {"error": "Could not retrieve required details"}
         
         # Perform comprehensive verification
         verification_result = await self._perform_comprehensive_verification(
-            offer_details, supplier_details, rfq_details
+            offer_details, supplier_checks["supplier"], rfq_details,
+            supplier_checks=supplier_checks
         )
         
         # Update offer with verification results
@@ -95,37 +141,72 @@ class SupplierVerifierAgent(BaseAgent):
         }
         
     async def _validate_bulk_offers(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate multiple offers for an RFQ"""
+        """
+        Validate all pending offers of an RFQ in a few set-based round trips.
+
+        Offers, the RFQ, its offer prices and the (uncached) suppliers with
+        their offer history are loaded up front on one connection; offers are
+        scored in memory and written back with a single ``executemany``.
+        """
         rfq_id = task_data.get('rfq_id')
         
         if not rfq_id:
             return {"error": "RFQ ID not provided"}
         
-        # Get all pending offers for this RFQ
-        pending_offers = await self._get_pending_offers(rfq_id)
+        db_pool = get_db_pool()
+        if not db_pool:
+            return {"error": "Database pool not initialized"}
         
         verified_count = 0
         failed_count = 0
+        results = []
         
-        for offer in pending_offers:
-            try:
-                verification_task = {
-                    'action': 'verify_offer',
-                    'rfq_id': rfq_id,
-                    'supplier_id': offer['supplier_id'],
-                    'offer_id': offer['id']
+        async with db_pool.acquire() as connection:
+            # Get all pending offers for this RFQ
+            pending_offers = await self._get_pending_offers(connection, rfq_id)
+            if not pending_offers:
+                return {
+                    "success": True,
+                    "rfq_id": rfq_id,
+                    "offers_verified": 0,
+                    "offers_failed": 0,
+                    "total_offers": 0
                 }
+            
+            rfq_row = await connection.fetchrow("SELECT * FROM rfqs WHERE id = $1", rfq_id)
+            if not rfq_row:
+                return {"error": "RFQ not found"}
+            rfq_details = dict(rfq_row)
+            
+            offer_prices = await self._fetch_offer_prices(connection, rfq_id)
+            supplier_checks = await self._get_supplier_checks_many(
+                connection, {str(offer['supplier_id']) for offer in pending_offers}
+            )
+            
+            for offer in pending_offers:
+                checks = supplier_checks.get(str(offer['supplier_id']))
+                if not checks:
+                    logger.warning(f"Supplier {offer['supplier_id']} not found for offer {offer['id']}")
+                    failed_count += 1
+                    continue
                 
-                result = await self._verify_offer(verification_task)
-                
-                if result.get('success'):
+                try:
+                    verification_result = await self._perform_comprehensive_verification(
+                        offer, checks["supplier"], rfq_details,
+                        supplier_checks=checks, offer_prices=offer_prices
+                    )
+                    results.append((offer['id'], verification_result))
                     verified_count += 1
-                else:
-                    failed_count += 1
                     
-            except Exception as e:
-                logger.error(f"Error verifying offer {offer['id']}: {e}")
-                failed_count += 1
+                except Exception as e:
+                    logger.error(f"Error verifying offer {offer['id']}: {e}")
+                    failed_count += 1
+            
+            await self._update_offer_verifications(connection, results)
+        
+        # One aggregation update for the whole batch
+        if any(result['verified'] and result['credibility_score'] >= 60 for _, result in results):
+            await self._trigger_aggregation_update(rfq_id)
         
         return {
             "success": True,
@@ -137,7 +218,9 @@ class SupplierVerifierAgent(BaseAgent):
         
     async def _perform_comprehensive_verification(self, offer_details: Dict[str, Any], 
                                                 supplier_details: Dict[str, Any], 
-                                                rfq_details: Dict[str, Any]) -> Dict[str, Any]:
+                                                rfq_details: Dict[str, Any],
+                                                supplier_checks: Optional[Dict[str, Any]] = None,
+                                                offer_prices: Optional[List[float]] = None) -> Dict[str, Any]:
         """Perform comprehensive verification of offer and supplier"""
         
         # Initialize verification result
@@ -150,7 +233,10 @@ class SupplierVerifierAgent(BaseAgent):
         }
         
         # 1. Supplier credibility check
-        supplier_score = await self._verify_supplier_credibility(supplier_details)
+        if supplier_checks:
+            supplier_score = supplier_checks["credibility"]
+        else:
+            supplier_score = await self._verify_supplier_credibility(supplier_details)
         verification_result["credibility_score"] = supplier_score["credibility_score"]
         verification_result["verification_details"]["supplier"] = supplier_score
         
@@ -159,7 +245,7 @@ class SupplierVerifierAgent(BaseAgent):
         verification_result["verification_details"]["offer"] = offer_validity
         
         # 3. Price reasonableness check
-        price_analysis = await self._analyze_offer_pricing(offer_details, rfq_details)
+        price_analysis = await self._analyze_offer_pricing(offer_details, rfq_details, offer_prices)
         verification_result["verification_details"]["pricing"] = price_analysis
         
         # 4. Delivery feasibility check
@@ -167,7 +253,10 @@ class SupplierVerifierAgent(BaseAgent):
         verification_result["verification_details"]["delivery"] = delivery_check
         
         # 5. Historical performance check
-        performance_check = await self._check_supplier_performance(supplier_details)
+        if supplier_checks:
+            performance_check = supplier_checks["performance"]
+        else:
+            performance_check = await self._check_supplier_performance(supplier_details)
         verification_result["verification_details"]["performance"] = performance_check
         
         # Calculate overall verification score
@@ -334,7 +423,8 @@ class SupplierVerifierAgent(BaseAgent):
         
         return validity_check
         
-    async def _analyze_offer_pricing(self, offer_details: Dict[str, Any], rfq_details: Dict[str, Any]) -> Dict[str, Any]:
+    async def _analyze_offer_pricing(self, offer_details: Dict[str, Any], rfq_details: Dict[str, Any],
+                                     offer_prices: Optional[List[float]] = None) -> Dict[str, Any]:
         """Analyze offer pricing for reasonableness"""
         pricing_analysis = {
             "reasonable": True,
@@ -370,7 +460,7 @@ class SupplierVerifierAgent(BaseAgent):
             pricing_analysis["reasonable"] = False
         
         # Get market comparison (simulate with other offers for same RFQ)
-        market_comparison = await self._get_market_price_comparison(rfq_details.get('id'), price)
+        market_comparison = await self._get_market_price_comparison(rfq_details.get('id'), price, offer_prices)
         pricing_analysis["comparison"] = market_comparison
         
         return pricing_analysis
@@ -456,6 +546,15 @@ class SupplierVerifierAgent(BaseAgent):
             "reliability": "high" if score >= 80 else "medium" if score >= 60 else "low"
         }
         
+        # Offer history aggregated alongside the profile (informational, not scored)
+        if supplier_details.get('offers_submitted') is not None:
+            average_delivery = supplier_details.get('average_offer_delivery_time')
+            performance_check["metrics"]["history"] = {
+                "offers_submitted": supplier_details['offers_submitted'],
+                "offers_accepted": supplier_details.get('offers_accepted', 0),
+                "average_delivery_time": round(float(average_delivery), 1) if average_delivery is not None else None
+            }
+        
         return performance_check
         
     def _calculate_profile_completeness(self, supplier_details: Dict[str, Any]) -> float:
@@ -583,20 +682,67 @@ class SupplierVerifierAgent(BaseAgent):
             
         try:
             async with db_pool.acquire() as connection:
-                row = await connection.fetchrow(
-                    """
-                    SELECT s.*, c.name as company_name, c.email, c.phone, 
-                           c.website, c.industry
-                    FROM suppliers s
-                    JOIN companies c ON s.company_id = c.id
-                    WHERE s.id = $1
-                    """, supplier_id
-                )
+                row = await connection.fetchrow(SUPPLIER_DETAILS_QUERY, [supplier_id])
                 return dict(row) if row else None
         except Exception as e:
             logger.error(f"Error getting supplier details: {e}")
             return None
             
+    async def _get_supplier_checks(self, supplier_id: str) -> Optional[Dict[str, Any]]:
+        """Supplier row with its credibility and performance checks, from the verification cache"""
+        db_pool = get_db_pool()
+        if not db_pool:
+            return None
+        
+        try:
+            async with db_pool.acquire() as connection:
+                checks = await self._get_supplier_checks_many(connection, [str(supplier_id)])
+            return checks.get(str(supplier_id))
+        except Exception as e:
+            logger.error(f"Error getting supplier details: {e}")
+            return None
+            
+    async def _get_supplier_checks_many(self, connection, supplier_ids) -> Dict[str, Dict[str, Any]]:
+        """
+        Supplier checks by id (unknown ids are left out).
+        
+        Cache entries are keyed on the current profile and offer history
+        version; stale ones and misses are loaded in one query.
+        """
+        rows = await connection.fetch(SUPPLIER_VERSIONS_QUERY, list(supplier_ids))
+        versions = {str(row['id']): self._checks_version(dict(row)) for row in rows}
+        
+        checks = {}
+        missing = []
+        for supplier_id, version in versions.items():
+            cached = self.verification_cache.get(supplier_id, version)
+            if cached is MISS:
+                missing.append(supplier_id)
+            elif cached is not None:
+                checks[supplier_id] = cached
+        
+        if missing:
+            rows = await connection.fetch(SUPPLIER_DETAILS_QUERY, missing)
+            for row in rows:
+                supplier_details = dict(row)
+                supplier_id = str(supplier_details['id'])
+                value = await self._build_supplier_checks(supplier_details)
+                self.verification_cache.put(supplier_id, value, self._checks_version(supplier_details))
+                checks[supplier_id] = value
+        return checks
+    
+    @staticmethod
+    def _checks_version(row: Dict[str, Any]) -> str:
+        """Profile version plus offer counts, so new or accepted offers refresh the history"""
+        return f"{profile_version(row)}:{row.get('offers_submitted') or 0}:{row.get('offers_accepted') or 0}"
+            
+    async def _build_supplier_checks(self, supplier_details: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "supplier": supplier_details,
+            "credibility": await self._verify_supplier_credibility(supplier_details),
+            "performance": await self._check_supplier_performance(supplier_details)
+        }
+            
     async def _get_rfq_details(self, rfq_id: str) -> Optional[Dict[str, Any]]:
         """Get RFQ details from database"""
         db_pool = get_db_pool()
@@ -613,71 +759,67 @@ class SupplierVerifierAgent(BaseAgent):
             logger.error(f"Error getting RFQ details: {e}")
             return None
             
-    async def _get_pending_offers(self, rfq_id: str) -> List[Dict[str, Any]]:
+    async def _get_pending_offers(self, connection, rfq_id: str) -> List[Dict[str, Any]]:
         """Get pending offers for verification"""
-        db_pool = get_db_pool()
-        if not db_pool:
-            return []
-            
-        try:
-            async with db_pool.acquire() as connection:
-                rows = await connection.fetch(
-                    "SELECT * FROM offers WHERE rfq_id = $1 AND status = 'pending'", 
-                    rfq_id
-                )
-                return [dict(row) for row in rows]
-        except Exception as e:
-            logger.error(f"Error getting pending offers: {e}")
-            return []
+        rows = await connection.fetch(
+            "SELECT * FROM offers WHERE rfq_id = $1 AND status = 'pending'", 
+            rfq_id
+        )
+        return [dict(row) for row in rows]
             
-    async def _get_market_price_comparison(self, rfq_id: str, current_price: float) -> Dict[str, Any]:
-        """Get market price comparison for similar offers"""
-        db_pool = get_db_pool()
-        if not db_pool:
-            return {"comparison": "unavailable"}
+    async def _fetch_offer_prices(self, connection, rfq_id: str) -> List[float]:
+        """Prices of all priced offers for an RFQ"""
+        rows = await connection.fetch(
+            "SELECT price FROM offers WHERE rfq_id = $1 AND price IS NOT NULL",
+            rfq_id
+        )
+        return [float(row['price']) for row in rows]
             
-        try:
-            async with db_pool.acquire() as connection:
-                # Get other offers for the same RFQ
-                rows = await connection.fetch(
-                    """
-                    SELECT price FROM offers 
-                    WHERE rfq_id = $1 AND price IS NOT NULL 
-                    AND id != (SELECT id FROM offers WHERE rfq_id = $1 AND price = $2 LIMIT 1)
-                    """, 
-                    rfq_id, current_price
-                )
-                
-                if not rows:
-                    return {"comparison": "no_other_offers"}
-                
-                prices = [float(row['price']) for row in rows]
-                avg_price = sum(prices) / len(prices)
-                min_price = min(prices)
-                max_price = max(prices)
-                
-                # Determine position
-                if current_price <= min_price:
-                    position = "lowest"
-                elif current_price >= max_price:
-                    position = "highest"
-                elif current_price <= avg_price:
-                    position = "below_average"
-                else:
-                    position = "above_average"
-                
-                return {
-                    "comparison": "available",
-                    "position": position,
-                    "avg_price": avg_price,
-                    "min_price": min_price,
-                    "max_price": max_price,
-                    "total_offers": len(prices) + 1
-                }
-                
-        except Exception as e:
-            logger.error(f"Error getting market price comparison: {e}")
-            return {"comparison": "error"}
+    async def _get_market_price_comparison(self, rfq_id: str, current_price: float,
+                                           offer_prices: Optional[List[float]] = None) -> Dict[str, Any]:
+        """Get market price comparison for similar offers (``offer_prices`` from ``_fetch_offer_prices``)"""
+        if offer_prices is None:
+            db_pool = get_db_pool()
+            if not db_pool:
+                return {"comparison": "unavailable"}
+            try:
+                async with db_pool.acquire() as connection:
+                    offer_prices = await self._fetch_offer_prices(connection, rfq_id)
+            except Exception as e:
+                logger.error(f"Error getting market price comparison: {e}")
+                return {"comparison": "error"}
+        
+        # Other offers for the same RFQ: everything but one offer at this price
+        current_price = float(current_price)
+        prices = list(offer_prices)
+        if current_price in prices:
+            prices.remove(current_price)
+        
+        if not prices:
+            return {"comparison": "no_other_offers"}
+        
+        avg_price = sum(prices) / len(prices)
+        min_price = min(prices)
+        max_price = max(prices)
+        
+        # Determine position
+        if current_price <= min_price:
+            position = "lowest"
+        elif current_price >= max_price:
+            position = "highest"
+        elif current_price <= avg_price:
+            position = "below_average"
+        else:
+            position = "above_average"
+        
+        return {
+            "comparison": "available",
+            "position": position,
+            "avg_price": avg_price,
+            "min_price": min_price,
+            "max_price": max_price,
+            "total_offers": len(prices) + 1
+        }
             
     async def _update_offer_verification(self, offer_id: str, verification_result: Dict[str, Any]):
         """Update offer with verification results"""
@@ -687,28 +829,31 @@ class SupplierVerifierAgent(BaseAgent):
             
         try:
             async with db_pool.acquire() as connection:
-                await connection.execute(
-                    """
-                    UPDATE offers 
-                    SET 
-                        verification_status = $2,
-                        credibility_score = $3,
-                        verification_details = $4,
-                        verified_at = CASE WHEN $2 = 'verified' THEN NOW() ELSE NULL END,
-                        updated_at = NOW()
-                    WHERE id = $1
-                    """,
-                    offer_id,
-                    'verified' if verification_result['verified'] else 'failed',
-                    verification_result['credibility_score'],
-                    json.dumps(verification_result)
-                )
+                await connection.execute(OFFER_VERIFICATION_UPDATE, *self._offer_verification_args(offer_id, verification_result))
                 
                 logger.info(f"Updated offer {offer_id} verification status")
                 
         except Exception as e:
             logger.error(f"Error updating offer verification: {e}")
             
+    async def _update_offer_verifications(self, connection, results: List[tuple]):
+        """Write ``(offer_id, verification_result)`` pairs in one ``executemany``"""
+        if not results:
+            return
+        await connection.executemany(
+            OFFER_VERIFICATION_UPDATE,
+            [self._offer_verification_args(offer_id, result) for offer_id, result in results]
+        )
+        logger.info(f"Updated verification status of {len(results)} offers")
+            
+    def _offer_verification_args(self, offer_id, verification_result: Dict[str, Any]) -> tuple:
+        return (
+            offer_id,
+            'verified' if verification_result['verified'] else 'failed',
+            verification_result['credibility_score'],
+            json.dumps(verification_result)
+        )
+            
     async def _update_supplier_verification(self, supplier_id: str, verification_result: Dict[str, Any]):
         """Update supplier with verification results"""
         db_pool = get_db_pool()
@@ -730,6 +875,8 @@ class SupplierVerifierAgent(BaseAgent):
                     verification_result['credibility_score']
                 )
                 
+                # Profile changed: the next offer from this supplier reloads it
+                self.verification_cache.invalidate(str(supplier_id))
                 logger.info(f"Updated supplier {supplier_id} verification")
                 
         except Exception as e:
@@ -1,7 +1,7 @@
 import asyncpg
 import os
 from loguru import logger
-from typing import Optional
+from typing import List, Optional, Sequence
 from contextlib import asynccontextmanager
 
 # Global database pool
@@ -111,4 +111,27 @@ async def fetch_value(query: str, *args):
         raise RuntimeError("Database pool not initialized")
     
     async with db_pool.acquire() as connection:
-        return await connection.fetchval(query, *args)
\ No newline at end of file
+        return await connection.fetchval(query, *args)
+
+async def insert_many(connection, table: str, columns: Sequence[str], column_types: Sequence[str],
+                      records: Sequence[Sequence], on_conflict: Optional[str] = None,
+                      returning: Optional[str] = None) -> List[asyncpg.Record]:
+    """Insert ``records`` in one round trip (``INSERT ... SELECT * FROM unnest(...)``).
+
+    ``column_types`` are the Postgres types of ``columns`` (e.g. ``uuid``, ``text``);
+    ``on_conflict`` is a conflict target such as ``(rfq_id, supplier_id)`` whose rows
+    are skipped. With ``returning`` the inserted rows are returned.
+    """
+    if not records:
+        return []
+    arrays = [f"${i}::{column_type}[]" for i, column_type in enumerate(column_types, start=1)]
+    query = f"INSERT INTO {table} ({', '.join(columns)}) SELECT * FROM unnest({', '.join(arrays)})"
+    if on_conflict:
+        query += f" ON CONFLICT {on_conflict} DO NOTHING"
+    if returning:
+        query += f" RETURNING {returning}"
+    values = [list(column) for column in zip(*records)]
+    if returning:
+        return await connection.fetch(query, *values)
+    await connection.execute(query, *values)
+    return []
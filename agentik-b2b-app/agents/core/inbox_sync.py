@@ -0,0 +1,251 @@
+import asyncio
+import email
+import imaplib
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from email import policy
+from email.utils import parseaddr
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# Outgoing invitation Message-ID -> {"rfq_id", "supplier_id", ...}; replies are matched through it
+THREAD_KEY = "inbox:thread:{message_id}"
+THREAD_TTL = 60 * 24 * 3600
+# Per account/mailbox: {"uidvalidity", "last_uid", "synced_at"}
+CHECKPOINT_KEY = "inbox:checkpoint:{account}:{mailbox}"
+# Replies already handed to the parser, claimed with SET NX before a reply is
+# yielded: concurrent syncs (parser workers, replicas) and re-scans after a
+# UIDVALIDITY change hand each reply out once
+SEEN_KEY = "inbox:seen:{message_id}"
+
+# First sync, or a mailbox whose UIDs were reset, only looks this far back
+INITIAL_SYNC_DAYS = 14
+
+HEADER_FIELDS = "MESSAGE-ID IN-REPLY-TO REFERENCES FROM SUBJECT DATE"
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_MESSAGE_IDS = re.compile(r"<[^<>\s]+>")
+_FETCH_UID = re.compile(rb"UID (\d+)")
+_STATUS = re.compile(rb"(UIDVALIDITY|UIDNEXT) (\d+)")
+_TAGS = re.compile(r"<[^>]+>")
+
+
+async def remember_threads(redis, threads: Dict[str, Dict[str, Any]], ttl: int = THREAD_TTL):
+    """Record outgoing invitations (Message-ID -> context) so ``InboxSync`` recognises replies"""
+    if not threads:
+        return
+    pipe = redis.pipeline(transaction=False)
+    for message_id, context in threads.items():
+        pipe.set(THREAD_KEY.format(message_id=message_id), json.dumps(context, default=str), ex=ttl)
+    await pipe.execute()
+
+
+def imap_date(day: datetime) -> str:
+    """IMAP SEARCH date (01-Jan-2025), independent of the process locale"""
+    return f"{day.day:02d}-{_MONTHS[day.month - 1]}-{day.year}"
+
+
+def message_text(message: email.message.EmailMessage) -> str:
+    """Plain-text body (HTML stripped when that is all there is)"""
+    part = message.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return ""
+    content = part.get_content()
+    return _TAGS.sub(" ", content) if part.get_content_subtype() == "html" else content
+
+
+class InboxSync:
+    """
+    Incremental IMAP ingestion of replies to RFQ invitations.
+
+    Each run searches only UIDs above the checkpoint stored in Redis (the
+    whole recent window when UIDVALIDITY changed), fetches headers in batches
+    and downloads full bodies only for messages whose In-Reply-To/References
+    point at a recorded invitation. ``messages()`` yields them as a stream;
+    the checkpoint advances once a batch has been consumed. Runs may overlap:
+    each reply is claimed atomically before it is yielded, so only one run
+    hands it out.
+    """
+
+    def __init__(
+        self,
+        redis,
+        host: str,
+        username: str,
+        password: str,
+        port: int = 993,
+        mailbox: str = "INBOX",
+        batch_size: int = 200,
+        use_ssl: bool = True,
+        connect: Optional[Callable[[], Any]] = None,
+    ):
+        self.redis = redis
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port
+        self.mailbox = mailbox
+        self.batch_size = batch_size
+        self.use_ssl = use_ssl
+        self._connect_client = connect
+        self.checkpoint_key = CHECKPOINT_KEY.format(account=username, mailbox=mailbox)
+
+    @classmethod
+    def from_env(cls, redis) -> Optional["InboxSync"]:
+        """``IMAP_HOST``/``IMAP_USERNAME``/``IMAP_PASSWORD`` (None when not configured)"""
+        host = os.getenv("IMAP_HOST")
+        username = os.getenv("IMAP_USERNAME")
+        password = os.getenv("IMAP_PASSWORD")
+        if not (host and username and password and redis):
+            return None
+        return cls(
+            redis,
+            host,
+            username,
+            password,
+            port=int(os.getenv("IMAP_PORT", "993")),
+            mailbox=os.getenv("IMAP_MAILBOX", "INBOX"),
+            batch_size=int(os.getenv("IMAP_BATCH_SIZE", "200")),
+            use_ssl=os.getenv("IMAP_SSL", "true").lower() == "true",
+        )
+
+    # Blocking imaplib calls; run through asyncio.to_thread
+
+    def _connect(self):
+        if self._connect_client:
+            client = self._connect_client()
+        elif self.use_ssl:
+            client = imaplib.IMAP4_SSL(self.host, self.port)
+        else:
+            client = imaplib.IMAP4(self.host, self.port)
+        client.login(self.username, self.password)
+        return client
+
+    def _status(self, client) -> Tuple[int, int]:
+        typ, data = client.status(self.mailbox, "(UIDVALIDITY UIDNEXT)")
+        if typ != "OK":
+            raise RuntimeError(f"IMAP STATUS {self.mailbox} failed: {data}")
+        values = dict(_STATUS.findall(data[0]))
+        client.select(self.mailbox, readonly=True)
+        return int(values[b"UIDVALIDITY"]), int(values[b"UIDNEXT"])
+
+    def _search(self, client, *criteria: str) -> List[int]:
+        typ, data = client.uid("SEARCH", None, *criteria)
+        if typ != "OK":
+            raise RuntimeError(f"IMAP SEARCH failed: {data}")
+        return sorted(int(uid) for uid in (data[0] or b"").split())
+
+    def _fetch(self, client, uids: List[int], items: str) -> Dict[int, bytes]:
+        typ, data = client.uid("FETCH", ",".join(map(str, uids)), items)
+        if typ != "OK":
+            raise RuntimeError(f"IMAP FETCH failed: {data}")
+        fetched = {}
+        for item in data:
+            if isinstance(item, tuple):
+                uid = _FETCH_UID.search(item[0])
+                if uid:
+                    fetched[int(uid.group(1))] = item[1]
+        return fetched
+
+    def _logout(self, client):
+        try:
+            client.logout()
+        except Exception:
+            pass
+
+    # Checkpoint and thread lookups
+
+    async def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(self.checkpoint_key)
+        return json.loads(raw) if raw else None
+
+    async def _save_checkpoint(self, uidvalidity: int, last_uid: int):
+        checkpoint = {"uidvalidity": uidvalidity, "last_uid": last_uid, "synced_at": datetime.utcnow().isoformat()}
+        await self.redis.set(self.checkpoint_key, json.dumps(checkpoint))
+
+    async def _match_threads(self, headers: Dict[int, bytes]) -> Dict[int, Tuple[Dict[str, Any], str]]:
+        """UIDs replying to a recorded invitation and not handed out before -> (thread, Message-ID)"""
+        candidates = []
+        for uid, raw in headers.items():
+            parsed = email.message_from_bytes(raw, policy=policy.default)
+            references = _MESSAGE_IDS.findall(f"{parsed.get('In-Reply-To', '')} {parsed.get('References', '')}")
+            if references:
+                candidates.append((uid, str(parsed.get("Message-ID", "")).strip(), references))
+        if not candidates:
+            return {}
+
+        keys = [THREAD_KEY.format(message_id=ref) for _, _, refs in candidates for ref in refs]
+        keys += [SEEN_KEY.format(message_id=message_id) for _, message_id, _ in candidates]
+        values = dict(zip(keys, await self.redis.mget(keys)))
+
+        matched = {}
+        for uid, message_id, references in candidates:
+            if message_id and values.get(SEEN_KEY.format(message_id=message_id)):
+                continue
+            for ref in references:  # In-Reply-To first, then the References chain
+                thread = values.get(THREAD_KEY.format(message_id=ref))
+                if thread:
+                    matched[uid] = (json.loads(thread), message_id)
+                    break
+        return matched
+
+    async def _claim(self, uidvalidity: int, uid: int, message_id: str) -> bool:
+        """Mark a reply as handed out; False when some run already did"""
+        seen = message_id or f"{self.checkpoint_key}:{uidvalidity}:{uid}"
+        return bool(await self.redis.set(SEEN_KEY.format(message_id=seen), "1", ex=THREAD_TTL, nx=True))
+
+    async def messages(self) -> AsyncIterator[Dict[str, Any]]:
+        """Stream new replies to RFQ invitations"""
+        client = await asyncio.to_thread(self._connect)
+        try:
+            checkpoint = await self.load_checkpoint()
+            uidvalidity, uidnext = await asyncio.to_thread(self._status, client)
+
+            if checkpoint and checkpoint["uidvalidity"] == uidvalidity:
+                last_uid = checkpoint["last_uid"]
+                if uidnext - 1 <= last_uid:
+                    return
+                uids = await asyncio.to_thread(self._search, client, "UID", f"{last_uid + 1}:*")
+            else:
+                # New mailbox or UIDs were reset: UIDs mean nothing, rescan the recent window
+                last_uid = 0
+                since = datetime.utcnow() - timedelta(days=INITIAL_SYNC_DAYS)
+                if checkpoint:
+                    since = min(since, datetime.fromisoformat(checkpoint["synced_at"]) - timedelta(days=1))
+                uids = await asyncio.to_thread(self._search, client, "SINCE", imap_date(since))
+
+            # "n:*" always returns the newest message, even when its UID is below n
+            uids = [uid for uid in uids if uid > last_uid]
+            if not uids:
+                await self._save_checkpoint(uidvalidity, last_uid)
+                return
+
+            for start in range(0, len(uids), self.batch_size):
+                batch = uids[start:start + self.batch_size]
+                headers = await asyncio.to_thread(self._fetch, client, batch, f"(UID BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])")
+                matched = await self._match_threads(headers)
+                if matched:
+                    bodies = await asyncio.to_thread(self._fetch, client, sorted(matched), "(UID BODY.PEEK[])")
+                    for uid in sorted(matched):
+                        if uid not in bodies:
+                            continue
+                        thread, message_id = matched[uid]
+                        if not await self._claim(uidvalidity, uid, message_id):
+                            # Another sync run already handed this reply out
+                            continue
+                        yield self._message(uid, bodies[uid], thread)
+                await self._save_checkpoint(uidvalidity, batch[-1])
+        finally:
+            await asyncio.to_thread(self._logout, client)
+
+    def _message(self, uid: int, raw: bytes, thread: Dict[str, Any]) -> Dict[str, Any]:
+        parsed = email.message_from_bytes(raw, policy=policy.default)
+        return {
+            "uid": uid,
+            "message_id": str(parsed.get("Message-ID", "")).strip(),
+            "sender": parseaddr(str(parsed.get("From", "")))[1],
+            "subject": str(parsed.get("Subject", "")),
+            "date": str(parsed.get("Date", "")),
+            "content": message_text(parsed),
+            "thread": thread,
+        }
@@ -20,6 +20,16 @@ class AgentOrchestrator:
         self.agent_status: Dict[str, Dict[str, Any]] = {}
         self.workflows: Dict[str, List[str]] = {}
         
+        # Task queue polling: one multi-key BRPOP per poll.
+        # 'priority' always drains the agent's own queue first; 'weighted' rotates
+        # which queue is served first in proportion to AGENT_QUEUE_WEIGHTS.
+        self.queue_policy = os.getenv('AGENT_QUEUE_POLICY', 'priority').lower()
+        self.queue_weights = [
+            max(1, int(w)) for w in os.getenv('AGENT_QUEUE_WEIGHTS', '5,3,1').split(',')
+        ]
+        self.poll_timeout = int(os.getenv('AGENT_QUEUE_POLL_TIMEOUT', '5'))
+        self._poll_credits: Dict[str, List[int]] = {}
+        
         # Define agent workflows
         self._define_workflows()
         
@@ -161,9 +171,8 @@ class AgentOrchestrator:
                     })
                     
                 else:
-                    # No tasks, sleep briefly and reset error counter
+                    # No tasks (BRPOP already blocked for poll_timeout), reset error counter
                     consecutive_errors = 0
-                    await asyncio.sleep(1)
                     
                 # If too many consecutive errors, pause the agent
                 if consecutive_errors >= max_consecutive_errors:
@@ -182,36 +191,55 @@ class AgentOrchestrator:
                 else:
                     await asyncio.sleep(5)
                     
+    def get_agent_queues(self, agent_name: str) -> List[str]:
+        """Queue names an agent consumes, highest priority first"""
+        return [
+            f"agent_{agent_name}_queue",
+            f"{agent_name.lower()}_queue",
+            "general_queue"
+        ]
+        
+    def _poll_order(self, agent_name: str) -> List[str]:
+        """Order of keys for the next BRPOP (Redis pops from the first non-empty key)"""
+        queue_names = self.get_agent_queues(agent_name)
+        if self.queue_policy != 'weighted':
+            return queue_names
+            
+        # Smooth weighted round-robin over which queue is checked first, so
+        # lower-priority queues still get served while higher ones are busy
+        weights = (self.queue_weights + [1] * len(queue_names))[:len(queue_names)]
+        credits = self._poll_credits.setdefault(agent_name, [0] * len(queue_names))
+        for i, weight in enumerate(weights):
+            credits[i] += weight
+        first = max(range(len(queue_names)), key=lambda i: credits[i])
+        credits[first] -= sum(weights)
+        return [queue_names[first]] + [q for i, q in enumerate(queue_names) if i != first]
+            
     async def get_task_for_agent(self, agent_name: str) -> Optional[Dict[str, Any]]:
         """Enhanced task retrieval with multiple queue support"""
         if not self.redis_client:
+            await asyncio.sleep(1)
             return None
             
         try:
-            # Check multiple queue names for the agent
-            queue_names = [
-                f"agent_{agent_name}_queue",
-                f"{agent_name.lower()}_queue",
-                "general_queue"
-            ]
-            
-            for queue_name in queue_names:
-                # Use BRPOP with timeout for efficient blocking
-                result = await self.redis_client.brpop([queue_name], timeout=1)
-                if result:
-                    queue, task_json = result
-                    task_data = json.loads(task_json)
-                    
-                    # Add metadata
-                    task_data['retrieved_from_queue'] = queue
-                    task_data['retrieved_at'] = datetime.utcnow().isoformat()
-                    
-                    return task_data
+            # Single blocking pop across all of the agent's queues: returns as soon
+            # as any of them has work, instead of waiting out a timeout per queue
+            result = await self.redis_client.brpop(self._poll_order(agent_name), timeout=self.poll_timeout)
+            if result:
+                queue, task_json = result
+                task_data = json.loads(task_json)
+                
+                # Add metadata
+                task_data['retrieved_from_queue'] = queue
+                task_data['retrieved_at'] = datetime.utcnow().isoformat()
+                
+                return task_data
                     
             return None
             
         except Exception as e:
             logger.error(f"Error getting task for agent {agent_name}: {e}")
+            await asyncio.sleep(1)
             return None
             
     async def queue_task(self, agent_name: str, task_data: Dict[str, Any]) -> bool:
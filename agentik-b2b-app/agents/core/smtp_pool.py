@@ -0,0 +1,146 @@
+import asyncio
+import time
+from email.message import Message
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiosmtplib
+from loguru import logger
+
+# The server dropped the session (idle timeout, restart): reconnect and retry once
+_RECONNECT_ERRORS = (aiosmtplib.SMTPServerDisconnected, ConnectionError)
+
+
+def recipient_domain(address: str) -> str:
+    return str(address or "").rsplit("@", 1)[-1].strip(" >").lower()
+
+
+class DomainRateLimiter:
+    """Spaces sends to the same recipient domain at least ``1 / rate`` seconds apart (0 disables)"""
+
+    def __init__(self, rate: float = 0.0):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, domain: str):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(domain, now))
+        self._next_slot[domain] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class SMTPPool:
+    """
+    Pool of authenticated SMTP sessions shared by concurrent sends.
+
+    At most ``size`` connections are open at once; idle sessions are reused
+    (no TCP/STARTTLS/LOGIN per message) and recycled after ``max_messages``
+    sends or ``idle_timeout`` idle seconds.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 5,
+        start_tls: Optional[bool] = True,
+        timeout: float = 30.0,
+        max_messages: int = 100,
+        idle_timeout: float = 60.0,
+        domain_rate: float = 0.0,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.limiter = DomainRateLimiter(domain_rate)
+        self._idle: List[Tuple[aiosmtplib.SMTP, int, float]] = []  # (client, messages sent, last used)
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, start_tls=self.start_tls, timeout=self.timeout)
+        await client.connect()
+        if self.username and self.password:
+            await client.login(self.username, self.password)
+        return client
+
+    async def _acquire(self) -> Tuple[aiosmtplib.SMTP, int]:
+        await self._slots.acquire()
+        try:
+            now = time.monotonic()
+            while self._idle:
+                client, sent, last_used = self._idle.pop()
+                if client.is_connected and now - last_used < self.idle_timeout:
+                    return client, sent
+                self._discard(client)
+            return await self._connect(), 0
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _release(self, client: Optional[aiosmtplib.SMTP], sent: int):
+        try:
+            if client is None:
+                return
+            if client.is_connected and sent < self.max_messages:
+                self._idle.append((client, sent, time.monotonic()))
+            else:
+                await self._quit(client)
+        finally:
+            self._slots.release()
+
+    async def _quit(self, client: aiosmtplib.SMTP):
+        try:
+            await client.quit()
+        except Exception:
+            self._discard(client)
+
+    def _discard(self, client: Optional[aiosmtplib.SMTP]):
+        if client is not None:
+            client.close()
+
+    async def send(self, message: Message):
+        """Send one message on a pooled session; raises on delivery failure"""
+        await self.limiter.wait(recipient_domain(message["To"]))
+        client, sent = await self._acquire()
+        try:
+            try:
+                await client.send_message(message)
+            except _RECONNECT_ERRORS:
+                self._discard(client)
+                client, sent = None, 0
+                client = await self._connect()
+                await client.send_message(message)
+            sent += 1
+        except BaseException:
+            self._discard(client)
+            client = None
+            raise
+        finally:
+            await self._release(client, sent)
+
+    async def send_many(self, messages: Sequence[Message]) -> List[Dict[str, Any]]:
+        """Send concurrently (bounded by the pool size); one result per message, in order"""
+        async def deliver(message: Message) -> Dict[str, Any]:
+            try:
+                await self.send(message)
+                return {"recipient": message["To"], "success": True}
+            except Exception as e:
+                logger.error(f"Failed to send email to {message['To']}: {e}")
+                return {"recipient": message["To"], "success": False, "error": str(e)}
+
+        return list(await asyncio.gather(*(deliver(message) for message in messages)))
+
+    async def close(self):
+        while self._idle:
+            client, _, _ = self._idle.pop()
+            await self._quit(client)
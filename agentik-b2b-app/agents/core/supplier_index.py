@@ -0,0 +1,159 @@
+import bisect
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+# Turkish letters fold onto ASCII so "Çimento", "ÇİMENTO" and "cimento" share one term;
+# dotted/dotless i both become "i" (str.lower() alone turns "İ" into "i̇")
+_TURKISH_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i", "Ş": "s", "ş": "s", "Ğ": "g", "ğ": "g",
+    "Ü": "u", "ü": "u", "Ö": "o", "ö": "o", "Ç": "c", "ç": "c",
+    "Â": "a", "â": "a", "Î": "i", "î": "i", "Û": "u", "û": "u",
+})
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+# Supplier fields that feed the text index (row shapes of both supplier tables)
+TEXT_FIELDS = ("name", "company", "company_name", "description", "industry", "specializations", "products", "product_names")
+
+# Query terms at least this long also match longer index terms (Turkish suffixes: beton -> betonlar)
+PREFIX_MIN_LENGTH = 4
+
+
+def normalize(text: Any) -> str:
+    return str(text or "").translate(_TURKISH_FOLD).lower()
+
+
+def tokenize(text: Any) -> List[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+def supplier_text(supplier: Dict[str, Any]) -> str:
+    parts = []
+    for field in TEXT_FIELDS:
+        value = supplier.get(field)
+        if isinstance(value, dict):
+            value = [v.get("name", "") if isinstance(v, dict) else v for v in value.values()]
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(v.get("name", "") if isinstance(v, dict) else v) for v in value)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+class SupplierIndex:
+    """
+    Incremental inverted index over supplier text with BM25 scoring.
+
+    Only postings of the query terms (and the requested category) are touched,
+    so a lookup costs O(matching suppliers) rather than O(all suppliers).
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[Hashable, int]] = defaultdict(dict)
+        self.categories: Dict[str, Set[Hashable]] = defaultdict(set)
+        self.docs: Dict[Hashable, Dict[str, Any]] = {}
+        self._doc_terms: Dict[Hashable, Counter] = {}
+        self._doc_lengths: Dict[Hashable, int] = {}
+        self._doc_categories: Dict[Hashable, List[str]] = {}
+        self._terms: List[str] = []  # sorted vocabulary for prefix lookups
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self.docs
+
+    def upsert(self, doc_id: Hashable, supplier: Dict[str, Any], categories: Optional[Iterable[str]] = None):
+        """Add or replace one supplier"""
+        self.remove(doc_id)
+        terms = Counter(tokenize(supplier_text(supplier)))
+        cats = [normalize(c) for c in (categories if categories is not None else supplier.get("categories") or []) if c]
+        self.docs[doc_id] = supplier
+        self._doc_terms[doc_id] = terms
+        self._doc_categories[doc_id] = cats
+        self._doc_lengths[doc_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, tf in terms.items():
+            if not self.postings[term]:
+                bisect.insort(self._terms, term)
+            self.postings[term][doc_id] = tf
+        for cat in cats:
+            self.categories[cat].add(doc_id)
+
+    def remove(self, doc_id: Hashable):
+        if doc_id not in self.docs:
+            return
+        terms = self._doc_terms.pop(doc_id)
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+                self._terms.pop(bisect.bisect_left(self._terms, term))
+        for cat in self._doc_categories.pop(doc_id):
+            self.categories[cat].discard(doc_id)
+            if not self.categories[cat]:
+                del self.categories[cat]
+        del self.docs[doc_id]
+
+    def clear(self):
+        for doc_id in list(self.docs):
+            self.remove(doc_id)
+
+    def _expand(self, term: str) -> List[str]:
+        if len(term) < PREFIX_MIN_LENGTH:
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self._terms, term)
+        end = bisect.bisect_left(self._terms, term + "\uffff", start)
+        return self._terms[start:end]
+
+    def scores(self, keywords: Iterable[str], candidates: Optional[Set[Hashable]] = None) -> Dict[Hashable, float]:
+        """BM25 score of every supplier containing a query term (limited to ``candidates`` if given)"""
+        n = len(self.docs)
+        if not n:
+            return {}
+        avgdl = (self._total_length / n) or 1.0
+        scores: Dict[Hashable, float] = defaultdict(float)
+        for query_term in set(tokenize(" ".join(map(str, keywords)))):
+            for term in self._expand(query_term):
+                postings = self.postings[term]
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if candidates is not None and doc_id not in candidates:
+                        continue
+                    length = self._doc_lengths[doc_id]
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+        return scores
+
+    def search(
+        self,
+        keywords: Iterable[str],
+        category: Optional[str] = None,
+        within_category: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Suppliers ranked by BM25 score, best first.
+
+        With a category, ``within_category`` returns every supplier of that
+        category (score 0 when no keyword matched); otherwise keyword hits from
+        any category are added to the category's suppliers.
+        """
+        keywords = list(keywords)
+        in_category = self.categories.get(normalize(category), set()) if category else None
+        if in_category is not None and within_category:
+            scores = self.scores(keywords, in_category)
+            ranked = [(doc_id, scores.get(doc_id, 0.0)) for doc_id in in_category]
+        else:
+            scores = self.scores(keywords)
+            for doc_id in in_category or ():
+                scores.setdefault(doc_id, 0.0)
+            ranked = list(scores.items())
+        ranked.sort(key=lambda item: (-item[1], str(item[0])))
+        return ranked[:limit] if limit is not None else ranked
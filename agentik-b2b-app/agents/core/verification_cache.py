@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Returned by ``get`` when nothing usable is cached (None is a cached "not found")
+MISS = object()
+
+
+def profile_version(row: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Version of a supplier profile: its ``updated_at`` (None when unknown)"""
+    if not row or row.get("updated_at") is None:
+        return None
+    return str(row["updated_at"])
+
+
+class VerificationCache:
+    """
+    Per-supplier verification results with a TTL.
+
+    Entries remember the profile version (``updated_at``) they were built
+    from; a lookup with a different version is a miss. Suppliers that were
+    not found are cached as None for a shorter ``negative_ttl`` so repeated
+    offers from an unknown supplier do not each hit the database.
+    ``invalidate`` drops a supplier after its profile was written.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[int] = None,
+        negative_ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds or int(os.getenv("SUPPLIER_VERIFICATION_CACHE_TTL", "600"))
+        self.negative_ttl_seconds = negative_ttl_seconds or int(os.getenv("SUPPLIER_VERIFICATION_NEGATIVE_TTL", "60"))
+        self.max_entries = max_entries or int(os.getenv("SUPPLIER_VERIFICATION_CACHE_SIZE", "1024"))
+        self._clock = clock
+        # supplier_id -> (expires_at, version, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Optional[str], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, supplier_id: Hashable, version: Optional[str] = None) -> Any:
+        """Cached value, or ``MISS`` when absent, expired or built from another profile version"""
+        with self._lock:
+            entry = self._entries.get(supplier_id)
+            if entry is not None:
+                expires_at, cached_version, value = entry
+                if expires_at <= self._clock():
+                    del self._entries[supplier_id]
+                elif version is None or cached_version is None or version == cached_version:
+                    self._entries.move_to_end(supplier_id)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return MISS
+
+    def put(self, supplier_id: Hashable, value: Any, version: Optional[str] = None):
+        """Store a result; None records a negative ("not found") entry"""
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        with self._lock:
+            self._entries[supplier_id] = (self._clock() + ttl, version, value)
+            self._entries.move_to_end(supplier_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_load(
+        self,
+        supplier_id: Hashable,
+        loader: Callable[[Hashable], Awaitable[Optional[Dict[str, Any]]]],
+        version: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Cached value, otherwise ``await loader(supplier_id)``.
+
+        Loaded results carry the profile row under ``"supplier"``; its
+        ``updated_at`` becomes the entry's version.
+        """
+        value = self.get(supplier_id, version)
+        if value is not MISS:
+            return value
+        value = await loader(supplier_id)
+        self.put(supplier_id, value, version or profile_version((value or {}).get("supplier")))
+        return value
+
+    def invalidate(self, supplier_id: Hashable):
+        with self._lock:
+            self._entries.pop(supplier_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
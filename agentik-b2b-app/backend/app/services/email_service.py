@@ -7,9 +7,24 @@ import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.core.config import settings
-import jinja2
+from app.services.email_templates import TemplateRegistry
 import os
 
+# Bodies rendered by the services; subjects and queued bodies go through
+# email_templates.from_string (compiled once per distinct source)
+email_templates = TemplateRegistry({
+    "rfq_invitation": """
+                <h2>Yeni RFQ Daveti</h2>
+                <p>Merhaba,</p>
+                <p>Aşağıdaki RFQ için teklif vermenizi bekliyoruz:</p>
+                <h3>{{ rfq.title }}</h3>
+                <p>{{ rfq.description }}</p>
+                <p>Kategori: {{ rfq.category or 'Belirtilmemiş' }}</p>
+                <p>Son tarih: {{ rfq.deadline_date or 'Belirtilmemiş' }}</p>
+                <p>Teklif vermek için platformumuzu ziyaret edin.</p>
+                """,
+})
+
 class EmailService:
     """Service for email operations"""
     
@@ -79,14 +94,12 @@ class EmailService:
                 template_info = EmailService.TEMPLATES[email_data["email_type"]]
                 
                 # Render subject
-                subject_template = jinja2.Template(template_info["subject"])
-                subject = subject_template.render(**template_data)
+                subject = email_templates.from_string(template_info["subject"]).render(**template_data)
                 
                 # Render body (placeholder - would load from template files)
                 body = email_data["body"]
                 if template_data:
-                    body_template = jinja2.Template(body)
-                    body = body_template.render(**template_data)
+                    body = email_templates.from_string(body).render(**template_data)
                 
                 email_data["subject"] = subject
                 email_data["body"] = body
@@ -150,16 +163,7 @@ class EmailService:
                 sender_email=settings.SMTP_USERNAME,
                 recipient_email=supplier_email,
                 subject=f"RFQ Davetiniz - {rfq_data['title']}",
-                body=f"""
-                <h2>Yeni RFQ Daveti</h2>
-                <p>Merhaba,</p>
-                <p>Aşağıdaki RFQ için teklif vermenizi bekliyoruz:</p>
-                <h3>{rfq_data['title']}</h3>
-                <p>{rfq_data['description']}</p>
-                <p>Kategori: {rfq_data.get('category', 'Belirtilmemiş')}</p>
-                <p>Son tarih: {rfq_data.get('deadline_date', 'Belirtilmemiş')}</p>
-                <p>Teklif vermek için platformumuzu ziyaret edin.</p>
-                """,
+                body=email_templates.render("rfq_invitation", rfq=rfq_data),
                 email_type=EmailType.RFQ_INVITATION,
                 rfq_id=rfq_data["id"]
             )
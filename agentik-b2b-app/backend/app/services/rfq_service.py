@@ -1,3 +1,4 @@
+import re
 from supabase import Client
 from loguru import logger
 from typing import Dict, Any, Optional, List
@@ -5,6 +6,27 @@ from uuid import UUID
 from app.models.rfq import RFQ, RFQCreate, RFQUpdate, RFQStatus
 from app.core.redis_client import RedisService
 
+# LIKE wildcards and the escape character itself are matched literally
+_LIKE_SPECIAL = re.compile(r'([\\%_])')
+
+
+def _substring_pattern(term: str) -> Optional[str]:
+    """
+    Quoted ``"%term%"`` value for a PostgREST ``ilike`` filter, or None for a blank term.
+
+    The term is kept as typed (dots, commas, parentheses included) so the
+    substring still hits the pg_trgm GIN indexes: LIKE wildcards are
+    backslash-escaped and the value is double-quoted for the ``or=`` filter.
+    PostgREST reads ``*`` as ``%``, so it is treated as a space.
+    """
+    term = term.replace("*", " ").strip()
+    if not term:
+        return None
+    escaped = _LIKE_SPECIAL.sub(r"\\\1", term)
+    quoted = escaped.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"%{quoted}%"'
+
+
 class RFQService:
     """Service for RFQ business logic"""
     
@@ -130,9 +152,10 @@ class RFQService:
             if filters.get("category"):
                 query = query.eq("category", filters["category"])
             
-            if filters.get("search"):
-                search_term = filters["search"]
-                query = query.or_(f"title.ilike.%{search_term}%,description.ilike.%{search_term}%")
+            pattern = _substring_pattern(filters.get("search") or "")
+            if pattern:
+                # Both sides hit a trigram index (idx_rfqs_title_trgm / idx_rfqs_description_trgm) -> BitmapOr
+                query = query.or_(f"title.ilike.{pattern},description.ilike.{pattern}")
             
             # Access control
             if user_company_id:
@@ -1,6 +1,6 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Path, BackgroundTasks, Body, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, Query, Path, BackgroundTasks, Body, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional, Dict, Any
 import json
 import os
@@ -9,7 +9,7 @@ from loguru import logger
 
 # Import local modules
 from app.database import supabase, supabase_admin, supabase_client
-from app.redis_client import redis_client
+from app.redis_client import redis_client, RealRedisClient, JOB_PRIORITY_LANES, JOB_TERMINAL_STATUSES, agent_queue_keys
 from app.models import (
     RFQ, RFQCreate, RFQUpdate, RFQListResponse,
     Supplier, SupplierCreate, SupplierListResponse,
@@ -21,6 +21,7 @@ from app.models import (
 )
 from app.auth import get_current_user, get_current_user_optional, require_admin, require_permission
 from app.services.supplier_discovery import SupplierDiscoveryService
+from app.services.analysis_cache import SupplierAnalysisCache
 
 # Configure logging
 logger.add("logs/backend.log", rotation="1 day", retention="7 days", level="INFO")
@@ -36,6 +37,10 @@ app = FastAPI(
 
 # Initialize services
 supplier_discovery = SupplierDiscoveryService()
+supplier_analysis_cache = SupplierAnalysisCache(
+    supplier_discovery,
+    redis=redis_client.redis if os.getenv("SUPPLIER_ANALYSIS_CACHE_REDIS", "false").lower() == "true" and isinstance(redis_client, RealRedisClient) else None,
+)
 
 # Configure CORS
 _env = os.getenv("ENVIRONMENT", "development").lower()
@@ -54,12 +59,17 @@ app.add_middleware(
 )
 
 # Orchestrator (simple) endpoints using Redis jobs
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class OrchestrateRequest(BaseModel):
     job_type: str
     rfq_id: Optional[str] = None
     payload: Dict[str, Any] = {}
+    # Main queue lane; defaults from the RFQ priority when omitted
+    priority: Optional[str] = Field(None, pattern='^(high|normal|bulk)$')
+
+# RFQ priority -> main queue lane
+RFQ_PRIORITY_LANES = {"urgent": "high", "high": "high", "medium": "normal", "low": "bulk"}
 
 @app.delete("/orchestrate/{job_id}", response_model=BaseResponse, dependencies=[Depends(require_permission("workflow", "cancel"))])
 async def orchestrate_cancel(job_id: str, current_user: dict = Depends(get_current_user)):
@@ -74,6 +84,15 @@ async def orchestrate_cancel(job_id: str, current_user: dict = Depends(get_curre
             cancelled = redis_client.cancel_job(job_id)
         except Exception as e:
             logger.warning(f"cancel_job failed: {e}")
+        # best-effort persist; agents write the row on their own status transitions
+        try:
+            supabase.table("jobs").update({
+                "status": "failed",
+                "updated_at": datetime.utcnow().isoformat(),
+                "error": "cancelled by user",
+            }).eq("id", job_id).execute()
+        except Exception as e:
+            logger.warning(f"update job row failed: {e}")
         return BaseResponse(success=True, message="Job cancelled" if cancelled else "Job marked as failed", data={"job_id": job_id})
     except HTTPException:
         raise
@@ -85,12 +104,15 @@ async def orchestrate_cancel(job_id: str, current_user: dict = Depends(get_curre
 async def orchestrate_job(req: OrchestrateRequest, current_user: dict = Depends(get_current_user)):
     try:
         job_payload = {"rfq_id": req.rfq_id, **(req.payload or {})}
+        priority = req.priority
         # RFQ sağlama ve payload'a ekleme (varsa)
         if req.rfq_id:
             rfq_resp = supabase.table("rfqs").select("*").eq("id", req.rfq_id).eq("requester_id", current_user["user_id"]).maybe_single().execute()
             if not rfq_resp.data:
                 raise HTTPException(status_code=404, detail="RFQ not found")
             job_payload["rfq"] = rfq_resp.data
+            if not priority:
+                priority = RFQ_PRIORITY_LANES.get(rfq_resp.data.get("priority"), "normal")
             # RFQ durumunu güncelle (best-effort)
             try:
                 supabase.table("rfqs").update({
@@ -99,12 +121,8 @@ async def orchestrate_job(req: OrchestrateRequest, current_user: dict = Depends(
                 }).eq("id", req.rfq_id).execute()
             except Exception as e:
                 logger.warning(f"RFQ status update failed: {e}")
-        job_id = redis_client.create_job(req.job_type, job_payload, current_user["user_id"])
-        # record mapping for recent jobs
-        try:
-            redis_client.record_user_job(current_user["user_id"], job_id)
-        except Exception as e:
-            logger.warning(f"record_user_job failed: {e}")
+        # create_job also indexes the job under user:{id}:jobs for /orchestrate/recent
+        job_id = redis_client.create_job(req.job_type, job_payload, current_user["user_id"], priority=priority or "normal")
         # persist job row (best-effort) in Supabase
         try:
             supabase.table("jobs").insert({
@@ -119,7 +137,7 @@ async def orchestrate_job(req: OrchestrateRequest, current_user: dict = Depends(
             }).execute()
         except Exception as e:
             logger.warning(f"persist job failed: {e}")
-        return BaseResponse(success=True, message="Job enqueued", data={"job_id": job_id})
+        return BaseResponse(success=True, message="Job enqueued", data={"job_id": job_id, "priority": priority or "normal"})
     except Exception as e:
         logger.error(f"Orchestrate failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -132,16 +150,7 @@ async def orchestrate_status(job_id: str, current_user: dict = Depends(get_curre
             raise HTTPException(status_code=404, detail="Job not found")
         if st.get("user_id") != current_user["user_id"]:
             raise HTTPException(status_code=403, detail="Forbidden")
-        # best-effort persist status update
-        try:
-            supabase.table("jobs").update({
-                "status": st.get("status"),
-                "updated_at": datetime.utcnow().isoformat(),
-                "result": st.get("result"),
-                "error": st.get("error"),
-            }).eq("id", job_id).execute()
-        except Exception as e:
-            logger.warning(f"update job row failed: {e}")
+        # Read-only: the jobs row is written where the status changes (agents, cancel)
         return BaseResponse(success=True, data={"job": st})
     except HTTPException:
         raise
@@ -149,6 +158,39 @@ async def orchestrate_status(job_id: str, current_user: dict = Depends(get_curre
         logger.error(f"Get status failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/orchestrate/stream/{job_id}", dependencies=[Depends(require_permission("workflow", "read"))])
+async def orchestrate_stream(job_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Server-sent events: current job status, then each stage transition until the job ends."""
+    st = redis_client.get_job_status(job_id)
+    if not st:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if st.get("user_id") != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    async def event_source():
+        events = redis_client.job_events(job_id)
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    # keep proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: status\ndata: {json.dumps(event, default=str)}\n\n"
+                if event.get("status") in JOB_TERMINAL_STATUSES:
+                    break
+        except Exception as e:
+            logger.warning(f"job stream {job_id} closed: {e}")
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/orchestrate/recent", response_model=BaseResponse, dependencies=[Depends(require_permission("workflow", "read"))])
 async def orchestrate_recent(
     limit: int = Query(10, ge=1, le=50),
@@ -194,16 +236,18 @@ async def orchestrate_history(
 async def orchestrate_queues(current_user: dict = Depends(get_current_user)):
     """Return snapshot of orchestrator queues to aid visibility and debugging."""
     try:
-        snapshot = {"main": 0, "agents": {}}
+        snapshot = {"main": 0, "main_lanes": {}, "agents": {}}
         r = getattr(redis_client, 'redis', None)
         if r is not None and hasattr(r, 'llen'):
-            snapshot["main"] = r.llen('agentik:jobs')
+            for lane, key in JOB_PRIORITY_LANES.items():
+                snapshot["main_lanes"][lane] = r.llen(key)
+            snapshot["main"] = sum(snapshot["main_lanes"].values())
             for q in [
                 'rfq_intake', 'supplier_discovery', 'email_send',
                 'inbox_parser', 'supplier_verifier', 'aggregation_report'
             ]:
                 try:
-                    snapshot["agents"][q] = r.llen(f'agentik:agent:{q}')
+                    snapshot["agents"][q] = sum(r.llen(k) for k in agent_queue_keys(q))
                 except Exception:
                     snapshot["agents"][q] = None
         return BaseResponse(success=True, data=snapshot)
@@ -253,7 +297,7 @@ async def health_check():
                 'inbox_parser', 'supplier_verifier', 'aggregation_report'
             ]:
                 try:
-                    queues[q] = r.llen(f'agentik:agent:{q}')
+                    queues[q] = sum(r.llen(k) for k in agent_queue_keys(q))
                 except Exception:
                     pass
             if isinstance(redis_health, dict):
@@ -507,6 +551,8 @@ async def create_rfq(
             
             # Store supplier analysis in database or cache
             if supplier_analysis.get("success"):
+                # Warm the cache so the first analysis view is a hit
+                supplier_analysis_cache.put(created_rfq["id"], created_rfq, supplier_analysis)
                 # Store analysis result
                 analysis_data = {
                     "rfq_id": created_rfq["id"],
@@ -591,6 +637,8 @@ async def list_rfqs(
 @app.get("/rfqs/{rfq_id}/supplier-analysis", response_model=BaseResponse)
 async def get_supplier_analysis(
     rfq_id: str = Path(...),
+    top_k: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     current_user: dict = Depends(get_current_user)
 ):
     """Get supplier analysis and comparison report for an RFQ"""
@@ -603,9 +651,8 @@ async def get_supplier_analysis(
         
         rfq_data = rfq_response.data
         
-        # Generate fresh supplier analysis
-        logger.info(f"Generating supplier analysis for RFQ {rfq_id}")
-        supplier_analysis = await supplier_discovery.discover_suppliers(rfq_data)
+        # Cached per RFQ + scoring fields + supplier data version
+        supplier_analysis = await supplier_analysis_cache.discover(rfq_id, rfq_data, top_k=top_k, offset=offset)
         
         return BaseResponse(
             success=True,
@@ -625,6 +672,8 @@ async def get_supplier_analysis(
 @app.get("/rfqs/{rfq_id}/comparison-report", response_model=BaseResponse)
 async def get_comparison_report(
     rfq_id: str = Path(...),
+    top_k: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     current_user: dict = Depends(get_current_user)
 ):
     """Get detailed comparison report for RFQ suppliers"""
@@ -637,8 +686,8 @@ async def get_comparison_report(
         
         rfq_data = rfq_response.data
         
-        # Get supplier analysis
-        supplier_analysis = await supplier_discovery.discover_suppliers(rfq_data)
+        # Get supplier analysis (only the requested rows are hydrated; shared with /supplier-analysis)
+        supplier_analysis = await supplier_analysis_cache.discover(rfq_id, rfq_data, top_k=top_k, offset=offset)
         
         if not supplier_analysis.get("success"):
             raise HTTPException(status_code=404, detail="No supplier analysis available")
@@ -754,6 +803,7 @@ async def update_rfq(
             
             if response.data:
                 updated_rfq = response.data[0]
+                supplier_analysis_cache.invalidate(rfq_id)
                 logger.info(f"Updated RFQ {rfq_id} for user {current_user['user_id']}")
                 
                 return BaseResponse(
@@ -788,6 +838,7 @@ async def delete_rfq(
         
         # Delete RFQ (cascade will handle related records)
         supabase.table("rfqs").delete().eq("id", rfq_id).execute()
+        supplier_analysis_cache.invalidate(rfq_id)
         
         logger.info(f"Deleted RFQ {rfq_id} for user {current_user['user_id']}")
         
@@ -1220,27 +1271,17 @@ async def get_rfq_analytics(
     try:
         user_id = current_user["user_id"]
         
-        # Get RFQ statistics
-        total_response = supabase.table("rfqs").select("id", count="exact").eq("requester_id", user_id).execute()
-        active_response = supabase.table("rfqs").select("id", count="exact").eq("requester_id", user_id).in_("status", ["published", "in_progress"]).execute()
-        completed_response = supabase.table("rfqs").select("id", count="exact").eq("requester_id", user_id).eq("status", "completed").execute()
-        
-        # Get category breakdown
-        category_response = supabase.table("rfqs").select("category").eq("requester_id", user_id).execute()
-        categories = {}
-        for rfq in (category_response.data or []):
-            cat = rfq.get("category", "Unknown")
-            categories[cat] = categories.get(cat, 0) + 1
-        
-        top_categories = sorted(categories.items(), key=lambda x: x[1], reverse=True)[:5]
+        # Counters and category breakdown in one scan (supabase/migrations/1755956300)
+        response = supabase.rpc("get_rfq_analytics", {"p_requester_id": user_id, "p_top_categories": 5}).execute()
+        stats = response.data or {}
         
         analytics = RFQAnalytics(
-            total_rfqs=total_response.count or 0,
-            active_rfqs=active_response.count or 0,
-            completed_rfqs=completed_response.count or 0,
+            total_rfqs=stats.get("total_rfqs", 0),
+            active_rfqs=stats.get("active_rfqs", 0),
+            completed_rfqs=stats.get("completed_rfqs", 0),
             avg_response_time=None,  # Would need more complex query
             avg_offers_per_rfq=None,  # Would need more complex query
-            top_categories=[{"category": cat, "count": count} for cat, count in top_categories]
+            top_categories=stats.get("top_categories", [])
         )
         
         return BaseResponse(
@@ -1257,33 +1298,28 @@ async def get_jobs_analytics(
     days: int = Query(7, ge=1, le=30),
     current_user: dict = Depends(get_current_user)
 ):
-    """Return timeseries of job status counts for the last N days and queue snapshot."""
+    """Return timeseries of the caller's job status counts for the last N days and queue snapshot."""
     try:
         from datetime import timezone
         now = datetime.now(timezone.utc)
         days_list = [(now - timedelta(days=i)).date().isoformat() for i in range(days-1, -1, -1)]
         series = {"queued": [0]*days, "in_progress": [0]*days, "completed": [0]*days, "failed": [0]*days}
 
+        # (day, status, count) rows of the caller's jobs, grouped in the database
+        # (supabase/migrations/1755956400); at most days x statuses rows
         rows = []
         try:
-            resp = supabase.table("jobs").select("*").execute()
+            resp = supabase.rpc("get_job_status_series", {"p_user_id": current_user["user_id"], "p_days": days}).execute()
             rows = resp.data or []
         except Exception as e:
             logger.warning(f"jobs analytics fetch failed: {e}")
 
+        day_index = {d: i for i, d in enumerate(days_list)}
         for r in rows:
-            ts = r.get("updated_at") or r.get("created_at")
-            st = (r.get("status") or "").lower()
-            if not ts:
-                continue
-            try:
-                dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                d = dt.date().isoformat()
-                if d in days_list and st in series:
-                    idx = days_list.index(d)
-                    series[st][idx] += 1
-            except Exception:
-                continue
+            idx = day_index.get(str(r.get("day")))
+            st = r.get("status")
+            if idx is not None and st in series:
+                series[st][idx] += r.get("jobs") or 0
 
         queues = {}
         try:
@@ -1295,7 +1331,7 @@ async def get_jobs_analytics(
                     'inbox_parser', 'supplier_verifier', 'aggregation_report'
                 ]:
                     try:
-                        queues[q] = r.llen(f'agentik:agent:{q}')
+                        queues[q] = sum(r.llen(k) for k in agent_queue_keys(q))
                     except Exception:
                         pass
         except Exception as e:
@@ -1311,6 +1347,21 @@ async def get_jobs_analytics(
         raise HTTPException(status_code=500, detail=str(e))
 
 # Admin Endpoints
+@app.post("/admin/suppliers/reload", response_model=BaseResponse)
+async def admin_reload_suppliers(current_user: dict = Depends(require_admin)):
+    """Admin: Reload supplier data (invalidates cached supplier analyses; other workers follow the new snapshot)"""
+    try:
+        version = supplier_discovery.reload()
+        supplier_analysis_cache.clear()
+        return BaseResponse(
+            success=True,
+            message="Supplier data reloaded",
+            data={"data_version": version, "data_identity": supplier_discovery.data_identity}
+        )
+    except Exception as e:
+        logger.error(f"Supplier reload failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/admin/rfqs", response_model=RFQListResponse)
 async def admin_list_all_rfqs(
     page: int = Query(1, ge=1),
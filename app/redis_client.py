@@ -1,5 +1,6 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+import asyncio
 import json
 import uuid
 import os
@@ -8,6 +9,7 @@ from contextlib import suppress
 
 with suppress(Exception):
     import redis as _redis
+    import redis.asyncio as _aioredis
 
 class MockRedis:
     """Mock Redis client for development/testing"""
@@ -15,6 +17,7 @@ class MockRedis:
     def __init__(self):
         self.data = {}
         self.jobs = {}
+        self.channels = {}
     
     def ping(self) -> bool:
         """Mock ping"""
@@ -105,7 +108,50 @@ class MockRedis:
             return dict(self.data[key]['value'])
         return {}
 
+    def publish(self, channel: str, message: str) -> int:
+        listeners = self.channels.get(channel, [])
+        for q in listeners:
+            q.put_nowait(message)
+        return len(listeners)
+
+    def subscribe(self, channel: str) -> "asyncio.Queue":
+        q = asyncio.Queue()
+        self.channels.setdefault(channel, []).append(q)
+        return q
+
+    def unsubscribe(self, channel: str, q: "asyncio.Queue"):
+        with suppress(ValueError):
+            self.channels.get(channel, []).remove(q)
+
+JOB_TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+def job_events_channel(job_id: str) -> str:
+    """Pub/sub channel carrying status transitions of one job"""
+    return f"agentik:events:{job_id}"
+
+# Main queue lanes; the normal lane keeps the original agentik:jobs key
+JOB_PRIORITY_LANES = {
+    "high": "agentik:jobs:high",
+    "normal": "agentik:jobs",
+    "bulk": "agentik:jobs:bulk",
+}
+
+
+def agent_queue_keys(agent: str) -> list:
+    """Per-lane list keys of an agent stage (see agent_orchestrator/queues.py)"""
+    base = f"agentik:agent:{agent}"
+    return [base if lane == "normal" else f"{base}:{lane}" for lane in JOB_PRIORITY_LANES]
+
 class BaseJobsClient:
+    def _lane_key(self, priority: Optional[str]) -> str:
+        return JOB_PRIORITY_LANES.get(priority or "normal", JOB_PRIORITY_LANES["normal"])
+
+    def _envelope_lane_key(self, env_str: str) -> str:
+        try:
+            return self._lane_key(json.loads(env_str).get("priority"))
+        except Exception:
+            return JOB_PRIORITY_LANES["normal"]
+
     def _serialize_dates(self, obj):
         if isinstance(obj, dict):
             return {k: self._serialize_dates(v) for k, v in obj.items()}
@@ -115,7 +161,74 @@ class BaseJobsClient:
             return obj.isoformat()
         else:
             return obj
+    def _build_job_status(self, job_id: str, st: Dict[str, Any], raw_env: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Shape a status hash plus legacy job:{id} record into the API job dict."""
+        if st:
+            result = st.get("result")
+            parsed_result = None
+            try:
+                parsed_result = json.loads(result) if isinstance(result, str) else result
+            except Exception:
+                parsed_result = result
+            job_env = json.loads(raw_env) if raw_env else {}
+            job_type = job_env.get("job_type")
+            user_id = st.get("user_id")
+            return {
+                "job_id": job_id,
+                "status": st.get("status", "unknown"),
+                "created_at": st.get("created_at"),
+                "updated_at": st.get("updated_at"),
+                "job_type": job_type,
+                "result": parsed_result,
+                "error": st.get("error"),
+                "user_id": user_id,
+                "data": {"user_id": user_id, "payload": job_env if raw_env else None},
+            }
+        # Fallback to legacy job record
+        if raw_env:
+            jd = json.loads(raw_env)
+            return {
+                "job_id": jd.get("job_id") or jd.get("id", job_id),
+                "status": jd.get("status", "queued"),
+                "created_at": jd.get("created_at"),
+                "updated_at": jd.get("updated_at"),
+                "job_type": jd.get("job_type"),
+                "result": jd.get("result"),
+                "error": jd.get("error"),
+                "user_id": jd.get("user_id"),
+                "data": {"user_id": jd.get("user_id")},
+            }
+        return None
+    def _job_event(self, job_id: str, mapping: Dict[str, Any]) -> str:
+        event = {"job_id": job_id, **mapping}
+        if isinstance(event.get("result"), str):
+            with suppress(Exception):
+                event["result"] = json.loads(event["result"])
+        return json.dumps(event)
+    async def job_events(self, job_id: str, keepalive: float = 15.0):
+        """Yield the current job status, then each status event published for it.
+
+        Subscribes before reading the snapshot so no transition is lost in
+        between. Yields None after ``keepalive`` idle seconds.
+        """
+        subscription = await self._subscribe(job_events_channel(job_id))
+        try:
+            st = self.get_job_status(job_id)
+            if st:
+                yield st
+            while True:
+                yield await self._next_event(subscription, keepalive)
+        finally:
+            await self._unsubscribe(job_events_channel(job_id), subscription)
     # extension points
+    async def _subscribe(self, channel: str):
+        raise NotImplementedError
+    async def _next_event(self, subscription, timeout: float) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+    async def _unsubscribe(self, channel: str, subscription):
+        raise NotImplementedError
+    def get_job_statuses(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
     def record_user_job(self, user_id: str, job_id: str):
         raise NotImplementedError
     def list_user_jobs(self, user_id: str, limit: int = 10):
@@ -135,7 +248,7 @@ class MockRedisClient(BaseJobsClient):
         except Exception as e:
             return {"status": "unhealthy", "connected": False, "error": str(e)}
 
-    def create_job(self, job_type: str, payload: Dict[str, Any], user_id: str) -> str:
+    def create_job(self, job_type: str, payload: Dict[str, Any], user_id: str, priority: str = "normal") -> str:
         job_id = str(uuid.uuid4())
         serialized_payload = self._serialize_dates(payload)
         now = datetime.utcnow().isoformat()
@@ -143,12 +256,13 @@ class MockRedisClient(BaseJobsClient):
             "job_id": job_id,
             "job_type": job_type,
             "user_id": user_id,
+            "priority": priority,
             "payload": serialized_payload,
             "created_at": now,
             "updated_at": now,
         }
-        # Push to unified agent queue
-        self.redis.lpush("agentik:jobs", json.dumps(job_envelope))
+        # Push to the main queue lane for this priority
+        self.redis.lpush(self._lane_key(priority), json.dumps(job_envelope))
         # Initialize status hash
         self.redis.hset(f"agentik:status:{job_id}", {
             "status": "queued",
@@ -158,50 +272,23 @@ class MockRedisClient(BaseJobsClient):
         })
         # Back-compat simple job store
         self.redis.set(f"job:{job_id}", json.dumps(job_envelope))
+        # User index is written together with the job (mirrors RealRedisClient)
+        self.record_user_job(user_id, job_id)
         logger.info(f"Created mock job {job_id} of type {job_type}")
         return job_id
 
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
-        # Prefer agentik status hash
+        # Prefer agentik status hash, fall back to legacy job record
         st = self.redis.hgetall(f"agentik:status:{job_id}")
-        if st:
-            result = st.get("result")
-            parsed_result = None
-            try:
-                parsed_result = json.loads(result) if isinstance(result, str) else result
-            except Exception:
-                parsed_result = result
-            payload = self.redis.get(f"job:{job_id}")
-            job_env = json.loads(payload) if payload else {}
-            job_type = job_env.get("job_type")
-            user_id = st.get("user_id")
-            return {
-                "job_id": job_id,
-                "status": st.get("status", "unknown"),
-                "created_at": st.get("created_at"),
-                "updated_at": st.get("updated_at"),
-                "job_type": job_type,
-                "result": parsed_result,
-                "error": st.get("error"),
-                "user_id": user_id,
-                "data": {"user_id": user_id, "payload": job_env if payload else None},
-            }
-        # Fallback to legacy job record
-        job_data = self.redis.get(f"job:{job_id}")
-        if job_data:
-            jd = json.loads(job_data)
-            return {
-                "job_id": jd.get("job_id") or jd.get("id", job_id),
-                "status": jd.get("status", "queued"),
-                "created_at": jd.get("created_at"),
-                "updated_at": jd.get("updated_at"),
-                "job_type": jd.get("job_type"),
-                "result": jd.get("result"),
-                "error": jd.get("error"),
-                "user_id": jd.get("user_id"),
-                "data": {"user_id": jd.get("user_id")},
-            }
-        return None
+        return self._build_job_status(job_id, st, self.redis.get(f"job:{job_id}"))
+
+    def get_job_statuses(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        jobs = []
+        for jid in job_ids:
+            st = self.get_job_status(jid)
+            if st:
+                jobs.append(st)
+        return jobs
 
     def update_job_status(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
         now = datetime.utcnow().isoformat()
@@ -211,6 +298,7 @@ class MockRedisClient(BaseJobsClient):
         if error is not None:
             mapping["error"] = error
         self.redis.hset(f"agentik:status:{job_id}", mapping)
+        self.redis.publish(job_events_channel(job_id), self._job_event(job_id, mapping))
         # Mirror in legacy record for compatibility if exists
         job_data = self.redis.get(f"job:{job_id}")
         if job_data:
@@ -229,11 +317,23 @@ class MockRedisClient(BaseJobsClient):
         env_str = self.redis.get(f"job:{job_id}")
         removed = 0
         if env_str:
-            removed = self.redis.lrem("agentik:jobs", 0, env_str)
+            removed = self.redis.lrem(self._envelope_lane_key(env_str), 0, env_str)
         # Mark status as failed/cancelled
         self.update_job_status(job_id, "failed", error="cancelled by user")
         return removed > 0
 
+    async def _subscribe(self, channel: str):
+        return self.redis.subscribe(channel)
+
+    async def _next_event(self, subscription, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(await asyncio.wait_for(subscription.get(), timeout))
+        except asyncio.TimeoutError:
+            return None
+
+    async def _unsubscribe(self, channel: str, subscription):
+        self.redis.unsubscribe(channel, subscription)
+
     def record_user_job(self, user_id: str, job_id: str):
         key = f"user:{user_id}:jobs"
         if key not in self.redis.data:
@@ -246,12 +346,7 @@ class MockRedisClient(BaseJobsClient):
         ids = []
         if key in self.redis.data and isinstance(self.redis.data[key].get('value'), list):
             ids = list(self.redis.data[key]['value'])[:limit]
-        jobs = []
-        for jid in ids:
-            st = self.get_job_status(jid)
-            if st:
-                jobs.append(st)
-        return jobs
+        return self.get_job_statuses(ids)
 
 class RealRedisClient(BaseJobsClient):
     """Real Redis client using redis-py."""
@@ -261,6 +356,9 @@ class RealRedisClient(BaseJobsClient):
         if "_redis" not in globals():
             raise RuntimeError("redis library not available")
         self.redis = _redis.from_url(url, decode_responses=True)
+        # asyncio client for pub/sub subscriptions (SSE), created on first use
+        self._url = url
+        self._async_redis = None
         # test
         self.redis.ping()
         logger.info(f"Connected to Redis at {url}")
@@ -272,7 +370,7 @@ class RealRedisClient(BaseJobsClient):
         except Exception as e:
             return {"status": "unhealthy", "connected": False, "error": str(e)}
 
-    def create_job(self, job_type: str, payload: Dict[str, Any], user_id: str) -> str:
+    def create_job(self, job_type: str, payload: Dict[str, Any], user_id: str, priority: str = "normal") -> str:
         job_id = str(uuid.uuid4())
         serialized_payload = self._serialize_dates(payload)
         now = datetime.utcnow().isoformat()
@@ -280,61 +378,48 @@ class RealRedisClient(BaseJobsClient):
             "job_id": job_id,
             "job_type": job_type,
             "user_id": user_id,
+            "priority": priority,
             "payload": serialized_payload,
             "created_at": now,
             "updated_at": now,
         }
-        self.redis.lpush("agentik:jobs", json.dumps(job_envelope))
-        self.redis.hset(f"agentik:status:{job_id}", {
+        env_str = json.dumps(job_envelope)
+        # Single MULTI/EXEC round trip: status hash, legacy record and user index
+        # exist before the envelope becomes visible to workers on its main queue lane.
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(f"agentik:status:{job_id}", mapping={
             "status": "queued",
             "created_at": now,
             "updated_at": now,
             "user_id": user_id,
         })
         # Back-compat legacy record
-        self.redis.set(f"job:{job_id}", json.dumps(job_envelope))
+        pipe.set(f"job:{job_id}", env_str)
+        pipe.lpush(f"user:{user_id}:jobs", job_id)
+        pipe.lpush(self._lane_key(priority), env_str)
+        pipe.execute()
         logger.info(f"Created job {job_id} of type {job_type}")
         return job_id
 
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
-        st = self.redis.hgetall(f"agentik:status:{job_id}")
-        if st:
-            result = st.get("result")
-            parsed_result = None
-            try:
-                parsed_result = json.loads(result) if isinstance(result, str) else result
-            except Exception:
-                parsed_result = result
-            payload = self.redis.get(f"job:{job_id}")
-            job_env = json.loads(payload) if payload else {}
-            job_type = job_env.get("job_type")
-            user_id = st.get("user_id")
-            return {
-                "job_id": job_id,
-                "status": st.get("status", "unknown"),
-                "created_at": st.get("created_at"),
-                "updated_at": st.get("updated_at"),
-                "job_type": job_type,
-                "result": parsed_result,
-                "error": st.get("error"),
-                "user_id": user_id,
-                "data": {"user_id": user_id, "payload": job_env if payload else None},
-            }
-        job_data = self.redis.get(f"job:{job_id}")
-        if job_data:
-            jd = json.loads(job_data)
-            return {
-                "job_id": jd.get("job_id") or jd.get("id", job_id),
-                "status": jd.get("status", "queued"),
-                "created_at": jd.get("created_at"),
-                "updated_at": jd.get("updated_at"),
-                "job_type": jd.get("job_type"),
-                "result": jd.get("result"),
-                "error": jd.get("error"),
-                "user_id": jd.get("user_id"),
-                "data": {"user_id": jd.get("user_id")},
-            }
-        return None
+        statuses = self.get_job_statuses([job_id])
+        return statuses[0] if statuses else None
+
+    def get_job_statuses(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch status hashes and legacy records for many jobs in one pipeline."""
+        if not job_ids:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for jid in job_ids:
+            pipe.hgetall(f"agentik:status:{jid}")
+            pipe.get(f"job:{jid}")
+        replies = pipe.execute()
+        jobs = []
+        for i, jid in enumerate(job_ids):
+            st = self._build_job_status(jid, replies[2 * i], replies[2 * i + 1])
+            if st:
+                jobs.append(st)
+        return jobs
 
     def update_job_status(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
         now = datetime.utcnow().isoformat()
@@ -343,7 +428,8 @@ class RealRedisClient(BaseJobsClient):
             mapping["result"] = json.dumps(result)
         if error is not None:
             mapping["error"] = error
-        self.redis.hset(f"agentik:status:{job_id}", mapping)
+        self.redis.hset(f"agentik:status:{job_id}", mapping=mapping)
+        self.redis.publish(job_events_channel(job_id), self._job_event(job_id, mapping))
         job_data = self.redis.get(f"job:{job_id}")
         if job_data:
             job_info = json.loads(job_data)
@@ -361,12 +447,30 @@ class RealRedisClient(BaseJobsClient):
         removed = 0
         if env_str:
             try:
-                removed = self.redis.lrem("agentik:jobs", 0, env_str)
+                removed = self.redis.lrem(self._envelope_lane_key(env_str), 0, env_str)
             except Exception as e:
                 logger.warning(f"lrem failed: {e}")
         self.update_job_status(job_id, "failed", error="cancelled by user")
         return removed > 0
 
+    async def _subscribe(self, channel: str):
+        if self._async_redis is None:
+            self._async_redis = _aioredis.from_url(self._url, decode_responses=True)
+        pubsub = self._async_redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        return pubsub
+
+    async def _next_event(self, subscription, timeout: float) -> Optional[Dict[str, Any]]:
+        msg = await subscription.get_message(timeout=timeout)
+        if not msg:
+            return None
+        return json.loads(msg["data"])
+
+    async def _unsubscribe(self, channel: str, subscription):
+        with suppress(Exception):
+            await subscription.unsubscribe(channel)
+        await subscription.aclose()
+
     def record_user_job(self, user_id: str, job_id: str):
         key = f"user:{user_id}:jobs"
         self.redis.lpush(key, job_id)
@@ -375,12 +479,7 @@ class RealRedisClient(BaseJobsClient):
     def list_user_jobs(self, user_id: str, limit: int = 10):
         key = f"user:{user_id}:jobs"
         ids = self.redis.lrange(key, 0, max(0, limit - 1)) or []
-        jobs = []
-        for jid in ids:
-            st = self.get_job_status(jid)
-            if st:
-                jobs.append(st)
-        return jobs
+        return self.get_job_statuses(ids)
 
 # Create singleton instance based on environment
 def _create_redis_client():
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+RFQ-keyed cache for supplier discovery results
+In-process LRU with an optional Redis tier shared by all API workers
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# RFQ fields that change supplier scores; anything else never busts the cache
+SCORING_FIELDS = ("category", "quantity", "budget_max")
+
+class SupplierAnalysisCache:
+    """
+    Caches ``discover_suppliers`` results per RFQ.
+
+    Entries are keyed by RFQ id, a hash of the scoring fields, the supplier
+    data identity and the requested page, so an edited RFQ or reloaded
+    supplier data never serves stale rows. The identity (snapshot directory
+    or catalog hash) is the same in every worker serving the same data, unlike
+    the per-process ``data_version``, so the Redis tier can be shared.
+    ``invalidate`` drops every entry of an RFQ (call it on update/delete);
+    ``clear`` drops everything (call it on supplier reload).
+    """
+
+    def __init__(self, discovery, redis=None, max_entries: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.discovery = discovery
+        self.redis = redis
+        self.max_entries = max_entries or int(os.getenv("SUPPLIER_ANALYSIS_CACHE_SIZE", "256"))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("SUPPLIER_ANALYSIS_CACHE_TTL", "900"))
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    key_prefix = "supplier_analysis:"
+
+    def _redis_key(self, rfq_id: str) -> str:
+        return f"{self.key_prefix}{rfq_id}"
+
+    def _variant(self, rfq_data: Dict[str, Any], top_k: Optional[int], offset: int) -> str:
+        """Hash of scoring fields + supplier data identity + page"""
+        fields = {name: rfq_data.get(name) for name in SCORING_FIELDS}
+        fields["category"] = str(fields["category"] or "").lower()
+        raw = json.dumps([fields, self.discovery.data_identity, top_k, offset], sort_keys=True)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    async def discover(self, rfq_id: str, rfq_data: Dict[str, Any], top_k: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
+        """Cached ``discover_suppliers``; only successful analyses are stored"""
+        # Key on the data this worker is about to score with, after any reload elsewhere
+        self.discovery.follow_current()
+        variant = self._variant(rfq_data, top_k, offset)
+        cached = self._get(rfq_id, variant)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = await self.discovery.discover_suppliers(rfq_data, top_k=top_k, offset=offset)
+        if result.get("success"):
+            self._put(rfq_id, variant, result)
+        return result
+
+    def put(self, rfq_id: str, rfq_data: Dict[str, Any], result: Dict[str, Any], top_k: Optional[int] = None, offset: int = 0):
+        """Store an analysis computed elsewhere (e.g. right after RFQ creation)"""
+        if result.get("success"):
+            self._put(rfq_id, self._variant(rfq_data, top_k, offset), result)
+
+    def invalidate(self, rfq_id: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == rfq_id]:
+                del self._entries[key]
+        if self.redis is not None:
+            try:
+                self.redis.delete(self._redis_key(rfq_id))
+            except Exception as e:
+                logger.warning(f"Supplier analysis cache invalidation failed: {e}")
+
+    def clear(self):
+        """Drop every local entry and the shared Redis entries"""
+        with self._lock:
+            self._entries.clear()
+        if self.redis is None:
+            return
+        try:
+            batch = []
+            for key in self.redis.scan_iter(match=f"{self.key_prefix}*", count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    self.redis.delete(*batch)
+                    batch = []
+            if batch:
+                self.redis.delete(*batch)
+        except Exception as e:
+            logger.warning(f"Supplier analysis cache clear failed: {e}")
+
+    def _get(self, rfq_id: str, variant: str) -> Optional[Dict[str, Any]]:
+        key = (rfq_id, variant)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.redis is None:
+            return None
+        try:
+            raw = self.redis.hget(self._redis_key(rfq_id), variant)
+        except Exception as e:
+            logger.warning(f"Supplier analysis cache read failed: {e}")
+            return None
+        if not raw:
+            return None
+        result = json.loads(raw)
+        self._remember(key, result)
+        return result
+
+    def _put(self, rfq_id: str, variant: str, result: Dict[str, Any]):
+        self._remember((rfq_id, variant), result)
+        if self.redis is None:
+            return
+        try:
+            # One hash per RFQ so invalidation is a single DEL
+            redis_key = self._redis_key(rfq_id)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(redis_key, variant, json.dumps(result, default=str))
+            pipe.expire(redis_key, self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Supplier analysis cache write failed: {e}")
+
+    def _remember(self, key: Tuple[str, str], result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
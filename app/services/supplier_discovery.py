@@ -4,21 +4,131 @@ Intelligent Supplier Discovery and Comparison Service
 Automatically finds and analyzes suppliers based on RFQ requirements
 """
 
+import hashlib
 import json
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Sequence
 from datetime import datetime, timedelta
 import logging
 
+import numpy as np
+
+from app.services.supplier_snapshot import SupplierSnapshot, current_name, load_snapshot, supplier_columns
+
 logger = logging.getLogger(__name__)
 
+def round_scores(values: np.ndarray) -> np.ndarray:
+    """Vectorized ``round(x, 1)`` that agrees with Python's correctly rounded builtin"""
+    rounded = np.round(values, 1)
+    # np.round scales by 10 first, which can flip values sitting on a .x5 boundary
+    scaled = values * 10
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+        rounded[i] = round(float(values[i]), 1)
+    return rounded
+
+@dataclass
+class CategoryFeatures:
+    """Static supplier features of one category as aligned NumPy columns (row i = suppliers[i])"""
+    suppliers: Sequence[Dict[str, Any]]
+    avg_price: np.ndarray
+    moq_kg: np.ndarray
+    delivery_days: np.ndarray
+    dubai_direct: np.ndarray
+    # Every product price of every supplier, for price statistics
+    product_prices: np.ndarray
+    # (n, criteria) matrix; RFQ-dependent columns are filled in per request
+    static_scores: np.ndarray
+
+@dataclass
+class CategoryScores:
+    """Per-RFQ scores of one category; rows align with ``features.suppliers``"""
+    features: CategoryFeatures
+    scores: np.ndarray
+    overall: np.ndarray
+    # overall rounded to one decimal, the ranking key
+    rounded: np.ndarray
+    price_scored: bool
+
 class SupplierDiscoveryService:
     """
     Advanced supplier discovery and comparison service
     """
     
-    def __init__(self):
-        self.suppliers_database = self._load_suppliers_database()
+    def __init__(self, snapshot: Optional[SupplierSnapshot] = None):
         self.comparison_criteria = self._get_comparison_criteria()
+        self.criteria_names = list(self.comparison_criteria.keys())
+        self.criteria_weights = np.array([c["weight"] for c in self.comparison_criteria.values()], dtype=np.float64)
+        self.snapshot = snapshot or self._open_snapshot()
+        self._apply_data()
+        self.data_version = 1
+    
+    def _open_snapshot(self, current: Optional[SupplierSnapshot] = None) -> Optional[SupplierSnapshot]:
+        """Current (or refreshed) snapshot; on errors keep ``current``, None means the built-in catalog"""
+        try:
+            return current.refresh() if current is not None else load_snapshot()
+        except Exception as e:
+            logger.error(f"Supplier snapshot unavailable, using {'previous snapshot' if current else 'built-in catalog'}: {e}")
+            return current
+    
+    def _apply_data(self, suppliers_database: Optional[Dict[str, Sequence[Dict[str, Any]]]] = None):
+        """Columnar snapshot when available, the built-in catalog otherwise"""
+        if suppliers_database is None and self.snapshot is not None:
+            self.suppliers_database = {c: self.snapshot.records(c) for c in self.snapshot.categories}
+            self.category_features = {
+                c: self._features_from_columns(self.suppliers_database[c], self.snapshot.columns(c))
+                for c, (start, stop) in self.snapshot.categories.items()
+                if stop > start
+            }
+            # Snapshot directories are unique per build and shared by workers on the same directory
+            self.data_identity = self.snapshot.path.name
+            self._follows_snapshot = True
+            return
+        self._follows_snapshot = False
+        self.suppliers_database = suppliers_database if suppliers_database is not None else self._load_suppliers_database()
+        self.category_features = self._build_category_features()
+        raw = json.dumps(self.suppliers_database, sort_keys=True, default=str)
+        self.data_identity = f"catalog-{hashlib.sha1(raw.encode()).hexdigest()[:16]}"
+    
+    def reload(self, suppliers_database: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> int:
+        """Swap in a fresh supplier database and bump ``data_version``
+        
+        ``data_identity`` names the loaded data the same way in every worker
+        (snapshot directory, or a content hash of an in-memory catalog); the
+        analysis cache keys on it.
+        
+        Without an explicit database the CSV sources are re-checked and the
+        snapshot is rebuilt if they changed.
+        """
+        if suppliers_database is None and self.snapshot is not None:
+            self.snapshot = self._open_snapshot(self.snapshot)
+        self._apply_data(suppliers_database)
+        self.data_version += 1
+        logger.info(f"Supplier database reloaded (version {self.data_version})")
+        return self.data_version
+    
+    def follow_current(self) -> bool:
+        """Switch to the snapshot ``CURRENT`` points at if another worker rebuilt it
+        
+        ``reload`` runs in the one worker that handled the admin request; the
+        others notice the moved pointer here, on their next discovery. Data
+        loaded from an explicit database is left alone.
+        """
+        if self.snapshot is None or not self._follows_snapshot:
+            return False
+        directory = self.snapshot.path.parent
+        try:
+            name = current_name(directory)
+            if name is None or name == self.snapshot.path.name:
+                return False
+            snapshot = SupplierSnapshot(directory / name)
+        except Exception as e:
+            logger.error(f"Supplier snapshot {directory} unreadable, keeping {self.snapshot.path.name}: {e}")
+            return False
+        self.snapshot = snapshot
+        self._apply_data()
+        self.data_version += 1
+        logger.info(f"Switched to supplier snapshot {name} (version {self.data_version})")
+        return True
     
     def _load_concrete_admixture_suppliers(self) -> List[Dict[str, Any]]:
         """Load comprehensive concrete admixture suppliers database"""
@@ -504,21 +614,120 @@ class SupplierDiscoveryService:
             }
         }
     
-    async def discover_suppliers(self, rfq_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_category_features(self) -> Dict[str, CategoryFeatures]:
+        """Precompute RFQ-independent features and criterion scores for every category"""
+        return {
+            category: self._extract_features(suppliers)
+            for category, suppliers in self.suppliers_database.items()
+            if suppliers
+        }
+    
+    def _extract_features(self, suppliers: List[Dict[str, Any]]) -> CategoryFeatures:
+        return self._features_from_columns(suppliers, supplier_columns(suppliers))
+    
+    def _features_from_columns(self, suppliers: Sequence[Dict[str, Any]], columns: Dict[str, np.ndarray]) -> CategoryFeatures:
+        """Static criterion scores from per-supplier columns (in-memory or memory-mapped)"""
+        n = len(suppliers)
+        delivery_days = columns["delivery_days"]
+        dubai_direct = columns["dubai_direct"]
+        
+        # Unscored criteria count as 5 in the weighted total
+        static_scores = np.full((n, len(self.criteria_names)), 5.0)
+        col = self.criteria_names.index
+        static_scores[:, col("quality_grade")] = columns["quality"]
+        static_scores[:, col("delivery_time")] = np.clip(10 - (delivery_days - 10) / 5, 1, 10)
+        static_scores[:, col("dubai_direct_access")] = np.where(dubai_direct, 10, 5)
+        static_scores[:, col("technical_support")] = columns["tech_support"]
+        static_scores[:, col("export_experience")] = np.minimum(10, columns["export_years"] / 2)
+        static_scores[:, col("certifications")] = np.minimum(10, columns["cert_count"] * 2)
+        
+        return CategoryFeatures(
+            suppliers=suppliers,
+            avg_price=columns["avg_price"],
+            moq_kg=columns["moq_kg"],
+            delivery_days=delivery_days,
+            dubai_direct=dubai_direct,
+            product_prices=columns["product_prices"],
+            static_scores=static_scores,
+        )
+    
+    def _score_suppliers(self, features: CategoryFeatures, rfq_data: Dict[str, Any]) -> CategoryScores:
+        """Per-RFQ criterion matrix and weighted overall scores for a whole category"""
+        scores = features.static_scores.copy()
+        col = self.criteria_names.index
+        
+        # Price competitiveness (example for chemicals category)
+        price_scored = "chemicals" in rfq_data.get("category", "").lower()
+        if price_scored:
+            budget_max = rfq_data.get("budget_max") or 0
+            if budget_max > 0:
+                unit_budget = budget_max / rfq_data.get("quantity", 1)
+                price_ratio = features.avg_price / unit_budget
+                scores[:, col("price_competitiveness")] = np.clip(10 - (price_ratio - 1) * 5, 1, 10)
+            else:
+                scores[:, col("price_competitiveness")] = 8  # Default score
+        
+        # MOQ flexibility
+        required_quantity = rfq_data.get("quantity", 1000)
+        scores[:, col("moq_flexibility")] = np.where(
+            features.moq_kg <= required_quantity,
+            10,
+            np.maximum(1, 10 - (features.moq_kg - required_quantity) / 100),
+        )
+        
+        # Weighted sum, accumulated in criteria order so totals match the per-supplier formula exactly
+        overall = np.zeros(len(features.suppliers))
+        for j, weight in enumerate(self.criteria_weights):
+            overall += scores[:, j] * weight / 100
+        return CategoryScores(features, scores, overall, round_scores(overall), price_scored)
+    
+    def _ranked(self, scored: CategoryScores, count: Optional[int] = None, subset: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row indices by rounded score (desc), ties in database order.
+
+        Only the best ``count`` rows are ordered (partial selection); ``subset``
+        restricts ranking to the given row indices.
+        """
+        rows = np.arange(len(scored.rounded)) if subset is None else subset
+        keys = -scored.rounded[rows]
+        if count is not None and count < len(rows):
+            if count <= 0:
+                return rows[:0]
+            # Keep every row tied with the count-th best so ties still resolve by position
+            kth = np.partition(keys, count - 1)[count - 1]
+            candidates = np.flatnonzero(keys <= kth)
+            return rows[candidates[np.argsort(keys[candidates], kind="stable")][:count]]
+        return rows[np.argsort(keys, kind="stable")]
+    
+    def _hydrate_supplier(self, scored: CategoryScores, i: int) -> Dict[str, Any]:
+        """Build the response row for supplier ``i`` from the scored arrays"""
+        analysis = scored.features.suppliers[i].copy()
+        row = {name: float(value) for name, value in zip(self.criteria_names, scored.scores[i])}
+        if not scored.price_scored:
+            row.pop("price_competitiveness", None)
+        analysis["scores"] = row
+        analysis["overall_score"] = round(float(scored.overall[i]), 1)
+        analysis["match_percentage"] = round(float(scored.overall[i]) * 10, 1)
+        return analysis
+    
+    def _names(self, scored: CategoryScores, rows: np.ndarray) -> List[str]:
+        return [scored.features.suppliers[i]["company_name"] for i in rows]
+    
+    async def discover_suppliers(self, rfq_data: Dict[str, Any], top_k: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
         """
-        Discover and analyze suppliers based on RFQ requirements
+        Discover and analyze suppliers based on RFQ requirements.
+        
+        Returns ranked suppliers ``offset`` .. ``offset + top_k`` (all when
+        ``top_k`` is None); the comparison report always covers the whole category.
         """
         
         try:
+            self.follow_current()
             category = rfq_data.get("category", "").lower()
-            quantity = rfq_data.get("quantity", 0)
-            budget_min = rfq_data.get("budget_min", 0)
-            budget_max = rfq_data.get("budget_max", 0)
             
-            # Get suppliers for category
-            category_suppliers = self.suppliers_database.get(category, [])
+            # Get precomputed suppliers features for category
+            features = self.category_features.get(category)
             
-            if not category_suppliers:
+            if features is None:
                 return {
                     "success": False,
                     "message": f"No suppliers found for category: {category}",
@@ -526,22 +735,23 @@ class SupplierDiscoveryService:
                     "comparison_report": None
                 }
             
-            # Analyze each supplier
-            analyzed_suppliers = []
-            for supplier in category_suppliers:
-                analysis = await self._analyze_supplier(supplier, rfq_data)
-                analyzed_suppliers.append(analysis)
-            
-            # Sort by overall score
-            analyzed_suppliers.sort(key=lambda x: x["overall_score"], reverse=True)
+            # Score the whole category at once, then rank only the requested page
+            scored = self._score_suppliers(features, rfq_data)
+            offset = max(0, offset)
+            count = None if top_k is None else offset + max(0, top_k)
+            page = self._ranked(scored, count)[offset:]
+            analyzed_suppliers = [self._hydrate_supplier(scored, i) for i in page]
             
             # Generate comparison report
-            comparison_report = self._generate_comparison_report(analyzed_suppliers, rfq_data)
+            comparison_report = self._generate_comparison_report(scored, rfq_data)
+            total = len(features.suppliers)
             
             return {
                 "success": True,
-                "message": f"Found {len(analyzed_suppliers)} suppliers for {category}",
+                "message": f"Found {total} suppliers for {category}",
                 "suppliers": analyzed_suppliers,
+                "total": total,
+                "offset": offset,
                 "comparison_report": comparison_report,
                 "criteria": self.comparison_criteria,
                 "generated_at": datetime.utcnow().isoformat()
@@ -556,110 +766,46 @@ class SupplierDiscoveryService:
                 "comparison_report": None
             }
     
-    async def _analyze_supplier(self, supplier: Dict[str, Any], rfq_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze individual supplier against RFQ requirements"""
-        
-        analysis = supplier.copy()
-        
-        # Calculate scores for each criterion
-        scores = {}
-        
-        # Price competitiveness (example for chemicals category)
-        if "chemicals" in rfq_data.get("category", "").lower():
-            avg_price = self._calculate_average_price(supplier["products"])
-            budget_max = rfq_data.get("budget_max", 0)
-            if budget_max > 0:
-                price_ratio = avg_price / (budget_max / rfq_data.get("quantity", 1))
-                scores["price_competitiveness"] = max(1, min(10, 10 - (price_ratio - 1) * 5))
-            else:
-                scores["price_competitiveness"] = 8  # Default score
-        
-        # Quality grade
-        quality_grades = {"Standard": 6, "Standard+": 7, "Premium": 10}
-        first_product = list(supplier["products"].values())[0]
-        scores["quality_grade"] = quality_grades.get(first_product.get("quality_grade", "Standard"), 6)
-        
-        # Delivery time
-        delivery_days = supplier["delivery_terms"]["delivery_time_days"]
-        scores["delivery_time"] = max(1, min(10, 10 - (delivery_days - 10) / 5))
-        
-        # Dubai direct access
-        scores["dubai_direct_access"] = 10 if supplier["export_experience"]["dubai_direct"] else 5
-        
-        # Technical support
-        tech_support = supplier["technical_support"]
-        support_score = 0
-        if tech_support["available"]: support_score += 3
-        if tech_support.get("on_site"): support_score += 2
-        if tech_support.get("laboratory"): support_score += 2
-        if len(tech_support.get("languages", [])) >= 3: support_score += 2
-        if tech_support.get("r_and_d"): support_score += 1
-        scores["technical_support"] = min(10, support_score)
-        
-        # Export experience
-        years = supplier["export_experience"]["years"]
-        scores["export_experience"] = min(10, years / 2)
-        
-        # Certifications
-        cert_count = len(supplier["certifications"])
-        scores["certifications"] = min(10, cert_count * 2)
-        
-        # MOQ flexibility
-        first_product_moq = first_product.get("moq_kg", 1000)
-        required_quantity = rfq_data.get("quantity", 1000)
-        if first_product_moq <= required_quantity:
-            scores["moq_flexibility"] = 10
-        else:
-            scores["moq_flexibility"] = max(1, 10 - (first_product_moq - required_quantity) / 100)
-        
-        # Calculate weighted overall score
-        overall_score = 0
-        for criterion, weight in [(k, v["weight"]) for k, v in self.comparison_criteria.items()]:
-            overall_score += scores.get(criterion, 5) * weight / 100
-        
-        analysis["scores"] = scores
-        analysis["overall_score"] = round(overall_score, 1)
-        analysis["match_percentage"] = round(overall_score * 10, 1)
-        
-        return analysis
-    
     def _calculate_average_price(self, products: Dict[str, Any]) -> float:
         """Calculate average price across all products"""
         prices = [product.get("price_usd_kg", 0) for product in products.values()]
         return sum(prices) / len(prices) if prices else 0
     
-    def _generate_comparison_report(self, suppliers: List[Dict[str, Any]], rfq_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_comparison_report(self, scored: CategoryScores, rfq_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate comprehensive comparison report"""
         
-        if not suppliers:
+        features = scored.features
+        if not features.suppliers:
             return {"error": "No suppliers to compare"}
         
         # Summary statistics
-        scores = [s["overall_score"] for s in suppliers]
+        scores = scored.rounded
+        col_means = scored.scores.mean(axis=0)
         avg_scores = {}
-        for criterion in self.comparison_criteria.keys():
-            criterion_scores = [s["scores"].get(criterion, 0) for s in suppliers]
-            avg_scores[criterion] = round(sum(criterion_scores) / len(criterion_scores), 1)
+        for j, criterion in enumerate(self.criteria_names):
+            if criterion == "price_competitiveness" and not scored.price_scored:
+                avg_scores[criterion] = 0.0
+            else:
+                avg_scores[criterion] = round(float(col_means[j]), 1)
         
-        # Best/worst analysis
-        best_supplier = suppliers[0]
-        worst_supplier = suppliers[-1]
+        # Best supplier
+        best_supplier = self._hydrate_supplier(scored, int(self._ranked(scored, 1)[0]))
         
         # Price analysis
-        price_analysis = self._analyze_prices(suppliers)
+        price_analysis = self._analyze_prices(scored)
         
         # Delivery analysis  
-        delivery_analysis = self._analyze_delivery(suppliers)
+        delivery_analysis = self._analyze_delivery(scored)
         
         # Recommendations
-        recommendations = self._generate_recommendations(suppliers, rfq_data)
+        recommendations = self._generate_recommendations(scored, rfq_data)
         
         return {
             "summary": {
-                "total_suppliers": len(suppliers),
-                "average_overall_score": round(sum(scores) / len(scores), 1),
-                "score_range": f"{min(scores)} - {max(scores)}",
-                "dubai_direct_suppliers": len([s for s in suppliers if s["export_experience"]["dubai_direct"]])
+                "total_suppliers": len(features.suppliers),
+                "average_overall_score": round(float(scores.mean()), 1),
+                "score_range": f"{float(scores.min())} - {float(scores.max())}",
+                "dubai_direct_suppliers": int(features.dubai_direct.sum())
             },
             "best_supplier": {
                 "name": best_supplier["company_name"],
@@ -679,36 +825,36 @@ class SupplierDiscoveryService:
             ]
         }
     
-    def _analyze_prices(self, suppliers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_prices(self, scored: CategoryScores) -> Dict[str, Any]:
         """Analyze pricing across suppliers"""
         
-        all_prices = []
-        for supplier in suppliers:
-            for product in supplier["products"].values():
-                all_prices.append(product.get("price_usd_kg", 0))
+        features = scored.features
+        all_prices = features.product_prices
         
-        if not all_prices:
+        if not all_prices.size:
             return {"error": "No pricing data available"}
         
+        cheapest = np.flatnonzero(features.avg_price == features.avg_price.min())
         return {
-            "min_price": min(all_prices),
-            "max_price": max(all_prices),
-            "avg_price": round(sum(all_prices) / len(all_prices), 2),
-            "price_spread": round(max(all_prices) - min(all_prices), 2),
-            "most_competitive": min(suppliers, key=lambda s: self._calculate_average_price(s["products"]))["company_name"]
+            "min_price": float(all_prices.min()),
+            "max_price": float(all_prices.max()),
+            "avg_price": round(float(all_prices.mean()), 2),
+            "price_spread": round(float(all_prices.max() - all_prices.min()), 2),
+            "most_competitive": self._names(scored, self._ranked(scored, 1, cheapest))[0]
         }
     
-    def _analyze_delivery(self, suppliers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_delivery(self, scored: CategoryScores) -> Dict[str, Any]:
         """Analyze delivery capabilities"""
         
-        delivery_times = [s["delivery_terms"]["delivery_time_days"] for s in suppliers]
+        delivery_times = scored.features.delivery_days
+        fastest = np.flatnonzero(delivery_times == delivery_times.min())
         
         return {
-            "fastest_delivery": min(delivery_times),
-            "slowest_delivery": max(delivery_times),
-            "avg_delivery": round(sum(delivery_times) / len(delivery_times), 1),
-            "fastest_supplier": min(suppliers, key=lambda s: s["delivery_terms"]["delivery_time_days"])["company_name"],
-            "dubai_direct_count": len([s for s in suppliers if s["export_experience"]["dubai_direct"]])
+            "fastest_delivery": int(delivery_times.min()),
+            "slowest_delivery": int(delivery_times.max()),
+            "avg_delivery": round(float(delivery_times.mean()), 1),
+            "fastest_supplier": self._names(scored, self._ranked(scored, 1, fastest))[0],
+            "dubai_direct_count": int(scored.features.dubai_direct.sum())
         }
     
     def _identify_strengths(self, supplier: Dict[str, Any]) -> List[str]:
@@ -732,32 +878,28 @@ class SupplierDiscoveryService:
         
         return strengths[:3]  # Top 3 strengths
     
-    def _generate_recommendations(self, suppliers: List[Dict[str, Any]], rfq_data: Dict[str, Any]) -> List[str]:
+    def _generate_recommendations(self, scored: CategoryScores, rfq_data: Dict[str, Any]) -> List[str]:
         """Generate strategic recommendations"""
         
         recommendations = []
+        features = scored.features
         
-        if len(suppliers) >= 3:
+        if len(features.suppliers) >= 3:
             recommendations.append(f"Consider multi-sourcing with top 2-3 suppliers to ensure supply security")
         
-        dubai_direct = [s for s in suppliers if s["export_experience"]["dubai_direct"]]
-        if dubai_direct:
-            recommendations.append(f"Prioritize suppliers with direct Dubai experience: {', '.join([s['company_name'] for s in dubai_direct[:2]])}")
+        dubai_direct = np.flatnonzero(features.dubai_direct)
+        if dubai_direct.size:
+            recommendations.append(f"Prioritize suppliers with direct Dubai experience: {', '.join(self._names(scored, self._ranked(scored, 2, dubai_direct)))}")
         
-        budget_max = rfq_data.get("budget_max", 0)
+        budget_max = rfq_data.get("budget_max") or 0
         if budget_max > 0:
-            suitable_suppliers = []
-            for supplier in suppliers:
-                avg_price = self._calculate_average_price(supplier["products"])
-                total_cost = avg_price * rfq_data.get("quantity", 1)
-                if total_cost <= budget_max:
-                    suitable_suppliers.append(supplier["company_name"])
-            
-            if suitable_suppliers:
-                recommendations.append(f"Within budget suppliers: {', '.join(suitable_suppliers[:3])}")
+            total_cost = features.avg_price * rfq_data.get("quantity", 1)
+            within_budget = np.flatnonzero(total_cost <= budget_max)
+            if within_budget.size:
+                recommendations.append(f"Within budget suppliers: {', '.join(self._names(scored, self._ranked(scored, 3, within_budget)))}")
         
-        premium_suppliers = [s for s in suppliers if s["scores"].get("quality_grade", 0) >= 9]
-        if premium_suppliers:
-            recommendations.append(f"For premium quality requirements: {premium_suppliers[0]['company_name']}")
+        premium = np.flatnonzero(scored.scores[:, self.criteria_names.index("quality_grade")] >= 9)
+        if premium.size:
+            recommendations.append(f"For premium quality requirements: {self._names(scored, self._ranked(scored, 1, premium))[0]}")
         
-        return recommendations
\ No newline at end of file
+        return recommendations
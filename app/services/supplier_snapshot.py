@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Columnar supplier snapshot
+Ingests supplier CSV exports into one memory-mapped .npy file per column
+"""
+
+import csv
+import fcntl
+import json
+import os
+import re
+import shutil
+import time
+from collections.abc import Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_SOURCES = [
+    REPO_ROOT / "Turkish_Concrete_Admixture_Suppliers_Dubai_Export.csv",
+    REPO_ROOT / "Turkish_Suppliers_Complete_Database_Part1.csv",
+]
+DEFAULT_SNAPSHOT_DIR = REPO_ROOT / "data" / "supplier_snapshot"
+
+QUALITY_GRADE_SCORES = {"Standard": 6, "Standard+": 7, "Premium": 10}
+
+# Per-supplier numeric columns the scorer needs, in file order
+NUMERIC_COLUMNS = {
+    "avg_price": np.float64,
+    "moq_kg": np.float64,
+    "quality": np.float64,
+    "delivery_days": np.float64,
+    "dubai_direct": np.bool_,
+    "tech_support": np.float64,
+    "export_years": np.float64,
+    "cert_count": np.float64,
+}
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+_YES = {"evet", "yes", "true", "mevcut", "var"}
+
+
+def _number(text: Any, default: float = 0.0) -> float:
+    match = _NUMBER.search(str(text or ""))
+    return float(match.group().replace(",", ".")) if match else default
+
+
+def _yes(text: Any) -> bool:
+    return str(text or "").strip().lower() in _YES
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", text.lower()).strip("_")
+
+
+def _split(text: str, separators: str = ",") -> List[str]:
+    return [part.strip() for part in re.split(f"[{separators}]", text or "") if part.strip()]
+
+
+# This export separates certificates with "/", which also joins ISO document
+# types ("ISO/TS 16949", "ISO/IEC 17025"); those stay one certificate
+_CERT_SEPARATOR = re.compile(r",|/(?!(?:TS|IEC|TR|PAS)\b)")
+
+
+def _certifications(text: str) -> List[str]:
+    return [part.strip() for part in _CERT_SEPARATOR.split(text or "") if part.strip()]
+
+
+def _moq_kg(text: str) -> float:
+    value = _number(text, 1000)
+    return value * 1000 if "ton" in str(text).lower() else value
+
+
+def _tier_grade(notes: str) -> str:
+    if "Tier3" in notes or "Tier4" in notes:
+        return "Standard"
+    return "Standard+" if "Tier2" in notes else "Premium"
+
+
+def _admixture_export(rows: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """One row per (supplier, product); grouped by ``Rank``"""
+    suppliers: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        rank = row["Rank"]
+        supplier = suppliers.get(rank)
+        if supplier is None:
+            notes = row.get("Notlar", "")
+            supplier = suppliers[rank] = {
+                "id": f"admixture_{rank}",
+                "category": "chemicals",
+                "company_name": row["Tedarikçi Adı"],
+                "contact_person": row["İlgili Kişi"],
+                "email": row["E-posta"],
+                "phone": row["Telefon"],
+                "website": row["Website"],
+                "address": row["Adres"],
+                "products": {},
+                "certifications": _split(row["Belgeler"]),
+                "export_experience": {
+                    "years": int(_number(row["İhracat Yılı"])),
+                    "dubai_direct": _yes(row["Dubai Deneyimi"]),
+                    "monthly_capacity_tons": int(_number(row["Aylık Kapasite"])),
+                },
+                "delivery_terms": {
+                    "fob_mersin": True,
+                    "delivery_time_days": int(_number(row["Teslim Süresi (gün)"])),
+                    "payment_terms": row["Ödeme Koşulları"],
+                },
+                "technical_support": {
+                    "available": _yes(row["Teknik Destek"]),
+                    "on_site": _yes(row["Dubai Saha Desteği"]),
+                    "languages": _split(row["Diller"]),
+                    "laboratory": row["Laboratuvar"],
+                },
+                "notes": notes,
+                "quality_grade": _tier_grade(notes),
+            }
+        supplier["products"][_slug(row["Ürün Türü"])] = {
+            "name": row["Ürün Adı"],
+            "price_usd_kg": _number(row["Fiyat USD/kg (FOB Mersin)"]),
+            "price_exw_usd_kg": _number(row["Fiyat USD/kg (EXW)"]),
+            "moq_kg": _moq_kg(row["MOQ (kg)"]),
+            "quality_grade": supplier["quality_grade"],
+            "technical_specs": row["Teknik Özellikler"],
+        }
+    for supplier in suppliers.values():
+        del supplier["quality_grade"]
+    return list(suppliers.values())
+
+
+def _complete_database(rows: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """One row per supplier with a ``Kategori`` column"""
+    suppliers = []
+    for row in rows:
+        category = row["Kategori"].strip().lower()
+        # No grade column in this export; the overall rating stands in for it
+        grade = "Premium" if _number(row["Genel Puan"]) >= 9 else "Standard+"
+        suppliers.append({
+            "id": f"{category}_{_slug(row['Tedarikçi Adı'])}",
+            "category": category,
+            "company_name": row["Tedarikçi Adı"],
+            "contact_person": row["İlgili Kişi"],
+            "email": row["E-posta"],
+            "phone": row["Telefon"],
+            "website": row["Website"],
+            "address": row["Adres"],
+            "products": {
+                _slug(row["Ürün Türü"]): {
+                    "name": row["Ürün Adı"],
+                    "price_usd_kg": _number(row["Fiyat USD/kg"]),
+                    "moq_kg": _moq_kg(row["MOQ"]),
+                    "quality_grade": grade,
+                }
+            },
+            "certifications": _certifications(row["Belgeler"]),
+            "export_experience": {
+                "years": int(_number(row["İhracat Deneyimi"])),
+                "dubai_direct": _yes(row["Dubai Deneyimi"]),
+            },
+            "delivery_terms": {
+                "fob_mersin": True,
+                "delivery_time_days": int(_number(row["Teslim Süresi"])),
+                "payment_terms": row["Ödeme Koşulları"],
+            },
+            "technical_support": {"available": _yes(row["Teknik Destek"])},
+            "notes": row.get("Notlar", ""),
+        })
+    return suppliers
+
+
+def read_supplier_csv(path: Path) -> List[Dict[str, Any]]:
+    """Parse a supplier export into the service's supplier dict shape (plus ``category``)"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        header = set(reader.fieldnames or [])
+        rows = list(reader)
+    if "Rank" in header:
+        return _admixture_export(rows)
+    if "Kategori" in header:
+        return _complete_database(rows)
+    raise ValueError(f"Unrecognized supplier export: {path}")
+
+
+def read_sources(sources: Iterable[Path]) -> Dict[str, List[Dict[str, Any]]]:
+    """Merge exports by category; a supplier already listed by an earlier export (same email) wins"""
+    database: Dict[str, List[Dict[str, Any]]] = {}
+    seen = set()
+    for path in sources:
+        suppliers = read_supplier_csv(path)
+        keys = [(supplier["category"], supplier["email"].lower()) for supplier in suppliers]
+        for key, supplier in zip(keys, suppliers):
+            if key not in seen:
+                database.setdefault(supplier.pop("category"), []).append(supplier)
+        seen.update(keys)
+    return database
+
+
+def technical_support_score(support: Dict[str, Any]) -> float:
+    score = 0
+    if support["available"]: score += 3
+    if support.get("on_site"): score += 2
+    if support.get("laboratory"): score += 2
+    if len(support.get("languages", [])) >= 3: score += 2
+    if support.get("r_and_d"): score += 1
+    return min(10, score)
+
+
+def supplier_columns(suppliers: Sequence) -> Dict[str, np.ndarray]:
+    """Numeric columns of ``NUMERIC_COLUMNS`` plus flattened ``product_prices``/``product_offsets``"""
+    n = len(suppliers)
+    columns = {name: np.empty(n, dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+    product_prices = []
+    product_offsets = np.zeros(n + 1, dtype=np.int64)
+
+    for i, supplier in enumerate(suppliers):
+        products = supplier["products"]
+        first_product = next(iter(products.values()))
+        prices = [product.get("price_usd_kg", 0) for product in products.values()]
+        columns["avg_price"][i] = sum(prices) / len(prices) if prices else 0
+        columns["moq_kg"][i] = first_product.get("moq_kg", 1000)
+        columns["quality"][i] = QUALITY_GRADE_SCORES.get(first_product.get("quality_grade", "Standard"), 6)
+        columns["delivery_days"][i] = supplier["delivery_terms"]["delivery_time_days"]
+        columns["dubai_direct"][i] = bool(supplier["export_experience"]["dubai_direct"])
+        columns["tech_support"][i] = technical_support_score(supplier["technical_support"])
+        columns["export_years"][i] = supplier["export_experience"]["years"]
+        columns["cert_count"][i] = len(supplier["certifications"])
+        product_prices.extend(prices)
+        product_offsets[i + 1] = len(product_prices)
+
+    columns["product_prices"] = np.array(product_prices, dtype=np.float64)
+    columns["product_offsets"] = product_offsets
+    return columns
+
+
+def source_signature(sources: Iterable[Path]) -> List[Dict[str, Any]]:
+    signature = []
+    for path in sources:
+        stat = Path(path).stat()
+        signature.append({"path": str(Path(path).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+    return signature
+
+
+class SupplierRecords(Sequence):
+    """Lazily decoded supplier dicts backed by a memory-mapped JSON blob"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, stop = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._blob[start:stop].tobytes())
+
+
+class SupplierSnapshot:
+    """
+    Read-only view over a snapshot directory.
+
+    Rows are grouped by category; every column is an ``np.load(mmap_mode="r")``
+    array, so workers share the page cache instead of each holding a copy.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / "manifest.json").read_text())
+        self._columns = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode="r")
+            for name in [*NUMERIC_COLUMNS, "product_prices", "product_offsets", "records", "record_offsets"]
+        }
+
+    @property
+    def categories(self) -> Dict[str, Tuple[int, int]]:
+        return {category: tuple(bounds) for category, bounds in self.manifest["categories"].items()}
+
+    def records(self, category: str) -> SupplierRecords:
+        start, stop = self.manifest["categories"][category]
+        return SupplierRecords(self._columns["records"], self._columns["record_offsets"][start:stop + 1])
+
+    def columns(self, category: str) -> Dict[str, np.ndarray]:
+        start, stop = self.manifest["categories"][category]
+        columns = {name: self._columns[name][start:stop] for name in NUMERIC_COLUMNS}
+        offsets = self._columns["product_offsets"]
+        columns["product_prices"] = self._columns["product_prices"][offsets[start]:offsets[stop]]
+        return columns
+
+    def refresh(self) -> "SupplierSnapshot":
+        """The current snapshot of the same directory, rebuilt if its sources changed"""
+        sources = [Path(source["path"]) for source in self.manifest["sources"]]
+        return load_snapshot(sources, self.path.parent) or self
+
+    @classmethod
+    def open(cls, directory: Path) -> "SupplierSnapshot":
+        return cls(Path(directory) / current_name(directory))
+
+
+def current_name(directory: Path) -> Optional[str]:
+    """Snapshot directory ``CURRENT`` points at, None before the first build"""
+    try:
+        return (Path(directory) / "CURRENT").read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _build_lock(directory: Path):
+    """Serialize snapshot builds of all processes sharing ``directory``"""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".build.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _open_current(directory: Path) -> Optional[SupplierSnapshot]:
+    if not (directory / "CURRENT").exists():
+        return None
+    try:
+        return SupplierSnapshot.open(directory)
+    except Exception as e:
+        logger.warning(f"Supplier snapshot unreadable, rebuilding: {e}")
+        return None
+
+
+def _is_fresh(snapshot: Optional[SupplierSnapshot], sources: List[Path]) -> bool:
+    return (
+        snapshot is not None
+        and snapshot.manifest.get("format") == SNAPSHOT_FORMAT
+        and snapshot.manifest.get("sources") == source_signature(sources)
+    )
+
+
+def build_snapshot(sources: List[Path], directory: Path) -> SupplierSnapshot:
+    """Write a fresh snapshot and atomically point ``CURRENT`` at it"""
+    directory = Path(directory)
+    with _build_lock(directory):
+        return _write_snapshot(sources, directory)
+
+
+def _write_snapshot(sources: List[Path], directory: Path) -> SupplierSnapshot:
+    """Body of ``build_snapshot``; the caller holds the build lock"""
+    database = read_sources(sources)
+    suppliers, categories = [], {}
+    for category in sorted(database):
+        categories[category] = [len(suppliers), len(suppliers) + len(database[category])]
+        suppliers.extend(database[category])
+
+    encoded = [json.dumps(s, ensure_ascii=False, separators=(",", ":")).encode() for s in suppliers]
+    record_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=record_offsets[1:])
+
+    columns = supplier_columns(suppliers)
+    columns["records"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    columns["record_offsets"] = record_offsets
+
+    name = f"snapshot-{time.time_ns()}"
+    target = directory / name
+    target.mkdir(parents=True)
+    for column, values in columns.items():
+        np.save(target / f"{column}.npy", values)
+    (target / "manifest.json").write_text(json.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "sources": source_signature(sources),
+        "categories": categories,
+        "rows": len(suppliers),
+    }, indent=2))
+
+    snapshot = SupplierSnapshot(target)
+    current = directory / "CURRENT"
+    previous = current.read_text().strip() if current.exists() else None
+    pointer = directory / f"CURRENT.{name}.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, current)
+
+    # Builds are serialized by the lock, so no other directory is still being
+    # written. The previous snapshot stays for readers that resolved CURRENT
+    # just before the swap; older ones are only held open through their maps,
+    # which keep unlinked files alive.
+    for old in directory.glob("snapshot-*"):
+        if old.name not in (name, previous):
+            shutil.rmtree(old, ignore_errors=True)
+
+    logger.info(f"Built supplier snapshot {name}: {len(suppliers)} suppliers in {len(categories)} categories")
+    return snapshot
+
+
+def load_snapshot(sources: Optional[List[Path]] = None, directory: Optional[Path] = None) -> Optional[SupplierSnapshot]:
+    """
+    Open the current snapshot, rebuilding it first when the CSV sources changed.
+
+    Returns None when there are neither sources nor a snapshot to open.
+    """
+    if sources is None:
+        env_sources = os.getenv("SUPPLIER_CSV_SOURCES")
+        sources = [Path(p.strip()) for p in env_sources.split(",") if p.strip()] if env_sources else DEFAULT_SOURCES
+    directory = Path(directory or os.getenv("SUPPLIER_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR)
+    sources = [Path(p) for p in sources if Path(p).exists()]
+
+    snapshot = _open_current(directory)
+    if not sources or _is_fresh(snapshot, sources):
+        return snapshot
+    with _build_lock(directory):
+        # Another worker may have rebuilt it while this one waited for the lock
+        snapshot = _open_current(directory)
+        if _is_fresh(snapshot, sources):
+            return snapshot
+        return _write_snapshot(sources, directory)
+
+
+if __name__ == "__main__":
+    # Prebuild the snapshot (e.g. in an image build step): python -m app.services.supplier_snapshot
+    logging.basicConfig(level=logging.INFO)
+    snapshot = load_snapshot()
+    print(f"{snapshot.path}: {snapshot.manifest['rows']} suppliers" if snapshot else "No supplier sources found")
@@ -105,8 +105,8 @@ export function RFQDetailPage() {
 
       if (response?.success && response?.data?.job_id) {
         const jobId = response.data.job_id as string
-        // Start polling job status
-        pollJobStatus(jobId)
+        // Follow job status over SSE (falls back to polling)
+        followJobStatus(jobId)
         toast.success('Workflow başlatıldı')
       } else {
         const msg = response?.message || 'Workflow başlatma hatası'
@@ -122,6 +122,25 @@ export function RFQDetailPage() {
     }
   }
 
+  const followJobStatus = async (jobId: string) => {
+    let last: any = null
+    try {
+      await apiClient.streamOrchestrateStatus(jobId, (event: any) => {
+        last = { ...(last || {}), ...event }
+        setJobStatus(last)
+      })
+    } catch (error) {
+      console.error('Job status stream error:', error)
+    }
+    if (last?.status === 'completed') {
+      // Reload RFQ data to show updated offers
+      loadRFQDetails(true)
+    } else if (last?.status !== 'failed') {
+      // Stream dropped before the job finished
+      pollJobStatus(jobId)
+    }
+  }
+
   const pollJobStatus = (jobId: string) => {
     const poll = async () => {
       try {
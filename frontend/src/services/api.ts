@@ -202,6 +202,35 @@ class ApiClient {
   async getOrchestrateStatus(jobId: string) {
     return this.requestAbs(`/orchestrate/status/${jobId}`)
   }
+
+  // Server-sent events for job status (fetch-based so the Bearer token is sent).
+  // Resolves when the job reaches a terminal status or the stream closes.
+  async streamOrchestrateStatus(jobId: string, onEvent: (job: any) => void, signal?: AbortSignal) {
+    const headers: Record<string, string> = { Accept: 'text/event-stream' }
+    if (this.token) headers.Authorization = `Bearer ${this.token}`
+    const res = await fetch(`${API_BASE_URL}/orchestrate/stream/${jobId}`, { headers, signal })
+    if (!res.ok || !res.body) {
+      throw new Error(`HTTP ${res.status}`)
+    }
+    const reader = res.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const frames = buffer.split('\n\n')
+      buffer = frames.pop() || ''
+      for (const frame of frames) {
+        const data = frame
+          .split('\n')
+          .filter(line => line.startsWith('data: '))
+          .map(line => line.slice(6))
+          .join('\n')
+        if (data) onEvent(JSON.parse(data))
+      }
+    }
+  }
   async getRecentJobs(params: { limit?: number; job_type?: string } = {}) {
     const qp = new URLSearchParams()
     if (params.limit) qp.append('limit', String(params.limit))
@@ -0,0 +1,42 @@
+#!/usr/bin/env bash
+# Shared agent modules are vendored into each service that needs them: every
+# service image is built from its own Docker context (./agent_orchestrator,
+# ./agentik-b2b-app/agents, ./agentik-b2b-app/backend) and cannot COPY files
+# from outside it. agent_orchestrator/ holds the source of truth; edit it
+# there and run this script to update the copies.
+#
+#   bash scripts/sync_vendored_modules.sh          copy sources over the vendored copies
+#   bash scripts/sync_vendored_modules.sh --check  fail if any copy differs (make vendored-check)
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+
+# source:copy
+VENDORED=(
+  "agent_orchestrator/supplier_index.py:agentik-b2b-app/agents/core/supplier_index.py"
+  "agent_orchestrator/smtp_pool.py:agentik-b2b-app/agents/core/smtp_pool.py"
+  "agent_orchestrator/email_templates.py:agentik-b2b-app/agents/core/email_templates.py"
+  "agent_orchestrator/email_templates.py:agentik-b2b-app/backend/app/services/email_templates.py"
+  "agent_orchestrator/offer_extraction.py:agentik-b2b-app/agents/core/offer_extraction.py"
+  "agent_orchestrator/inbox_sync.py:agentik-b2b-app/agents/core/inbox_sync.py"
+  "agent_orchestrator/verification_cache.py:agentik-b2b-app/agents/core/verification_cache.py"
+)
+
+status=0
+for pair in "${VENDORED[@]}"; do
+  src=${pair%%:*}
+  dst=${pair#*:}
+  if [[ "${1:-}" == "--check" ]]; then
+    if ! cmp -s "$src" "$dst"; then
+      echo "Vendored copy out of date: $dst (source: $src)" >&2
+      status=1
+    fi
+  else
+    cp "$src" "$dst"
+    echo "Synced $dst"
+  fi
+done
+if [[ "${1:-}" == "--check" && $status -ne 0 ]]; then
+  echo "Run: bash scripts/sync_vendored_modules.sh" >&2
+fi
+exit $status
@@ -0,0 +1,122 @@
+-- Benchmark fixture: search index plans
+-- Verifies that the search queries use the indexes from 1755956100_create_search_indexes.sql.
+--
+-- Run against a migrated database with pg_trgm available (all changes are rolled back):
+--   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f supabase/benchmarks/search_index_plans.sql
+-- Any query whose EXPLAIN does not mention the expected index raises an error.
+
+BEGIN;
+
+CREATE FUNCTION pg_temp.assert_plan_uses(label text, query text, index_names text[]) RETURNS void AS $$
+DECLARE
+    plan json;
+    idx text;
+BEGIN
+    EXECUTE 'EXPLAIN (FORMAT JSON) ' || query INTO plan;
+    FOREACH idx IN ARRAY index_names LOOP
+        IF plan::text NOT LIKE '%"Index Name": "' || idx || '"%' THEN
+            RAISE EXCEPTION '% does not use %: %', label, idx, plan;
+        END IF;
+    END LOOP;
+    RAISE NOTICE '% ok (%)', label, array_to_string(index_names, ', ');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Synthetic data: 100k companies/suppliers (10% verified), 300k products, 100k RFQs
+INSERT INTO companies (id, name, industry, updated_at)
+SELECT md5('company' || i)::uuid,
+       'Firma ' || i || ' ' || (ARRAY['Kimya', 'Çimento', 'Tekstil', 'Makina', 'Gıda'])[1 + i % 5],
+       (ARRAY['Construction Chemicals', 'Cement', 'Textiles', 'Machinery', 'Food'])[1 + i % 5] || ' ' || i,
+       NOW() - interval '30 days'
+FROM generate_series(1, 100000) AS i;
+
+INSERT INTO suppliers (id, company_id, specializations, rating, total_completed_orders, verified, updated_at)
+SELECT md5('supplier' || i)::uuid,
+       md5('company' || i)::uuid,
+       ARRAY[(ARRAY['chemicals', 'construction', 'textiles', 'machinery', 'food'])[1 + i % 5], 'spec' || (i % 20000)],
+       (i % 500) / 100.0,
+       i % 40,
+       i % 10 = 0,
+       NOW() - interval '30 days'
+FROM generate_series(1, 100000) AS i;
+
+INSERT INTO supplier_products (supplier_id, product_name, updated_at)
+SELECT md5('supplier' || (1 + i % 100000))::uuid, 'Ürün ' || i, NOW() - interval '30 days'
+FROM generate_series(1, 300000) AS i;
+
+INSERT INTO rfqs (requester_id, company_id, title, description, status, created_at)
+SELECT md5('company' || (1 + i % 100000))::uuid,
+       md5('company' || (1 + i % 100000))::uuid,
+       'RFQ ' || i || ' ' || (ARRAY['beton katkı', 'pamuk iplik', 'vida somun', 'zeytinyağı', 'pompa'])[1 + i % 5] || ' ' || md5(i::text),
+       'Talep ' || md5((i * 7)::text) || ' ' || (ARRAY['süperakışkanlaştırıcı', 'denim', 'paslanmaz', 'organik', 'hidrolik'])[1 + i % 5],
+       (ARRAY['published', 'draft'])[1 + i % 2],
+       NOW() - (i || ' minutes')::interval
+FROM generate_series(1, 100000) AS i;
+
+-- A handful of recent changes for the delta sync
+UPDATE suppliers SET updated_at = NOW() WHERE id IN (SELECT md5('supplier' || i)::uuid FROM generate_series(1, 5) AS i);
+
+ANALYZE companies;
+ANALYZE suppliers;
+ANALYZE supplier_products;
+ANALYZE rfqs;
+
+-- RFQService.search_rfqs: title/description ILIKE -> BitmapOr over both trigram indexes.
+-- The term must be selective: one that matches a fifth of the table (e.g. 'zeytinyağı')
+-- is rightly served by idx_rfqs_created_at instead.
+SELECT pg_temp.assert_plan_uses('rfq search', $q$
+    SELECT * FROM rfqs
+    WHERE (title ILIKE '%RFQ 4242 vida somun%' OR description ILIKE '%RFQ 4242 vida somun%')
+      AND status = 'published'
+    ORDER BY created_at DESC
+$q$, ARRAY['idx_rfqs_title_trgm', 'idx_rfqs_description_trgm']);
+
+-- Terms keep their punctuation and escaped LIKE wildcards (_substring_pattern) and still use the indexes
+SELECT pg_temp.assert_plan_uses('rfq search with punctuation', $q$
+    SELECT * FROM rfqs
+    WHERE (title ILIKE '%(RFQ 4242), vida\_somun%' OR description ILIKE '%(RFQ 4242), vida\_somun%')
+      AND status = 'published'
+    ORDER BY created_at DESC
+$q$, ARRAY['idx_rfqs_title_trgm', 'idx_rfqs_description_trgm']);
+
+-- Supplier search by industry substring
+SELECT pg_temp.assert_plan_uses('industry search', $q$
+    SELECT s.* FROM suppliers s JOIN companies c ON s.company_id = c.id
+    WHERE c.industry ILIKE '%Chemicals 1234%'
+$q$, ARRAY['idx_companies_industry_trgm']);
+
+-- Supplier search by specialization (PostgREST specializations.cs.{...})
+SELECT pg_temp.assert_plan_uses('specializations containment', $q$
+    SELECT * FROM suppliers WHERE specializations @> ARRAY['spec42']
+$q$, ARRAY['idx_suppliers_specializations']);
+
+-- supplier_discovery_agent: SUPPLIER_INDEX_FULL_QUERY (first load of verified suppliers)
+SELECT pg_temp.assert_plan_uses('supplier index full load', $q$
+    SELECT s.id, s.verified, s.specializations, c.name as company_name, c.industry,
+           ARRAY(SELECT p.product_name FROM supplier_products p WHERE p.supplier_id = s.id) as product_names,
+           GREATEST(s.updated_at, c.updated_at,
+                    (SELECT max(p.updated_at) FROM supplier_products p WHERE p.supplier_id = s.id)) as changed_at
+    FROM suppliers s
+    JOIN companies c ON s.company_id = c.id
+    WHERE s.verified = true
+$q$, ARRAY['idx_suppliers_verified_rating']);
+
+-- supplier_discovery_agent: SUPPLIER_INDEX_DELTA_QUERY id subquery (one range scan per table)
+SELECT pg_temp.assert_plan_uses('supplier index delta', $q$
+    SELECT id FROM suppliers WHERE updated_at >= NOW() - interval '1 hour'
+    UNION
+    SELECT s2.id FROM companies c2 JOIN suppliers s2 ON s2.company_id = c2.id WHERE c2.updated_at >= NOW() - interval '1 hour'
+    UNION
+    SELECT supplier_id FROM supplier_products WHERE updated_at >= NOW() - interval '1 hour'
+$q$, ARRAY['idx_suppliers_updated_at', 'idx_companies_updated_at', 'idx_supplier_products_updated_at']);
+
+-- supplier_discovery_agent: candidate fetch by index hits
+SELECT pg_temp.assert_plan_uses('candidate fetch', $q$
+    SELECT s.* FROM suppliers s
+    WHERE s.verified = true
+      AND s.id = ANY(ARRAY[md5('supplier10')::uuid, md5('supplier20')::uuid, md5('supplier30')::uuid])
+    ORDER BY s.rating DESC, s.total_completed_orders DESC
+    LIMIT 50
+$q$, ARRAY['suppliers_pkey']);
+
+ROLLBACK;
@@ -0,0 +1,26 @@
+-- Migration: create_search_indexes
+-- Created at: 1755956100
+
+-- Substring and array search indexes (plans: supabase/benchmarks/search_index_plans.sql)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ILIKE '%term%' (rfq search, supplier search by company)
+CREATE INDEX IF NOT EXISTS idx_rfqs_title_trgm ON rfqs USING gin (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_rfqs_description_trgm ON rfqs USING gin (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_companies_industry_trgm ON companies USING gin (industry gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_companies_name_trgm ON companies USING gin (name gin_trgm_ops);
+
+-- specializations @> / && (array containment and overlap)
+CREATE INDEX IF NOT EXISTS idx_suppliers_specializations ON suppliers USING gin (specializations);
+
+-- Supplier matching only reads verified suppliers, best rated first
+CREATE INDEX IF NOT EXISTS idx_suppliers_verified_rating ON suppliers (rating DESC, total_completed_orders DESC) WHERE verified = true;
+-- Superseded by the partial index above (a boolean btree is never selective)
+DROP INDEX IF EXISTS idx_suppliers_verified;
+
+-- Incremental supplier index sync (updated_at deltas)
+CREATE INDEX IF NOT EXISTS idx_suppliers_updated_at ON suppliers (updated_at);
+CREATE INDEX IF NOT EXISTS idx_companies_updated_at ON companies (updated_at);
+CREATE INDEX IF NOT EXISTS idx_supplier_products_updated_at ON supplier_products (updated_at);
+CREATE INDEX IF NOT EXISTS idx_supplier_products_supplier_id ON supplier_products (supplier_id);
@@ -0,0 +1,34 @@
+-- Migration: add_bulk_insert_unique_keys
+-- Created at: 1755956200
+
+-- Conflict targets for the bulk writers (ON CONFLICT ... DO NOTHING)
+
+-- Discovered suppliers are upserted on email; stored lower-cased
+UPDATE suppliers SET email = lower(email) WHERE email IS NOT NULL AND email <> lower(email);
+
+DO $$
+DECLARE
+    duplicate_email TEXT;
+BEGIN
+    SELECT email INTO duplicate_email
+    FROM suppliers
+    WHERE email IS NOT NULL
+    GROUP BY email
+    HAVING count(*) > 1
+    LIMIT 1;
+
+    IF duplicate_email IS NOT NULL THEN
+        RAISE EXCEPTION 'suppliers.email is not unique (e.g. %); merge duplicate suppliers before applying this migration', duplicate_email;
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_suppliers_email_unique ON suppliers (email);
+
+-- One invitation per supplier and RFQ: keep the earliest, drop repeats
+DELETE FROM rfq_invitations a
+USING rfq_invitations b
+WHERE a.rfq_id = b.rfq_id
+  AND a.supplier_id = b.supplier_id
+  AND (a.invited_at, a.id) > (b.invited_at, b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rfq_invitations_rfq_supplier ON rfq_invitations (rfq_id, supplier_id);
@@ -0,0 +1,46 @@
+-- Migration: add_daily_metrics_aggregation
+-- Created at: 1755956300
+
+-- Range scans for the daily metrics query of the aggregation agent
+-- (one grouped pass per table over created_at / verification_date)
+CREATE INDEX IF NOT EXISTS idx_email_logs_sent_created_at ON email_logs (created_at) WHERE status = 'sent';
+CREATE INDEX IF NOT EXISTS idx_suppliers_created_at ON suppliers (created_at);
+CREATE INDEX IF NOT EXISTS idx_suppliers_verification_date ON suppliers (verification_date);
+
+-- GET /analytics/rfqs: all counters of a requester from an index-only scan
+CREATE INDEX IF NOT EXISTS idx_rfqs_requester_status_category ON rfqs (requester_id, status, category);
+-- Superseded by the index above (same leading column)
+DROP INDEX IF EXISTS idx_rfqs_requester_id;
+
+-- Total / active / completed RFQs and the top categories of one requester in a single pass
+CREATE OR REPLACE FUNCTION get_rfq_analytics(p_requester_id UUID, p_top_categories INTEGER DEFAULT 5)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH per_category AS (
+        SELECT category,
+               count(*) AS total,
+               count(*) FILTER (WHERE status IN ('published', 'in_progress')) AS active,
+               count(*) FILTER (WHERE status = 'completed') AS completed
+        FROM rfqs
+        WHERE requester_id = p_requester_id
+        GROUP BY category
+    ),
+    top_categories AS (
+        SELECT category, total
+        FROM per_category
+        ORDER BY total DESC, category
+        LIMIT p_top_categories
+    )
+    SELECT jsonb_build_object(
+        'total_rfqs', COALESCE((SELECT sum(total) FROM per_category), 0),
+        'active_rfqs', COALESCE((SELECT sum(active) FROM per_category), 0),
+        'completed_rfqs', COALESCE((SELECT sum(completed) FROM per_category), 0),
+        'top_categories', COALESCE(
+            (SELECT jsonb_agg(jsonb_build_object('category', category, 'count', total) ORDER BY total DESC, category)
+             FROM top_categories),
+            '[]'::jsonb
+        )
+    );
+$$;
@@ -0,0 +1,24 @@
+-- Migration: add_job_status_series
+-- Created at: 1755956400
+
+-- GET /analytics/jobs: per-day job status counts of one user, computed in the database
+-- over a bounded window (index-only scan on the covering index below)
+CREATE INDEX IF NOT EXISTS idx_jobs_user_updated_status ON jobs (user_id, updated_at, status);
+-- Superseded by the index above (same leading column)
+DROP INDEX IF EXISTS idx_jobs_user;
+
+-- Days are UTC; the window is today and the p_days - 1 days before it (at most 366)
+CREATE OR REPLACE FUNCTION get_job_status_series(p_user_id UUID, p_days INTEGER DEFAULT 7)
+RETURNS TABLE (day DATE, status TEXT, jobs BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT date_trunc('day', j.updated_at AT TIME ZONE 'UTC')::date AS day,
+           lower(j.status) AS status,
+           count(*) AS jobs
+    FROM jobs j
+    WHERE j.user_id = p_user_id
+      AND j.updated_at >= ((now() AT TIME ZONE 'UTC')::date - (LEAST(GREATEST(p_days, 1), 366) - 1)) AT TIME ZONE 'UTC'
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+$$;
@@ -0,0 +1,26 @@
+-- Migration: add_updated_at_triggers
+-- Created at: 1755956500
+
+-- The supplier index syncs incrementally on suppliers.updated_at >= last sync,
+-- and cached supplier verifications are versioned by it. Not every writer sets
+-- updated_at, so the database stamps it on every update (companies too, for
+-- the joined company profile)
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS suppliers_set_updated_at ON suppliers;
+CREATE TRIGGER suppliers_set_updated_at
+    BEFORE UPDATE ON suppliers
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS companies_set_updated_at ON companies;
+CREATE TRIGGER companies_set_updated_at
+    BEFORE UPDATE ON companies
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import fakeredis
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_orchestrator"))
+
+# agentik-b2b-app/agents also ships an ``agents`` package; import the
+# orchestrator's own one without leaking it into the other test modules
+_shadowed = {name: sys.modules.pop(name) for name in list(sys.modules) if name.split(".")[0] == "agents"}
+import orchestrator as orchestrator_module  # noqa: E402
+
+for name in [name for name in sys.modules if name.split(".")[0] == "agents"]:
+    del sys.modules[name]
+sys.modules.update(_shadowed)
+
+import utils  # noqa: E402
+from queues import SCHEDULED_KEY, ListJobQueue, StreamJobQueue  # noqa: E402
+
+AGENT_CLASSES = {
+    "RFQIntakeAgent": "rfq_intake",
+    "SupplierDiscoveryAgent": "supplier_discovery",
+    "EmailSendAgent": "email_send",
+    "InboxParserAgent": "inbox_parser",
+    "SupplierVerifierAgent": "supplier_verifier",
+    "AggregationReportAgent": "aggregation_report",
+}
+
+
+class StubAgent:
+    """Stands in for a real agent: records the job and hands it to the next stage"""
+
+    stage = None
+    orchestrator = None
+    processed = []
+
+    async def process(self, job_data):
+        StubAgent.processed.append((self.stage, job_data["job_id"]))
+        next_agent = self.orchestrator.workflow[self.stage]
+        if next_agent:
+            await self.orchestrator.queue.push(next_agent, job_data)
+        return {"success": True}
+
+
+class CrashingAgent:
+    calls = 0
+
+    async def process(self, job_data):
+        CrashingAgent.calls += 1
+        raise RuntimeError("boom")
+
+
+class RecordingSupabase:
+    """Records ``table(...).update(row).eq("id", ...)`` calls on the jobs table"""
+
+    def __init__(self):
+        self.updates = []
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def update(self, row):
+                self.row = row
+                return self
+
+            def eq(self, column, value):
+                self.job_id = value
+                return self
+
+            def execute(self):
+                client.updates.append((name, self.job_id, self.row))
+
+        return Query()
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    client = RecordingSupabase()
+    monkeypatch.setattr(orchestrator_module, "get_supabase_client", lambda: client)
+    return client
+
+
+@pytest.fixture
+def make_orchestrator(monkeypatch, supabase):
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(utils, "_redis_client", redis)
+    monkeypatch.setattr(orchestrator_module, "get_redis_connection", lambda: redis)
+    for class_name, stage in AGENT_CLASSES.items():
+        monkeypatch.setattr(orchestrator_module, class_name, type(class_name, (StubAgent,), {"stage": stage}))
+    StubAgent.processed = []
+
+    def make(backend="list"):
+        monkeypatch.setenv("AGENTIK_QUEUE_BACKEND", backend)
+        orchestrator = orchestrator_module.AgentOrchestrator()
+        StubAgent.orchestrator = orchestrator
+        return orchestrator
+
+    return make
+
+
+def test_promote_due_moves_jobs_to_their_queues():
+    async def run():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        queue = ListJobQueue(redis)
+        await queue.schedule("inbox_parser", {"job_id": "due"}, time.time() - 1)
+        await queue.schedule("email_send", {"job_id": "later"}, time.time() + 3600)
+        assert await queue.promote_due() == 1
+        assert await queue.promote_due() == 0
+        assert [json.loads(j)["job_id"] for j in await redis.lrange("agentik:agent:inbox_parser", 0, -1)] == ["due"]
+        assert await redis.zcard(SCHEDULED_KEY) == 1
+
+    asyncio.run(run())
+
+
+def test_poison_stream_entry_is_dead_lettered(make_orchestrator, supabase, monkeypatch):
+    monkeypatch.setenv("AGENTIK_STREAM_CLAIM_IDLE_MS", "0")
+    monkeypatch.setenv("AGENTIK_STREAM_CLAIM_INTERVAL", "0")
+    monkeypatch.setenv("AGENTIK_STREAM_MAX_DELIVERIES", "3")
+    orchestrator = make_orchestrator("streams")
+    queue = orchestrator.queue
+    assert isinstance(queue, StreamJobQueue)
+    CrashingAgent.calls = 0
+
+    async def run():
+        await queue.push("rfq_intake", {"job_id": "poison"})
+        for _ in range(5):
+            queued = await queue.pop("rfq_intake", timeout=0.01)
+            if queued is None:
+                break
+            slots = asyncio.Semaphore(0)
+            await orchestrator._handle_agent_job("rfq_intake", CrashingAgent(), queued, slots)
+
+        redis = orchestrator.redis_client
+        dead = await redis.xrange(queue.dead_letter_key("rfq_intake"))
+        pending = await redis.xpending(queue.key("rfq_intake"), queue.group)
+        status = await redis.hgetall("agentik:status:poison")
+        return dead, pending, status
+
+    dead, pending, status = asyncio.run(run())
+    assert CrashingAgent.calls == 3
+    assert len(dead) == 1 and json.loads(dead[0][1]["job"])["job_id"] == "poison"
+    assert dead[0][1]["deliveries"] == "4"
+    assert pending["pending"] == 0
+    assert status["status"] == "failed"
+    # The jobs row is failed too, not left at in_progress for history/analytics
+    table, job_id, row = supabase.updates[-1]
+    assert (table, job_id, row["status"]) == ("jobs", "poison", "failed")
+    assert row["error"] == json.loads(status["result"])["error"]
+
+
+class SlowAgent:
+    calls = 0
+
+    async def process(self, job_data):
+        SlowAgent.calls += 1
+        await asyncio.sleep(0.6)
+        return {"success": True}
+
+
+def test_long_running_stream_job_is_not_reclaimed(make_orchestrator, monkeypatch):
+    monkeypatch.setenv("AGENTIK_STREAM_CLAIM_IDLE_MS", "150")
+    monkeypatch.setenv("AGENTIK_STREAM_CLAIM_INTERVAL", "0")
+    orchestrator = make_orchestrator("streams")
+    queue = orchestrator.queue
+    replica = StreamJobQueue(orchestrator.redis_client, consumer="replica-2")
+    SlowAgent.calls = 0
+
+    async def run():
+        await queue.push("email_send", {"job_id": "slow"})
+        queued = await queue.pop("email_send", timeout=0.01)
+        job = asyncio.create_task(
+            orchestrator._handle_agent_job("email_send", SlowAgent(), queued, asyncio.Semaphore(0))
+        )
+        stolen = []
+        while not job.done():
+            # Another replica and this consumer's own next pop both poll for stuck entries
+            stolen += [await replica.pop("email_send", timeout=0.01), await queue.pop("email_send", timeout=0.01)]
+            await asyncio.sleep(0.05)
+        await job
+        pending = await orchestrator.redis_client.xpending(queue.key("email_send"), queue.group)
+        return stolen, pending
+
+    stolen, pending = asyncio.run(run())
+    assert SlowAgent.calls == 1
+    assert not any(stolen)
+    assert pending["pending"] == 0
+
+
+@pytest.mark.parametrize("backend", ["list", "streams"])
+def test_high_job_keeps_its_lane_through_every_stage(make_orchestrator, backend):
+    orchestrator = make_orchestrator(backend)
+    queue = orchestrator.queue
+
+    async def route_main_jobs():
+        while await orchestrator._main_queue_size():
+            _, job = await orchestrator.redis_client.brpop(orchestrator._main_poll_order(), timeout=1)
+            await orchestrator._route_to_agent("rfq_intake", json.loads(job))
+
+    async def run_stages():
+        """One worker pass per stage in workflow order until every queue is empty"""
+        busy = True
+        while busy:
+            busy = False
+            for agent_name, agent in orchestrator.agents.items():
+                if not await queue.size(agent_name):
+                    continue
+                queued = await queue.pop(agent_name, timeout=1)
+                if queued:
+                    busy = True
+                    await orchestrator._handle_agent_job(agent_name, agent, queued, asyncio.Semaphore(0))
+
+    async def run():
+        for i in range(4):
+            await orchestrator.process_job({"job_id": f"bulk-{i}", "priority": "bulk", "payload": {}})
+        await route_main_jobs()
+        # Queued after the bulk jobs already reached the first stage
+        await orchestrator.process_job({"job_id": "high", "priority": "high", "payload": {}})
+        await route_main_jobs()
+        assert await queue.size("rfq_intake") == 5
+        await run_stages()
+
+    asyncio.run(run())
+    finished = [job_id for stage, job_id in StubAgent.processed if stage == "aggregation_report"]
+    assert finished[0] == "high" and len(finished) == 5
+    high_stages = [i for i, (_, job_id) in enumerate(StubAgent.processed) if job_id == "high"]
+    assert high_stages == list(range(6))
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agentik-b2b-app", "agents"))
+
+import agents.aggregation_report_agent as aggregation_module
+from agents.aggregation_report_agent import DAILY_METRIC_KEYS, as_date
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    async def fetch(self, query, start, end):
+        self.db.queries.append((start, end))
+        days = (end - start).days + 1
+        return [dict({key: i + 1 for i, key in enumerate(DAILY_METRIC_KEYS)}, day=start + timedelta(days=n)) for n in range(days)]
+
+    async def executemany(self, query, args):
+        self.db.stored.append(list(args))
+
+
+class FakePool:
+    def __init__(self):
+        self.queries = []
+        self.stored = []
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+def test_as_date():
+    assert as_date("2025-03-01") == date(2025, 3, 1)
+    assert as_date("2025-03-01T10:00:00") == date(2025, 3, 1)
+    assert as_date(date(2025, 3, 1)) == date(2025, 3, 1)
+
+
+def test_backfill_reads_the_range_once_and_stores_in_one_batch(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(aggregation_module, "get_db_pool", lambda: pool)
+    agent = aggregation_module.AggregationReportAgent()
+
+    result = asyncio.run(agent.process_task({
+        "action": "backfill_daily_reports", "start_date": "2025-03-01", "end_date": "2025-03-07"
+    }))
+    assert result["reports_stored"] == 7
+    assert result["totals"]["total_rfqs"] == 7 and result["totals"]["verified_suppliers"] == 42
+    assert pool.queries == [(date(2025, 3, 1), date(2025, 3, 7))]
+    assert len(pool.stored) == 1 and [row[1] for row in pool.stored[0]][0] == "2025-03-01"
+
+    assert asyncio.run(agent._collect_daily_metrics("2025-03-02"))["emails_sent"] == 4
+    assert asyncio.run(agent.process_task({
+        "action": "backfill_daily_reports", "start_date": "2025-03-07", "end_date": "2025-03-01"
+    }))["error"]
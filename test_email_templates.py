@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_orchestrator"))
+
+from email_templates import TemplateRegistry, number_format
+
+
+TEMPLATES = {
+    "invite": "Dear {{ supplier }},\n{{ shared }}",
+    "invite/shared": "{{ rfq.title }}: {{ rfq.budget|number_format }} TL",
+}
+
+
+def test_shared_part_rendered_once_per_rfq():
+    registry = TemplateRegistry(TEMPLATES)
+    prepared = registry.prepare("invite", rfq={"title": "Beton katkısı", "budget": 1250000})
+    assert prepared.context["shared"] == "Beton katkısı: 1.250.000 TL"
+    assert prepared.render(supplier="Sika") == "Dear Sika,\nBeton katkısı: 1.250.000 TL"
+    assert prepared.render(supplier="Akçansa").startswith("Dear Akçansa,")
+
+
+def test_templates_compiled_once():
+    registry = TemplateRegistry(TEMPLATES)
+    assert registry.get("invite") is registry.get("invite")
+    assert registry.from_string("RFQ - {{ rfq_title }}") is registry.from_string("RFQ - {{ rfq_title }}")
+
+
+def test_number_format():
+    assert number_format(1234567.5) == "1.234.568"
+    assert number_format(1234.5, 2) == "1.234,50"
+    assert number_format("belirtilmemiş") == "belirtilmemiş"
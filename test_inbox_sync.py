@@ -0,0 +1,277 @@
+import asyncio
+import json
+import importlib.util
+import os
+import re
+import sys
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_orchestrator"))
+
+from inbox_sync import InboxSync, remember_threads
+
+# Loaded by path: agentik-b2b-app/agents has an ``agents`` package of its own
+_spec = importlib.util.spec_from_file_location(
+    "orchestrator_agents", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_orchestrator", "agents.py")
+)
+orchestrator_agents = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(orchestrator_agents)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.commands = []
+
+            def set(self, key, value, ex=None):
+                self.commands.append((key, value))
+
+            async def execute(self):
+                for key, value in self.commands:
+                    await redis.set(key, value)
+
+        return Pipeline()
+
+
+class FakeIMAP:
+    """Local stand-in for imaplib.IMAP4 over an in-memory mailbox"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def login(self, username, password):
+        return "OK", [b"logged in"]
+
+    def status(self, mailbox, items):
+        self.server.commands.append("STATUS")
+        uidnext = max(self.server.messages, default=0) + 1
+        return "OK", [f"{mailbox} (UIDVALIDITY {self.server.uidvalidity} UIDNEXT {uidnext})".encode()]
+
+    def select(self, mailbox, readonly=False):
+        return "OK", [str(len(self.server.messages)).encode()]
+
+    def uid(self, command, *args):
+        self.server.commands.append(command)
+        uids = sorted(self.server.messages)
+        if command == "SEARCH":
+            criteria = args[1:]
+            if criteria[0] == "UID":
+                low = int(criteria[1].split(":")[0])
+                uids = [uid for uid in uids if uid >= low] or uids[-1:]
+            return "OK", [" ".join(map(str, uids)).encode()]
+        requested = [int(uid) for uid in args[0].split(",")]
+        headers_only = "HEADER.FIELDS" in args[1]
+        self.server.fetched.append(("headers" if headers_only else "body", requested))
+        data = []
+        for uid in requested:
+            raw = self.server.messages[uid]
+            if headers_only:
+                raw = raw.split(b"\n\n", 1)[0] + b"\n\n"
+            data.append((f"{uid} (UID {uid} BODY[] {{{len(raw)}}}".encode(), raw))
+            data.append(b")")
+        return "OK", data
+
+    def logout(self):
+        return "BYE", [b""]
+
+
+class FakeServer:
+    def __init__(self):
+        self.uidvalidity = 1
+        self.messages = {}
+        self.commands = []
+        self.fetched = []
+
+    def deliver(self, uid, body, in_reply_to=None, references=None, message_id=None):
+        message = EmailMessage()
+        message["From"] = "Satış <satis@firma.com.tr>"
+        message["Subject"] = "Re: RFQ Daveti"
+        message["Message-ID"] = message_id or f"<reply{uid}@firma.com.tr>"
+        if in_reply_to:
+            message["In-Reply-To"] = in_reply_to
+        if references:
+            message["References"] = references
+        message.set_content(body)
+        self.messages[uid] = re.sub(rb"\r\n", b"\n", message.as_bytes())
+
+
+def collect(sync):
+    async def run():
+        return [message async for message in sync.messages()]
+    return asyncio.run(run())
+
+
+def make_sync():
+    server = FakeServer()
+    redis = FakeRedis()
+    asyncio.run(remember_threads(redis, {
+        "<inv1@agentik>": {"rfq_id": "rfq-1", "supplier_id": "s-1"},
+        "<inv2@agentik>": {"rfq_id": "rfq-2", "supplier_id": "s-2"},
+    }))
+    sync = InboxSync(redis, "imap.test", "rfq@agentik", "secret", connect=lambda: FakeIMAP(server))
+    return server, redis, sync
+
+
+def test_only_invitation_replies_are_downloaded():
+    server, redis, sync = make_sync()
+    server.deliver(1, "Fiyat: 500 TL", in_reply_to="<inv1@agentik>")
+    server.deliver(2, "Bülten: yeni ürünler")
+    server.deliver(3, "Teslimat 7 gün", references="<inv2@agentik> <reply1@firma.com.tr>")
+
+    messages = collect(sync)
+    assert [(m["uid"], m["thread"]["rfq_id"]) for m in messages] == [(1, "rfq-1"), (3, "rfq-2")]
+    assert messages[0]["content"].strip() == "Fiyat: 500 TL"
+    assert messages[0]["sender"] == "satis@firma.com.tr"
+    assert server.fetched == [("headers", [1, 2, 3]), ("body", [1, 3])]
+
+
+def test_incremental_sync_uses_checkpoint():
+    server, redis, sync = make_sync()
+    server.deliver(1, "Fiyat: 500 TL", in_reply_to="<inv1@agentik>")
+    collect(sync)
+
+    server.commands.clear()
+    server.fetched.clear()
+    assert collect(sync) == []
+    assert server.commands == ["STATUS"]
+
+    server.deliver(2, "Fiyat: 450 TL", in_reply_to="<inv2@agentik>")
+    messages = collect(sync)
+    assert [m["uid"] for m in messages] == [2]
+    assert server.fetched == [("headers", [2]), ("body", [2])]
+
+
+def test_uidvalidity_change_rescans_without_duplicates():
+    server, redis, sync = make_sync()
+    server.deliver(1, "Fiyat: 500 TL", in_reply_to="<inv1@agentik>")
+    collect(sync)
+
+    # Mailbox rebuilt: same message under a new UID, plus a new reply
+    server.uidvalidity = 2
+    server.messages = {}
+    server.deliver(10, "Fiyat: 500 TL", in_reply_to="<inv1@agentik>", message_id="<reply1@firma.com.tr>")
+    server.deliver(11, "Fiyat: 480 TL", in_reply_to="<inv2@agentik>")
+    messages = collect(sync)
+    assert [m["uid"] for m in messages] == [11]
+    assert asyncio.run(sync.load_checkpoint())["last_uid"] == 11
+
+
+def test_concurrent_syncs_hand_out_each_reply_once():
+    server, redis, sync = make_sync()
+    other = InboxSync(redis, "imap.test", "rfq@agentik", "secret", connect=lambda: FakeIMAP(server))
+    for uid in range(1, 6):
+        server.deliver(uid, f"Fiyat: {uid}00 TL", in_reply_to="<inv1@agentik>")
+
+    async def run(inbox):
+        return [message["uid"] async for message in inbox.messages()]
+
+    async def both():
+        return await asyncio.gather(run(sync), run(other))
+
+    first, second = asyncio.run(both())
+    # Both runs read the same checkpoint and fetch the same UIDs
+    assert sorted(first + second) == [1, 2, 3, 4, 5]
+
+
+def test_price_only_reply_is_flagged_not_verified():
+    parser = orchestrator_agents.InboxParserAgent.__new__(orchestrator_agents.InboxParserAgent)
+    message = {
+        "thread": {"rfq_id": "rfq-1", "supplier_id": "s-1", "quantity": 10},
+        "sender": "satis@beton.com.tr",
+        "content": "Merhaba, talebiniz için birim fiyat 1.250,00 TL + KDV. Saygılarımızla",
+        "message_id": "<reply-1@beton.com.tr>",
+    }
+    response = parser._response_from_message(message)
+    assert response["missing_fields"] == ["delivery_time"]
+    assert parser._extract_offer_from_response({"id": "rfq-1"}, response) is None
+
+    verifier = orchestrator_agents.SupplierVerifierAgent.__new__(orchestrator_agents.SupplierVerifierAgent)
+
+    async def verified(supplier_id):
+        return {"verified": True, "issues": []}
+
+    verifier._verify_supplier = verified
+    result = asyncio.run(verifier._verify_offer({"unit_price": 125.0, "total_price": 1250.0, "delivery_time": None}))
+    assert "Invalid delivery time" in result["issues"]
+    assert result["checks"]["delivery_time_reasonable"] is False
+
+
+class ListInbox:
+    def __init__(self, messages):
+        self._messages = messages
+
+    async def messages(self):
+        for message in self._messages:
+            yield message
+
+
+def reply(rfq_id, uid):
+    return {
+        "thread": {"rfq_id": rfq_id, "supplier_id": f"s-{uid}", "quantity": 10},
+        "sender": f"satis{uid}@firma.com.tr",
+        "content": f"Teklifimiz: toplam fiyat {uid}.000 TL, teslim süresi 10 gün.",
+        "message_id": f"<reply{uid}@firma.com.tr>",
+    }
+
+
+def test_late_replies_for_other_rfqs_schedule_a_follow_up(monkeypatch):
+    import fakeredis
+    from queues import SCHEDULED_KEY, ListJobQueue
+
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    parser = orchestrator_agents.InboxParserAgent.__new__(orchestrator_agents.InboxParserAgent)
+    parser.name = "inbox_parser"
+    parser.redis_client = redis
+    parser.queue = ListJobQueue(redis)
+
+    async def no_status(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(parser, "update_job_status", no_status)
+
+    async def run():
+        # rfq-2 has not been parsed yet: its own run will drain the parked reply
+        await parser._collect_inbox_responses(ListInbox([reply("rfq-2", 1)]), {"id": "rfq-1"})
+        assert await redis.zcard(SCHEDULED_KEY) == 0
+
+        # rfq-2 was parsed and verified already; later replies get one follow-up parse
+        await orchestrator_agents.remember_workflow(redis, {
+            "job_id": "job-2", "priority": "high",
+            "payload": {"rfq": {"id": "rfq-2", "quantity": 10}, "verified_offers": [{"supplier_id": "s-0"}]},
+        })
+        await parser._collect_inbox_responses(ListInbox([reply("rfq-2", 2)]), {"id": "rfq-1"})
+        await parser._collect_inbox_responses(ListInbox([reply("rfq-2", 3)]), {"id": "rfq-3"})
+        assert await redis.zcard(SCHEDULED_KEY) == 1
+
+        [member] = await redis.zrange(SCHEDULED_KEY, 0, -1)
+        _, agent_name, job = member.split("\n", 2)
+        assert agent_name == "inbox_parser"
+        monkeypatch.setattr(orchestrator_agents.InboxSync, "from_env", classmethod(lambda cls, redis: ListInbox([])))
+        result = await parser.process(json.loads(job))
+        queued = await parser.queue.pop("supplier_verifier", timeout=1)
+        return result, queued
+
+    result, queued = asyncio.run(run())
+    assert result["responses_count"] == 3 and result["offers_count"] == 3
+    payload = queued.job_data["payload"]
+    assert queued.job_data["job_id"] == "job-2" and queued.key.endswith(":high")
+    assert payload["verified_offers"] == [{"supplier_id": "s-0"}]
+    assert [offer["supplier_id"] for offer in payload["parsed_offers"]] == ["s-1", "s-2", "s-3"]
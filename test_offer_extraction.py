@@ -0,0 +1,61 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agentik-b2b-app", "agents"))
+
+from core.offer_extraction import BATCH_POOL_THRESHOLD, extract_offer, extract_offers_parallel, parse_amount
+
+DETAILED = """
+Sayın Yetkili,
+
+RFQ'nuz için teklifimiz aşağıdadır:
+
+TEKLIF DETAYLARI:
+Toplam Fiyat: 12,345.67 USD
+Birim Fiyat: 1,234.57 USD
+Teslimat Süresi: 14 iş günü
+Geçerlilik Süresi: 30 gün
+Ödeme Koşulları: %30 peşin, %70 teslimatta
+- Garanti süresi: 24 ay
+"""
+
+
+def test_detailed_offer_fields_and_confidence():
+    offer = extract_offer(DETAILED, now=datetime(2025, 1, 1))
+    assert offer["type"] == "offer"
+    assert offer["price"] == 12345.67 and offer["currency"] == "USD"
+    assert offer["delivery_time"] == 14
+    assert offer["valid_until"] == "2025-01-31T00:00:00"
+    assert offer["payment_terms"] == "%30 peşin, %70 teslimatta"
+    assert offer["warranty"] == "garanti süresi: 24 ay"
+    assert offer["field_confidence"]["price"] == 0.95
+    assert 0.9 < offer["confidence"] <= 1.0
+
+
+def test_unlabeled_values_score_lower():
+    offer = extract_offer("Merhaba, 45.000 TL olarak 7 gün içinde teslim edebiliriz. Not: KDV hariç")
+    assert offer["price"] == 45000.0 and offer["currency"] == "TRY"
+    assert offer["delivery_time"] == 7
+    assert offer["notes"] == "kdv hariç"
+    assert offer["confidence"] < extract_offer(DETAILED)["confidence"]
+
+
+def test_decline_and_clarification():
+    assert extract_offer("Maalesef bu projeye teklif veremiyoruz.")["type"] == "decline"
+    clarification = extract_offer("Teklif için şu bilgileri öğrenmek istiyoruz:\n- Teslimat adresi nedir?\n- Miktar bilgisi")
+    assert clarification["type"] == "clarification"
+    assert "teslimat adresi nedir?" in clarification["questions"]
+    assert extract_offer("Teşekkürler, görüşmek üzere.") is None
+
+
+def test_parse_amount():
+    assert parse_amount("12.345,67") == 12345.67
+    assert parse_amount("₺ 1.250.000") == 1250000.0
+    assert parse_amount("99,5") == 99.5
+
+
+def test_batch_matches_serial():
+    emails = [DETAILED, "Fiyat: 500 EUR, teslimat 5 gün"] * (BATCH_POOL_THRESHOLD // 2 + 1)
+    parallel = extract_offers_parallel(emails)
+    assert [o["price"] for o in parallel] == [extract_offer(e)["price"] for e in emails]
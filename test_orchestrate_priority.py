@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def auth_headers():
+    return {"Authorization": "Bearer mock-admin-token"}
+
+
+def test_orchestrate_priority_lanes():
+    client = TestClient(app)
+
+    deadline = (datetime.utcnow() + timedelta(days=3)).isoformat()
+    rfq = {
+        "title": "Priority Lane Test",
+        "description": "desc long enough for validation",
+        "category": "chemicals",
+        "quantity": 5,
+        "unit": "kg",
+        "deadline": deadline,
+        "delivery_location": "Dubai",
+        "priority": "high",
+    }
+    r = client.post("/rfqs", json=rfq, headers=auth_headers())
+    assert r.status_code == 200
+    rfq_id = r.json()["data"]["rfq"]["id"]
+
+    # lane defaults from the RFQ priority
+    r2 = client.post("/orchestrate", json={"job_type": "rfq_process", "rfq_id": rfq_id}, headers=auth_headers())
+    assert r2.status_code == 200
+    assert r2.json()["data"]["priority"] == "high"
+
+    # explicit lane wins
+    r3 = client.post("/orchestrate", json={"job_type": "rfq_process", "rfq_id": rfq_id, "priority": "bulk"}, headers=auth_headers())
+    assert r3.status_code == 200
+    assert r3.json()["data"]["priority"] == "bulk"
+
+    # unknown lane is rejected
+    r4 = client.post("/orchestrate", json={"job_type": "rfq_process", "priority": "asap"}, headers=auth_headers())
+    assert r4.status_code == 422
+
+    r5 = client.get("/orchestrate/queues", headers=auth_headers())
+    assert r5.status_code == 200
+    assert set(r5.json()["data"]["main_lanes"]) == {"high", "normal", "bulk"}
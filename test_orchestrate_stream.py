@@ -0,0 +1,37 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def auth_headers():
+    return {"Authorization": "Bearer mock-admin-token"}
+
+
+def test_stream_ends_on_terminal_status():
+    client = TestClient(app)
+
+    r = client.post("/orchestrate", json={"job_type": "rfq_process"}, headers=auth_headers())
+    assert r.status_code == 200
+    job_id = r.json()["data"]["job_id"]
+
+    r2 = client.delete(f"/orchestrate/{job_id}", headers=auth_headers())
+    assert r2.status_code == 200
+
+    # snapshot of a finished job is sent once, then the stream closes
+    with client.stream("GET", f"/orchestrate/stream/{job_id}", headers=auth_headers()) as r3:
+        assert r3.status_code == 200
+        assert r3.headers["content-type"].startswith("text/event-stream")
+        body = "".join(r3.iter_text())
+    data_lines = [line[len("data: "):] for line in body.splitlines() if line.startswith("data: ")]
+    assert data_lines
+    event = json.loads(data_lines[0])
+    assert event["job_id"] == job_id
+    assert event["status"] in ("failed", "cancelled")
+
+
+def test_stream_unknown_job():
+    client = TestClient(app)
+    r = client.get("/orchestrate/stream/does-not-exist", headers=auth_headers())
+    assert r.status_code == 404
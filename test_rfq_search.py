@@ -0,0 +1,69 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agentik-b2b-app", "backend"))
+
+# The root tree ships its own ``app`` package; import the backend one without
+# leaking it into the other test modules
+_shadowed = {name: sys.modules.pop(name) for name in list(sys.modules) if name.split(".")[0] == "app"}
+from app.services.rfq_service import RFQService, _substring_pattern  # noqa: E402
+
+for name in [name for name in sys.modules if name.split(".")[0] == "app"]:
+    del sys.modules[name]
+sys.modules.update(_shadowed)
+sys.path.pop(0)
+
+
+class RecordingQuery:
+    def __init__(self):
+        self.filters = []
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def or_(self, expression):
+        self.filters.append(expression)
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": []})()
+
+
+class RecordingDB:
+    def __init__(self):
+        self.query = RecordingQuery()
+
+    def table(self, name):
+        return self.query
+
+
+def search_filters(term):
+    db = RecordingDB()
+    asyncio.run(RFQService.search_rfqs({"search": term}, db=db))
+    return db.query.filters
+
+
+def test_search_term_is_quoted_not_stripped():
+    pattern = '"%Beton C30/37 (Katkılı), 2.5 ton%"'
+    assert _substring_pattern("  Beton C30/37 (Katkılı), 2.5 ton ") == pattern
+    assert search_filters("Beton C30/37 (Katkılı), 2.5 ton") == [f"title.ilike.{pattern},description.ilike.{pattern}"]
+
+
+def test_like_wildcards_and_quotes_are_escaped():
+    # LIKE escapes (\% \_ \\) are escaped once more inside the quoted PostgREST value
+    assert _substring_pattern("50% pay_off") == r'"%50\\% pay\\_off%"'
+    assert _substring_pattern("a\\b") == r'"%a\\\\b%"'
+    assert _substring_pattern('"A" kalite') == r'"%\"A\" kalite%"'
+
+
+def test_blank_search_adds_no_filter():
+    assert _substring_pattern("   ") is None
+    assert _substring_pattern("**") is None
+    assert search_filters("  ") == []
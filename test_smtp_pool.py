@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_orchestrator"))
+
+import aiosmtplib
+
+from smtp_pool import DomainRateLimiter, SMTPPool, recipient_domain
+
+
+class FakeSMTP:
+    def __init__(self, server):
+        self.server = server
+        self.is_connected = True
+
+    async def send_message(self, message):
+        self.server.active += 1
+        self.server.peak = max(self.server.peak, self.server.active)
+        try:
+            await asyncio.sleep(0.01)
+            if self.server.drop_next:
+                self.server.drop_next = False
+                self.is_connected = False
+                raise aiosmtplib.SMTPServerDisconnected("idle timeout")
+            if message["To"].startswith("bounce"):
+                raise aiosmtplib.SMTPRecipientsRefused([])
+            self.server.delivered.append(message["To"])
+        finally:
+            self.server.active -= 1
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+class FakePool(SMTPPool):
+    def __init__(self, **kwargs):
+        super().__init__("smtp.test", **kwargs)
+        self.connects = 0
+        self.active = 0
+        self.peak = 0
+        self.drop_next = False
+        self.delivered = []
+
+    async def _connect(self):
+        self.connects += 1
+        return FakeSMTP(self)
+
+
+def message(to):
+    msg = MIMEText("body")
+    msg["To"] = to
+    return msg
+
+
+def test_sessions_are_reused_with_bounded_concurrency():
+    async def run():
+        pool = FakePool(size=3)
+        results = await pool.send_many([message(f"s{i}@firma{i}.com") for i in range(50)])
+        await pool.close()
+        return pool, results
+
+    pool, results = asyncio.run(run())
+    assert all(r["success"] for r in results)
+    assert len(pool.delivered) == 50
+    assert pool.connects == 3
+    assert pool.peak == 3
+
+
+def test_per_recipient_results_and_reconnect():
+    async def run():
+        pool = FakePool(size=1)
+        await pool.send(message("a@x.com"))
+        pool.drop_next = True
+        results = await pool.send_many([message("b@x.com"), message("bounce@y.com"), message("c@z.com")])
+        return pool, results
+
+    pool, results = asyncio.run(run())
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[1]["recipient"] == "bounce@y.com" and results[1]["error"]
+    assert pool.delivered == ["a@x.com", "b@x.com", "c@z.com"]
+
+
+def test_domain_rate_limit():
+    async def run():
+        limiter = DomainRateLimiter(rate=20)
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.wait("x.com") for _ in range(4)), limiter.wait("y.com"))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.14
+    assert recipient_domain("Tedarik <Satis@Firma.COM.TR>") == "firma.com.tr"
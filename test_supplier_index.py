@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_orchestrator"))
+
+from supplier_index import SupplierIndex, normalize
+
+
+def build_index():
+    index = SupplierIndex()
+    index.upsert(1, {"name": "Akçansa", "description": "Çimento ve hazır beton", "categories": ["construction"]})
+    index.upsert(2, {"name": "Sika", "description": "Beton katkıları, PCE", "categories": ["chemicals", "construction"]})
+    index.upsert(3, {"name": "Vestel", "description": "Electronics", "categories": ["electronics"]})
+    return index
+
+
+def test_turkish_normalization():
+    assert normalize("İSTANBUL Işık Çimento") == "istanbul isik cimento"
+
+
+def test_category_search_ranks_keyword_hits_first():
+    index = build_index()
+    assert index.search(["ÇİMENTO"], "Construction") == [(1, index.search(["cimento"])[0][1]), (2, 0.0)]
+    # query terms also match suffixed forms (katkı -> katkıları)
+    assert [doc for doc, _ in index.search(["katki"])] == [2]
+    assert [doc for doc, _ in index.search(["electronics"], "construction", within_category=False)][0] == 3
+
+
+def test_incremental_update_and_remove():
+    index = build_index()
+    index.upsert(1, {"name": "Akçansa", "description": "Hazır beton", "categories": ["construction"]})
+    assert index.search(["cimento"]) == []
+    index.remove(2)
+    assert index.search(["pce"]) == []
+    assert "chemicals" not in index.categories
+    index.clear()
+    assert len(index) == 0 and index.search(["beton"]) == []
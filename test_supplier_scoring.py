@@ -0,0 +1,191 @@
+import asyncio
+import os
+import shutil
+
+import fakeredis
+import numpy as np
+
+from app.services.analysis_cache import SupplierAnalysisCache
+import app.services.supplier_discovery as discovery_module
+from app.services.supplier_discovery import SupplierDiscoveryService
+from app.services.supplier_snapshot import DEFAULT_SOURCES, build_snapshot, load_snapshot
+
+
+def test_vectorized_scores_match_criteria():
+    service = SupplierDiscoveryService()
+    rfq = {"category": "chemicals", "quantity": 800, "budget_max": 4000}
+    result = asyncio.run(service.discover_suppliers(rfq))
+    assert result["success"]
+
+    suppliers = result["suppliers"]
+    assert len(suppliers) == len(service.suppliers_database["chemicals"])
+    # sorted by overall score
+    assert all(a["overall_score"] >= b["overall_score"] for a, b in zip(suppliers, suppliers[1:]))
+
+    weights = {k: v["weight"] for k, v in service.comparison_criteria.items()}
+    for s in suppliers:
+        assert set(s["scores"]) == set(weights)
+        total = sum(s["scores"][k] * w / 100 for k, w in weights.items())
+        assert s["overall_score"] == round(total, 1)
+
+
+def test_price_not_scored_outside_chemicals():
+    service = SupplierDiscoveryService()
+    result = asyncio.run(service.discover_suppliers({"category": "textiles", "quantity": 300}))
+    assert result["success"]
+    assert all("price_competitiveness" not in s["scores"] for s in result["suppliers"])
+
+
+def test_unknown_category():
+    service = SupplierDiscoveryService()
+    result = asyncio.run(service.discover_suppliers({"category": "unknown"}))
+    assert not result["success"]
+    assert result["suppliers"] == []
+
+
+def test_top_k_page_matches_full_ranking():
+    service = SupplierDiscoveryService()
+    rfq = {"category": "chemicals", "quantity": 800, "budget_max": 4000}
+    full = asyncio.run(service.discover_suppliers(rfq))
+    page = asyncio.run(service.discover_suppliers(rfq, top_k=3, offset=2))
+    assert [s["id"] for s in page["suppliers"]] == [s["id"] for s in full["suppliers"]][2:5]
+    assert page["total"] == full["total"] == len(full["suppliers"])
+    # the report still covers the whole category
+    assert page["comparison_report"] == full["comparison_report"]
+
+
+def test_analysis_cache_hits_and_invalidation():
+    service = SupplierDiscoveryService()
+    cache = SupplierAnalysisCache(service, max_entries=2)
+    rfq = {"category": "chemicals", "quantity": 800, "budget_max": 4000, "title": "a"}
+
+    first = asyncio.run(cache.discover("rfq-1", rfq))
+    # non-scoring fields don't change the key
+    assert asyncio.run(cache.discover("rfq-1", {**rfq, "title": "b"})) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # scoring field change or reloading different supplier data misses
+    asyncio.run(cache.discover("rfq-1", {**rfq, "quantity": 900}))
+    service.reload({**service.suppliers_database, "chemicals": list(service.suppliers_database["chemicals"])[:-1]})
+    assert asyncio.run(cache.discover("rfq-1", rfq)) is not first
+    assert cache.misses == 3
+
+    cache.invalidate("rfq-1")
+    asyncio.run(cache.discover("rfq-1", rfq))
+    assert cache.misses == 4
+    assert len(cache._entries) == 1
+
+
+def test_shared_analysis_cache_keys_on_snapshot_identity(tmp_path):
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    sources = [tmp_path / path.name for path in DEFAULT_SOURCES]
+    for src, dst in zip(DEFAULT_SOURCES, sources):
+        shutil.copy(src, dst)
+    snapshot_dir = tmp_path / "snapshot"
+    rfq = {"category": "textiles", "quantity": 300}
+
+    # Two API workers on the same snapshot share Redis entries
+    worker_a = SupplierAnalysisCache(SupplierDiscoveryService(load_snapshot(sources, snapshot_dir)), redis=redis)
+    worker_b = SupplierAnalysisCache(SupplierDiscoveryService(load_snapshot(sources, snapshot_dir)), redis=redis)
+    first = asyncio.run(worker_a.discover("rfq-1", rfq))
+    assert asyncio.run(worker_b.discover("rfq-1", rfq)) == first and worker_b.hits == 1
+
+    # Worker A reloads changed sources; worker B still serves its own data.
+    # Both are at data_version 2 but never read each other's entries.
+    with open(sources[1], "a", encoding="utf-8") as f:
+        f.write("\nYeni Tedarikçi,Export Manager,export@yeni.com.tr,+90 212 000 0000,Textiles,Textiles,Yeni Kumaş,7.5,1000 kg,ISO 9001,14 gün,30% avans 70% B/L,Evet,8 yıl,Evet,,8.0,80.0,www.yeni.com.tr,Istanbul\n")
+    worker_a.discovery.reload()
+    worker_b.discovery.reload({c: list(r) for c, r in worker_b.discovery.suppliers_database.items()})
+    assert worker_a.discovery.data_version == worker_b.discovery.data_version
+    worker_a.clear()
+    assert redis.keys("supplier_analysis:*") == []
+    asyncio.run(worker_b.discover("rfq-1", rfq))
+    reloaded = asyncio.run(worker_a.discover("rfq-1", rfq))
+    assert reloaded["total"] == first["total"] + 1 and worker_a.hits == 0
+
+
+def test_reload_in_one_worker_reaches_the_others(tmp_path):
+    sources = [tmp_path / path.name for path in DEFAULT_SOURCES]
+    for src, dst in zip(DEFAULT_SOURCES, sources):
+        shutil.copy(src, dst)
+    snapshot_dir = tmp_path / "snapshot"
+    rfq = {"category": "textiles", "quantity": 300}
+    worker_a = SupplierAnalysisCache(SupplierDiscoveryService(load_snapshot(sources, snapshot_dir)))
+    worker_b = SupplierAnalysisCache(SupplierDiscoveryService(load_snapshot(sources, snapshot_dir)))
+    first = asyncio.run(worker_b.discover("rfq-1", rfq))
+    assert not worker_b.discovery.follow_current()
+
+    # Only worker A handles POST /admin/suppliers/reload
+    with open(sources[1], "a", encoding="utf-8") as f:
+        f.write("\nYeni Tedarikçi,Export Manager,export@yeni.com.tr,+90 212 000 0000,Textiles,Textiles,Yeni Kumaş,7.5,1000 kg,ISO 9001,14 gün,30% avans 70% B/L,Evet,8 yıl,Evet,,8.0,80.0,www.yeni.com.tr,Istanbul\n")
+    worker_a.discovery.reload()
+    worker_a.clear()
+
+    reloaded = asyncio.run(worker_b.discover("rfq-1", rfq))
+    assert reloaded["total"] == first["total"] + 1 and worker_b.hits == 0
+    assert worker_b.discovery.data_identity == worker_a.discovery.data_identity
+    assert worker_b.discovery.data_version == 2
+
+
+def test_snapshot_is_memory_mapped_and_matches_records(tmp_path):
+    snapshot = build_snapshot(DEFAULT_SOURCES, tmp_path)
+    assert isinstance(snapshot.columns("chemicals")["avg_price"], np.memmap)
+
+    service = SupplierDiscoveryService(snapshot)
+    in_memory = SupplierDiscoveryService(snapshot)
+    in_memory.reload({c: list(records) for c, records in service.suppliers_database.items()})
+
+    rfq = {"category": "chemicals", "quantity": 800, "budget_max": 4000}
+    a = asyncio.run(service.discover_suppliers(rfq, top_k=10))
+    b = asyncio.run(in_memory.discover_suppliers(rfq, top_k=10))
+    assert a["suppliers"] == b["suppliers"]
+    assert a["comparison_report"] == b["comparison_report"]
+
+
+def test_snapshot_rebuilds_when_sources_change(tmp_path):
+    sources = [tmp_path / path.name for path in DEFAULT_SOURCES]
+    for src, dst in zip(DEFAULT_SOURCES, sources):
+        shutil.copy(src, dst)
+    snapshot_dir = tmp_path / "snapshot"
+    service = SupplierDiscoveryService(load_snapshot(sources, snapshot_dir))
+    assert load_snapshot(sources, snapshot_dir).path == service.snapshot.path
+
+    with open(sources[1], "a", encoding="utf-8") as f:
+        f.write("\nYeni Tedarikçi,Export Manager,export@yeni.com.tr,+90 212 000 0000,Textiles,Textiles,Yeni Kumaş,7.5,1000 kg,ISO 9001,14 gün,30% avans 70% B/L,Evet,8 yıl,Evet,,8.0,80.0,www.yeni.com.tr,Istanbul\n")
+    textiles = len(service.suppliers_database["textiles"])
+    old_path = service.snapshot.path
+    service.reload()
+    assert service.snapshot.path != old_path
+    assert len(service.suppliers_database["textiles"]) == textiles + 1
+
+
+def test_csv_sources_replace_the_builtin_catalog(tmp_path):
+    # The exports list fewer suppliers in most categories than the built-in
+    # catalog (and many more chemicals), so rankings follow the CSV data
+    snapshot = build_snapshot(DEFAULT_SOURCES, tmp_path)
+    sizes = {c: stop - start for c, (start, stop) in snapshot.categories.items()}
+    builtin = SupplierDiscoveryService.__new__(SupplierDiscoveryService)._load_suppliers_database()
+    assert sizes["automotive"] == 3 and len(builtin["automotive"]) == 10
+    assert sizes["chemicals"] == 106 and len(builtin["chemicals"]) == 13
+
+    bosch = next(s for s in snapshot.records("automotive") if s["company_name"] == "Bosch Turkey")
+    assert bosch["certifications"] == ["ISO 9001", "ISO/TS 16949", "ISO 14001"]
+
+
+def test_builtin_catalog_when_snapshot_fails(monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("snapshot directory not writable")
+
+    monkeypatch.setattr(discovery_module, "load_snapshot", broken)
+    service = SupplierDiscoveryService()
+    assert service.snapshot is None
+    assert len(service.suppliers_database["automotive"]) == 10
+
+
+def test_rebuild_keeps_the_previous_snapshot(tmp_path):
+    built = [build_snapshot(DEFAULT_SOURCES, tmp_path).path.name for _ in range(3)]
+    assert sorted(p.name for p in tmp_path.glob("snapshot-*")) == built[1:]
+    assert (tmp_path / "CURRENT").read_text() == built[-1]
+    # Sources unchanged: a worker that waited for the lock reuses the fresh build
+    assert load_snapshot(DEFAULT_SOURCES, tmp_path).path.name == built[-1]
+    assert os.path.exists(tmp_path / ".build.lock")
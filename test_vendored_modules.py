@@ -0,0 +1,12 @@
+import os
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_vendored_modules_match_their_source():
+    result = subprocess.run(
+        ["bash", os.path.join(ROOT, "scripts", "sync_vendored_modules.sh"), "--check"],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agentik-b2b-app", "agents"))
+
+from core.verification_cache import MISS, VerificationCache
+import agents.supplier_verifier_agent as verifier_module
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_version_and_invalidation():
+    clock = Clock()
+    cache = VerificationCache(ttl_seconds=60, negative_ttl_seconds=5, clock=clock)
+    cache.put("s-1", {"verified": True}, version="v1")
+
+    assert cache.get("s-1") == {"verified": True}
+    assert cache.get("s-1", version="v1") == {"verified": True}
+    assert cache.get("s-1", version="v2") is MISS
+
+    cache.invalidate("s-1")
+    assert cache.get("s-1") is MISS
+
+    cache.put("s-1", {"verified": True})
+    clock.now = 61
+    assert cache.get("s-1") is MISS
+
+
+def test_negative_entries_expire_sooner_and_errors_are_not_cached():
+    clock = Clock()
+    cache = VerificationCache(ttl_seconds=60, negative_ttl_seconds=5, clock=clock)
+    calls = []
+
+    async def missing(supplier_id):
+        calls.append(supplier_id)
+        return None
+
+    async def failing(supplier_id):
+        calls.append(supplier_id)
+        raise RuntimeError("db down")
+
+    async def run():
+        assert await cache.get_or_load("ghost", missing) is None
+        assert await cache.get_or_load("ghost", missing) is None
+        clock.now = 6
+        assert await cache.get_or_load("ghost", missing) is None
+        for _ in range(2):
+            try:
+                await cache.get_or_load("s-2", failing)
+            except RuntimeError:
+                pass
+
+    asyncio.run(run())
+    assert calls == ["ghost", "ghost", "s-2", "s-2"]
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    async def fetchrow(self, query, *args):
+        if "FROM rfqs" in query:
+            self.db.queries.append("rfq")
+            return self.db.rfq
+        self.db.queries.append("offer")
+        return next(o for o in self.db.offers if o["id"] == args[0])
+
+    async def fetch(self, query, *args):
+        if "FROM suppliers" in query and "JOIN companies" not in query:
+            self.db.queries.append("supplier_versions")
+            return [self.db.supplier_row(i) for i in args[0] if i in self.db.suppliers]
+        if "JOIN companies" in query:
+            self.db.queries.append("suppliers")
+            return [self.db.supplier_row(i) for i in args[0] if i in self.db.suppliers]
+        if "status = 'pending'" in query:
+            self.db.queries.append("pending_offers")
+            return self.db.offers
+        self.db.queries.append("offer_prices")
+        return [{"price": o["price"]} for o in self.db.offers]
+
+    async def execute(self, query, *args):
+        self.db.writes.append(args[0])
+
+    async def executemany(self, query, args):
+        self.db.queries.append("executemany")
+        self.db.writes.extend(row[0] for row in args)
+
+
+class FakePool:
+    def __init__(self):
+        self.queries = []
+        self.writes = []
+        self.rfq = {"id": "rfq-1", "budget_min": 100, "budget_max": 1000, "deadline_date": None}
+        supplier = {"verified": True, "rating": 4.6, "total_completed_orders": 60, "average_response_time": 4,
+                    "company_name": "Beton A.Ş.", "email": "satis@beton.com.tr", "updated_at": "2025-01-01"}
+        self.suppliers = {f"s-{i}": dict(supplier, id=f"s-{i}") for i in range(1, 4)}
+        self.offers = [
+            {"id": f"o-{i}", "rfq_id": "rfq-1", "supplier_id": f"s-{i % 4 + 1}", "price": 500 + i * 10,
+             "delivery_time": 10, "currency": "TRY"}
+            for i in range(10)
+        ]
+
+    def supplier_row(self, supplier_id):
+        offers = [o for o in self.offers if o["supplier_id"] == supplier_id]
+        return dict(self.suppliers[supplier_id], offers_submitted=len(offers),
+                    offers_accepted=sum(o.get("status") == "accepted" for o in offers))
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+def test_bulk_validation_uses_set_based_queries(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(verifier_module, "get_db_pool", lambda: pool)
+    agent = verifier_module.SupplierVerifierAgent()
+
+    async def no_queue(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(agent, "_trigger_aggregation_update", no_queue)
+
+    result = asyncio.run(agent._validate_bulk_offers({"rfq_id": "rfq-1"}))
+    # s-4 does not exist: its offers fail without loading a profile
+    assert result["offers_verified"] == 8 and result["offers_failed"] == 2
+    assert pool.queries == ["pending_offers", "rfq", "offer_prices", "supplier_versions", "suppliers", "executemany"]
+    assert len(pool.writes) == 8
+
+    pool.queries.clear()
+    asyncio.run(agent._validate_bulk_offers({"rfq_id": "rfq-1"}))
+    assert "suppliers" not in pool.queries
+
+    # Re-verifying a supplier invalidates its cached profile
+    asyncio.run(agent._update_supplier_verification("s-1", {"credibility_score": 90}))
+    pool.queries.clear()
+    asyncio.run(agent._verify_offer({"rfq_id": "rfq-1", "supplier_id": "s-1", "offer_id": "o-0"}))
+    assert pool.queries.count("suppliers") == 1
+
+
+def test_cached_checks_follow_profile_and_offer_history(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(verifier_module, "get_db_pool", lambda: pool)
+    agent = verifier_module.SupplierVerifierAgent()
+
+    def history(supplier_id):
+        checks = asyncio.run(agent._get_supplier_checks(supplier_id))
+        return checks["performance"]["metrics"]["history"]
+
+    assert history("s-2")["offers_submitted"] == 3
+    pool.queries.clear()
+    assert history("s-2")["offers_submitted"] == 3
+    assert pool.queries == ["supplier_versions"]
+
+    # A new offer and an accepted one change the history without touching the supplier row
+    pool.offers.append({"id": "o-10", "rfq_id": "rfq-2", "supplier_id": "s-2", "price": 700, "delivery_time": 20})
+    assert history("s-2")["offers_submitted"] == 4
+    pool.offers[1]["status"] = "accepted"
+    assert history("s-2")["offers_accepted"] == 1
+
+    # A profile edit (updated_at) is a miss too
+    pool.suppliers["s-2"]["rating"] = 2.0
+    pool.suppliers["s-2"]["updated_at"] = "2025-02-01"
+    checks = asyncio.run(agent._get_supplier_checks("s-2"))
+    assert checks["performance"]["metrics"]["rating"] == 2.0